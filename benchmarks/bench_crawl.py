@@ -0,0 +1,289 @@
+"""End-to-end crawl benchmark against a local synthetic documentation site.
+
+Each scenario serves a SyntheticSite from benchmarks.server, crawls all of it
+with `main.py crawl` in a subprocess and records:
+
+- throughput: pages crawled per second of wall time
+- p95 page latency: request plus download time, from the crawl's metrics file
+- peak RSS of the crawler (the largest of its processes, parse workers included)
+- CPU seconds (user + system, parse workers included) and utilization
+
+Runs are offline and reproducible: the site, the injected latency and which
+pages fail are all derived from fixed seeds. Results are appended to a JSON
+lines file; comparing against an earlier file fails the run on a regression.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_crawl --scenario 100 --scenario 10k
+    uv run python -m benchmarks.bench_crawl --scenario 10k --latency 0.05 \\
+        --error-rate 0.02 --throttle-rate 0.02 --baseline results.jsonl
+"""
+
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+
+from benchmarks.server import SiteServer
+from benchmarks.site import SyntheticSite
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS = {"100": 100, "10k": 10_000, "100k": 100_000}
+
+# Metrics where a higher value is a regression, and where a lower one is
+HIGHER_IS_WORSE = ("p95_latency_seconds", "peak_rss_mib", "cpu_seconds")
+LOWER_IS_WORSE = ("pages_per_second",)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_crawl(args: List[str], log_path: Path) -> Dict[str, Any]:
+    """Run the crawler to completion, measuring its wall time and resources."""
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "main.py", "crawl", *args],
+            cwd=REPO_ROOT,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        # wait4 reports the usage of this crawl alone, parse workers included
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        tail = log_path.read_text().splitlines()[-20:]
+        raise click.ClickException(
+            f"Crawl exited with {process.returncode}:\n" + "\n".join(tail)
+        )
+    cpu = usage.ru_utime + usage.ru_stime
+    return {
+        "wall_seconds": round(elapsed, 3),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_utilization": round(cpu / elapsed, 3),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mib": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def check_injected_failures(
+    server: SiteServer, pages: int, error_rate: float, throttle_rate: float
+) -> None:
+    """Fail the run if the injected 503/429 counts are off the requested rates.
+
+    Every page but the home page is drawn independently, so the counts are
+    binomial; more than four standard deviations off means the draw is broken.
+    """
+    draws = pages - 1
+    for status, rate in ((503, error_rate), (429, throttle_rate)):
+        expected = draws * rate
+        allowed = 4 * math.sqrt(draws * rate * (1 - rate)) + 1
+        injected = server.responses[status]
+        if abs(injected - expected) > allowed:
+            raise click.ClickException(
+                f"Injected {injected} {status} responses, expected about "
+                f"{expected:.0f} for a rate of {rate}"
+            )
+
+
+def run_scenario(
+    name: str,
+    site: SyntheticSite,
+    server_options: Dict[str, Any],
+    crawl_args: List[str],
+) -> Dict[str, Any]:
+    with SiteServer(site, **server_options) as server, tempfile.TemporaryDirectory(
+        prefix="bench-crawl-"
+    ) as tmp:
+        output_dir = Path(tmp)
+        args = [
+            server.url,
+            "--output-dir",
+            str(output_dir),
+            "--link-tag",
+            "nav",
+            "--text-tag",
+            "div",
+            "--text-class-contains",
+            "content",
+            "--max-depth",
+            str(site.depth),
+            "--metrics-interval",
+            "0",
+            *crawl_args,
+        ]
+        result = run_crawl(args, output_dir / "crawl.log")
+        metrics_file = next(output_dir.glob("*/*.metrics.json"))
+        metrics = json.loads(metrics_file.read_text())
+
+    check_injected_failures(
+        server,
+        site.pages,
+        server_options.get("error_rate", 0.0),
+        server_options.get("throttle_rate", 0.0),
+    )
+    crawled = sum(metrics["pages"].values())
+    host_latency = next(iter(metrics["hosts"].values()), {"p95": 0.0})
+    return {
+        "scenario": name,
+        "pages": crawled,
+        "pages_per_second": round(crawled / result["wall_seconds"], 2),
+        "p95_latency_seconds": host_latency["p95"],
+        **result,
+        "retries": metrics["retries"],
+        "page_statuses": metrics["pages"],
+        "server_responses": {str(k): v for k, v in server.responses.items()},
+    }
+
+
+def load_baseline(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Latest recorded result of every scenario in a results file."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for line in path.read_text().splitlines():
+        if line.strip():
+            record = json.loads(line)
+            latest[record["scenario"]] = record
+    return latest
+
+
+def regressions(
+    result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    found = []
+    for key in HIGHER_IS_WORSE:
+        if baseline.get(key) and result[key] > baseline[key] * (1 + tolerance):
+            found.append(f"{key} {baseline[key]} -> {result[key]}")
+    for key in LOWER_IS_WORSE:
+        if baseline.get(key) and result[key] < baseline[key] * (1 - tolerance):
+            found.append(f"{key} {baseline[key]} -> {result[key]}")
+    return found
+
+
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.option(
+    "--scenario",
+    type=click.Choice(list(SCENARIOS)),
+    multiple=True,
+    default=("100",),
+    show_default=True,
+    help="Site sizes to crawl",
+)
+@click.option("--sections", default=30, show_default=True, help="Sections per page")
+@click.option("--fanout", default=10, show_default=True, help="Links to child pages")
+@click.option("--latency", default=0.0, show_default=True, help="Response delay (s)")
+@click.option("--jitter", default=0.0, show_default=True, help="Random extra delay (s)")
+@click.option(
+    "--error-rate",
+    default=0.0,
+    show_default=True,
+    help="Share of pages failing with 503",
+)
+@click.option(
+    "--throttle-rate",
+    default=0.0,
+    show_default=True,
+    help="Share of pages answered with 429",
+)
+@click.option(
+    "--results",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=REPO_ROOT / "benchmarks" / "results.jsonl",
+    show_default="benchmarks/results.jsonl",
+    help="JSON lines file the results are appended to",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Earlier results file; exit with an error if a scenario regressed",
+)
+@click.option(
+    "--tolerance",
+    default=0.15,
+    show_default=True,
+    help="Relative change against the baseline that counts as a regression",
+)
+@click.argument("crawl_args", nargs=-1, type=click.UNPROCESSED)
+def main(
+    scenario: tuple[str, ...],
+    sections: int,
+    fanout: int,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    throttle_rate: float,
+    results: Path,
+    baseline: Optional[Path],
+    tolerance: float,
+    crawl_args: tuple[str, ...],
+) -> None:
+    """Crawl synthetic sites; extra arguments are passed on to `main.py crawl`.
+
+    The crawl defaults are kept, except that the per-host rate limit is
+    lifted unless given: against localhost it would be all that is measured.
+    """
+    args = list(crawl_args)
+    if "--rate" not in args:
+        args += ["--rate", "1000000", "--burst", "1000000"]
+    server_options = {
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "throttle_rate": throttle_rate,
+    }
+    previous = load_baseline(baseline) if baseline else {}
+    revision = git_revision()
+
+    failed = []
+    for name in scenario:
+        site = SyntheticSite(SCENARIOS[name], sections=sections, fanout=fanout)
+        click.echo(f"Scenario {name}: {site.pages} pages, {site.depth} levels deep")
+        result = run_scenario(name, site, server_options, args)
+        result.update(
+            revision=revision,
+            recorded=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            sections=sections,
+            server=server_options,
+            crawl_args=args,
+        )
+        with open(results, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+        click.echo(
+            f"  {result['pages']} pages in {result['wall_seconds']:.1f}s "
+            f"({result['pages_per_second']:.1f} pages/s), "
+            f"p95 latency {result['p95_latency_seconds'] * 1000:.0f}ms, "
+            f"peak RSS {result['peak_rss_mib']:.0f} MiB, "
+            f"CPU {result['cpu_seconds']:.1f}s ({result['cpu_utilization']:.0%})"
+        )
+        if name in previous:
+            found = regressions(result, previous[name], tolerance)
+            for regression in found:
+                click.echo(f"  REGRESSION {regression}")
+            if found:
+                failed.append(name)
+
+    if failed:
+        raise click.ClickException(f"Regressed scenarios: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Startup cost of the CLI: import time of `main` and of `main.py --help`.
+
+Commands that never fetch a page (--help, reextract, batch validation) should
+not pay for requests, BeautifulSoup, the ScrapingAnt client, tqdm or the
+optional pyarrow and markitdown stages. This check imports `main` in fresh
+interpreters with `-X importtime`, reports the slowest imports and fails if
+the median import time is over budget or a heavy module got loaded.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_import
+    uv run python -m benchmarks.bench_import --budget-ms 200 --runs 10
+"""
+
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import click
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules only the crawl itself (or an optional stage) needs
+HEAVY_MODULES = (
+    "requests",
+    "bs4",
+    "scrapingant_client",
+    "tqdm",
+    "pandas",
+    "pyarrow",
+    "markitdown",
+)
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_times() -> Dict[str, Tuple[int, int]]:
+    """Self and cumulative import time in microseconds of every module."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode:
+        raise click.ClickException(f"Importing main failed:\n{process.stderr}")
+    times = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, module = match.groups()
+            times[module] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def loaded_heavy_modules() -> List[str]:
+    code = (
+        "import sys, main; "
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return process.stdout.split()
+
+
+def help_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "main.py", "--help"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--runs", default=5, show_default=True, help="Fresh interpreters to time")
+@click.option(
+    "--budget-ms",
+    default=300.0,
+    show_default=True,
+    help="Maximum median import time of main",
+)
+@click.option("--top", default=15, show_default=True, help="Slowest imports to list")
+def main(runs: int, budget_ms: float, top: int) -> None:
+    samples = [import_times() for _ in range(runs)]
+    totals = sorted(sample["main"][1] / 1000 for sample in samples)
+    median_ms = statistics.median(totals)
+    help_ms = statistics.median(help_seconds() for _ in range(runs)) * 1000
+
+    click.echo(
+        f"import main: median {median_ms:.0f}ms "
+        f"(min {totals[0]:.0f}ms, max {totals[-1]:.0f}ms) over {runs} runs"
+    )
+    click.echo(f"main.py --help: median {help_ms:.0f}ms")
+
+    # The last run is representative enough to find the slow imports
+    slowest = sorted(samples[-1].items(), key=lambda item: -item[1][1])[:top]
+    click.echo("Slowest imports (cumulative, self):")
+    for module, (self_us, cumulative_us) in slowest:
+        click.echo(
+            f"  {cumulative_us / 1000:8.1f}ms  {self_us / 1000:8.1f}ms  {module}"
+        )
+
+    problems = []
+    heavy = loaded_heavy_modules()
+    if heavy:
+        problems.append(f"import main loads {', '.join(heavy)}")
+    if median_ms > budget_ms:
+        problems.append(f"import main takes {median_ms:.0f}ms, over {budget_ms:.0f}ms")
+    if problems:
+        raise click.ClickException("; ".join(problems))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Pages/second extracted on fetch threads versus a ParsePool of processes.
+
+Pages are already in memory, so this measures the parse stage alone: with
+threads it stays flat as the GIL serializes parsing, with processes it should
+grow with the number of cores.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_parse_pool --pages 200 --workers 1 --workers 8
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from benchmarks.pages import make_doc_page
+from scraper.config import LinkConfig, TextConfig
+from scraper.content_scraper import PageResult, extract_page
+from scraper.link import Link
+from scraper.parse_pool import ParsePool
+from scraper.parsers import resolve_parser
+
+BASE_URL = "https://docs.example.com/"
+
+
+def make_results(html: str, pages: int) -> list[PageResult]:
+    link = Link(title="page", href=BASE_URL, text="", domain="docs.example.com")
+    return [PageResult(link=link, html_content=html) for _ in range(pages)]
+
+
+async def run_pool(pool: ParsePool, results: list[PageResult]) -> None:
+    await asyncio.gather(*(pool.extract(result) for result in results))
+
+
+@click.command()
+@click.option("--pages", default=200, show_default=True, help="Pages per run")
+@click.option("--sections", default=200, show_default=True, help="Sections per page")
+@click.option("--parser", default="auto", show_default=True, help="Parser backend")
+@click.option(
+    "--workers",
+    type=int,
+    multiple=True,
+    default=(1, 2, 4, 8),
+    show_default=True,
+    help="Thread/process counts to compare",
+)
+def main(pages: int, sections: int, parser: str, workers: tuple[int, ...]) -> None:
+    parser = resolve_parser(parser)
+    html = make_doc_page(sections=sections)
+    text_config = TextConfig(tag="div", class_contains="content")
+    link_config = LinkConfig(tag="nav")
+    click.echo(f"Page size: {len(html) / 1024:.0f} KiB, {pages} pages, {parser}")
+
+    for count in workers:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=count) as threads:
+            list(
+                threads.map(
+                    lambda _: extract_page(
+                        html, BASE_URL, text_config, parser, True, link_config
+                    ),
+                    range(pages),
+                )
+            )
+        threaded = pages / (time.perf_counter() - start)
+
+        pool = ParsePool(
+            text_config, parser=parser, link_config=link_config, workers=count
+        )
+        try:
+            # Start the workers outside the timed run
+            asyncio.run(run_pool(pool, make_results(html, count)))
+            start = time.perf_counter()
+            asyncio.run(run_pool(pool, make_results(html, pages)))
+            pooled = pages / (time.perf_counter() - start)
+        finally:
+            pool.close()
+
+        click.echo(
+            f"{count:3} workers  threads {threaded:8.1f} pages/s"
+            f"  processes {pooled:8.1f} pages/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
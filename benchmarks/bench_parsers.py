@@ -0,0 +1,38 @@
+"""Pages/second for each installed HTML parser backend.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_parsers --pages 50
+"""
+
+import time
+
+import click
+
+from benchmarks.pages import make_doc_page
+from scraper.config import TextConfig
+from scraper.content_scraper import extract_text
+from scraper.link_scraper import extract_links
+from scraper.parsers import available_parsers, parse_html
+
+
+@click.command()
+@click.option("--pages", default=50, show_default=True, help="Pages parsed per backend")
+@click.option("--sections", default=200, show_default=True, help="Sections per page")
+def main(pages: int, sections: int) -> None:
+    html = make_doc_page(sections=sections)
+    config = TextConfig(tag="div", class_contains="content")
+    click.echo(f"Page size: {len(html) / 1024:.0f} KiB, {pages} pages per backend")
+
+    for backend in available_parsers():
+        start = time.perf_counter()
+        for _ in range(pages):
+            document = parse_html(html, backend)
+            extract_text(document, config)
+            extract_links(document, "https://docs.example.com/")
+        elapsed = time.perf_counter() - start
+        click.echo(f"{backend:12} {pages / elapsed:8.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Per-page extraction time: legacy find_all path vs the compiled matcher.
+
+Run from the repository root:
+
+    uv run python -m benchmarks.bench_selectors --pages 20
+"""
+
+import re
+import time
+from typing import Callable
+
+import click
+
+from benchmarks.pages import make_doc_page
+from scraper.config import TextConfig
+from scraper.matchers import ElementMatcher
+from scraper.parsers import available_parsers, is_selectolax, node_text, parse_html
+
+CONFIGS = {
+    "class-contains": TextConfig(tag="div", class_contains="content"),
+    "class-regex": TextConfig(tag="div", class_contains=r"content-\w+"),
+    "css-selector": TextConfig(selector="main div.doc-section > div.content-block"),
+}
+
+
+def legacy_find_all(soup, config: TextConfig) -> list:
+    """The per-page attrs dict + find_all path extract_text used to take."""
+    attrs: dict = {}
+    if config.class_name:
+        attrs["class"] = config.class_name
+    elif config.class_contains:
+        attrs["class"] = re.compile(config.class_contains)
+    if config.id:
+        attrs["id"] = config.id
+    if config.role:
+        attrs["role"] = config.role
+    return [e.get_text(strip=True) for e in soup.find_all(config.tag, attrs=attrs)]
+
+
+def time_per_page(fn: Callable[[], object], pages: int) -> float:
+    start = time.perf_counter()
+    for _ in range(pages):
+        fn()
+    return (time.perf_counter() - start) / pages * 1000
+
+
+@click.command()
+@click.option("--pages", default=20, show_default=True, help="Runs per measurement")
+@click.option("--sections", default=500, show_default=True, help="Sections per page")
+def main(pages: int, sections: int) -> None:
+    html = make_doc_page(sections=sections)
+    click.echo(f"Page size: {len(html) / 1024:.0f} KiB, ms per page (extraction only)")
+    click.echo(f"{'backend':12} {'config':16} {'find_all':>10} {'matcher':>10}")
+
+    for backend in available_parsers():
+        document = parse_html(html, backend)
+        for name, config in CONFIGS.items():
+            matcher = ElementMatcher(config)
+            compiled = time_per_page(
+                lambda: [node_text(e) for e in matcher.select(document)], pages
+            )
+            legacy = "-"
+            if not is_selectolax(document) and config.selector is None:
+                ms = time_per_page(lambda: legacy_find_all(document, config), pages)
+                legacy = f"{ms:.2f}"
+            click.echo(f"{backend:12} {name:16} {legacy:>10} {compiled:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import random
+from typing import Optional, Sequence
+
+
+def make_doc_page(
+    sections: int = 200,
+    links: int = 150,
+    seed: int = 0,
+    hrefs: Optional[Sequence[str]] = None,
+) -> str:
+    """Build a synthetic documentation page shaped like a large API reference.
+
+    Args:
+        sections: Number of nested content sections in the main article
+        links: Number of navigation links in the sidebar
+        seed: Seed for the random filler text
+        hrefs: Sidebar link targets, replacing the `links` generated ones
+
+    Returns:
+        str: The page HTML
+    """
+    rng = random.Random(seed)
+    words = ["request", "scraper", "config", "parse", "token", "link", "page", "text"]
+
+    def sentence() -> str:
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))) + "."
+
+    if hrefs is None:
+        hrefs = [f"/docs/section-{i}/" for i in range(links)]
+    nav = "".join(
+        f'<li><a class="nav-link" href="{href}">Section {i}</a></li>'
+        for i, href in enumerate(hrefs)
+    )
+    body = "".join(
+        f'<div class="section doc-section" id="s{i}">'
+        f"<h2>Section {i}</h2>"
+        f'<div class="content-block"><p>{sentence()}</p><p>{sentence()}</p>'
+        f"<pre><code>def f{i}(x):\n    return x + {i}</code></pre></div>"
+        "</div>"
+        for i in range(sections)
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>Docs</title>"
+        "<script>var analytics = 1;</script><style>.x{color:red}</style></head>"
+        f'<body><nav class="sidebar-nav"><ul>{nav}</ul></nav>'
+        f'<main role="main"><div class="article-body">{body}</div></main>'
+        '<footer><a href="https://example.org/privacy">Privacy</a></footer>'
+        "</body></html>"
+    )
@@ -0,0 +1,214 @@
+"""Local HTTP server for a SyntheticSite, with injected latency and failures.
+
+Every response is delayed by `latency` plus up to `jitter` seconds. A share
+of pages fails its first request, with a 503 (`error_rate`) or a 429 with
+Retry-After (`throttle_rate`); which pages fail is drawn from a hash of the
+seed and the path, so a run is reproducible and a retried request succeeds like it would against
+a flaky real server. The home page never fails: the crawler fetches it once,
+before retries are set up. robots.txt and sitemap.xml are served as well.
+
+Serve a site to point the crawler at by hand:
+
+    uv run python -m benchmarks.server --pages 1000 --latency 0.05 --port 8000
+"""
+
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+import click
+
+from benchmarks.site import SyntheticSite
+
+
+class SiteServer:
+    """Serve a synthetic site from a background thread.
+
+    Args:
+        site: The site to serve
+        port: Port to listen on, 0 picks a free one
+        latency: Seconds every response is delayed by
+        jitter: Up to this many more seconds of random delay
+        error_rate: Share of pages whose first request gets a 503
+        throttle_rate: Share of pages whose first request gets a 429
+        retry_after: Retry-After of the 429 responses, in seconds
+        seed: Seed of the draw deciding which pages fail
+    """
+
+    def __init__(
+        self,
+        site: SyntheticSite,
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+    ) -> None:
+        self.site = site
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        self.requests: Counter[str] = Counter()
+        self.responses: Counter[int] = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/"
+
+    def __enter__(self) -> "SiteServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="site-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def planned_failure(self, path: str) -> Optional[int]:
+        """Status the first request of a path fails with, if any."""
+        if path == "/":
+            return None
+        # A uniform draw even for paths differing in one character, which
+        # checksums like crc32 do not give
+        digest = hashlib.sha256(f"{self.seed}:{path}".encode("utf-8")).digest()
+        draw = int.from_bytes(digest[:8], "big") / 2**64
+        if draw < self.error_rate:
+            return 503
+        if draw < self.error_rate + self.throttle_rate:
+            return 429
+        return None
+
+    def _failure(self, path: str) -> Optional[int]:
+        """Status a request fails with, if it is a page's first request."""
+        with self._lock:
+            self.requests[path] += 1
+            if self.requests[path] > 1:
+                return None
+        return self.planned_failure(path)
+
+    def _delay(self, path: str) -> float:
+        rng = random.Random(f"{path}:{self.requests[path]}")
+        return self.latency + rng.uniform(0, self.jitter)
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:
+                path = self.path.split("?")[0]
+                if path == "/robots.txt":
+                    robots = f"User-agent: *\nSitemap: {server.url}sitemap.xml\n"
+                    self.reply(200, robots)
+                    return
+                if path == "/sitemap.xml":
+                    self.reply(200, server.site.sitemap(server.url), "application/xml")
+                    return
+
+                status = server._failure(path)
+                time.sleep(server._delay(path))
+                if status == 429:
+                    self.reply(
+                        429, "Too many requests", retry_after=server.retry_after
+                    )
+                elif status is not None:
+                    self.reply(status, "Service unavailable")
+                else:
+                    html = server.site.render(path)
+                    if html is None:
+                        self.reply(404, "Not found")
+                    else:
+                        self.reply(200, html, "text/html; charset=utf-8")
+
+            def reply(
+                self,
+                status: int,
+                text: str,
+                content_type: str = "text/plain; charset=utf-8",
+                retry_after: Optional[int] = None,
+            ) -> None:
+                body = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.responses[status] += 1
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+@click.command()
+@click.option("--pages", default=1000, show_default=True, help="Pages in the site")
+@click.option("--sections", default=30, show_default=True, help="Sections per page")
+@click.option("--fanout", default=10, show_default=True, help="Links to child pages")
+@click.option("--port", default=8000, show_default=True, help="Port to listen on")
+@click.option("--latency", default=0.0, show_default=True, help="Response delay (s)")
+@click.option("--jitter", default=0.0, show_default=True, help="Random extra delay (s)")
+@click.option(
+    "--error-rate",
+    default=0.0,
+    show_default=True,
+    help="Share of pages failing with 503",
+)
+@click.option(
+    "--throttle-rate",
+    default=0.0,
+    show_default=True,
+    help="Share of pages answered with 429",
+)
+def main(
+    pages: int,
+    sections: int,
+    fanout: int,
+    port: int,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    throttle_rate: float,
+) -> None:
+    site = SyntheticSite(pages, sections=sections, fanout=fanout)
+    server = SiteServer(
+        site,
+        port=port,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        throttle_rate=throttle_rate,
+    )
+    with server:
+        click.echo(
+            f"Serving {pages} pages at {server.url} "
+            f"(crawl with --max-depth {site.depth}), Ctrl+C to stop"
+        )
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    click.echo(f"Responses: {dict(server.responses)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Synthetic documentation site of configurable size and page weight.
+
+Pages form a tree: the home page links to the first `fanout` pages and page i
+links to pages i * fanout + 1 ... i * fanout + fanout, so a breadth-first
+crawl reaches every page within `site.depth` levels. Each sidebar also links
+back to the home page and the parent page, which the crawl has to deduplicate
+like on a real site. Pages are rendered on demand, so a 100k page site costs
+no disk space; `python -m benchmarks.site` writes one out as static files.
+
+    uv run python -m benchmarks.site --pages 1000 --out /tmp/site
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import click
+
+from benchmarks.pages import make_doc_page
+
+
+class SyntheticSite:
+    """A generated documentation site, deterministic for a given seed.
+
+    Args:
+        pages: Number of pages, including the home page
+        sections: Content sections per page, i.e. the page weight
+        fanout: Child pages linked from every page
+        seed: Seed for the filler text
+    """
+
+    def __init__(
+        self, pages: int, sections: int = 30, fanout: int = 10, seed: int = 0
+    ) -> None:
+        self.pages = pages
+        self.sections = sections
+        self.fanout = fanout
+        self.seed = seed
+        # Rendering dominates the server's CPU time; the cache covers the
+        # pages requested more than once (home page, retries)
+        self._render = lru_cache(maxsize=1024)(self._render_page)
+
+    @staticmethod
+    def path(index: int) -> str:
+        return "/" if index == 0 else f"/docs/page-{index}/"
+
+    def index(self, path: str) -> Optional[int]:
+        """Page number of a URL path, None if the site has no such page."""
+        if path == "/":
+            return 0
+        name = path.strip("/").removeprefix("docs/page-")
+        if not name.isdigit() or path != self.path(int(name)):
+            return None
+        index = int(name)
+        return index if index < self.pages else None
+
+    def children(self, index: int) -> range:
+        first = index * self.fanout + 1
+        return range(min(first, self.pages), min(first + self.fanout, self.pages))
+
+    @property
+    def depth(self) -> int:
+        """Links between the home page and the deepest page."""
+        depth, last = 0, self.pages - 1
+        while last > 0:
+            last = (last - 1) // self.fanout
+            depth += 1
+        return depth
+
+    def paths(self) -> Iterator[str]:
+        return (self.path(index) for index in range(self.pages))
+
+    def render(self, path: str) -> Optional[str]:
+        """HTML of the page at a path, None if the site has no such page."""
+        index = self.index(path)
+        return None if index is None else self._render(index)
+
+    def _render_page(self, index: int) -> str:
+        hrefs: List[str] = [self.path(child) for child in self.children(index)]
+        if index:
+            hrefs += [self.path(0), self.path((index - 1) // self.fanout)]
+        return make_doc_page(
+            sections=self.sections, seed=self.seed + index, hrefs=hrefs
+        )
+
+    def sitemap(self, base_url: str) -> str:
+        urls = "".join(
+            f"<url><loc>{base_url.rstrip('/')}{path}</loc></url>"
+            for path in self.paths()
+        )
+        namespace = "http://www.sitemaps.org/schemas/sitemap/0.9"
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            f'<urlset xmlns="{namespace}">{urls}</urlset>'
+        )
+
+    def write(self, directory: Path, base_url: str) -> None:
+        """Write the site out as static files, one index.html per page."""
+        for path in self.paths():
+            page_dir = directory / path.strip("/")
+            page_dir.mkdir(parents=True, exist_ok=True)
+            html = self.render(path)
+            assert html is not None
+            (page_dir / "index.html").write_text(html)
+        (directory / "sitemap.xml").write_text(self.sitemap(base_url))
+
+
+@click.command()
+@click.option("--pages", default=1000, show_default=True, help="Pages in the site")
+@click.option("--sections", default=30, show_default=True, help="Sections per page")
+@click.option("--fanout", default=10, show_default=True, help="Links to child pages")
+@click.option("--seed", default=0, show_default=True, help="Seed for the filler text")
+@click.option(
+    "--base-url",
+    default="http://127.0.0.1:8000/",
+    show_default=True,
+    help="URL the site will be served from, used in sitemap.xml",
+)
+@click.option(
+    "--out",
+    type=click.Path(file_okay=False, path_type=Path),
+    required=True,
+    help="Directory to write the site to",
+)
+def main(
+    pages: int, sections: int, fanout: int, seed: int, base_url: str, out: Path
+) -> None:
+    site = SyntheticSite(pages, sections=sections, fanout=fanout, seed=seed)
+    site.write(out, base_url)
+    click.echo(f"Wrote {pages} pages, {site.depth} levels deep, to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,61 @@
+import asyncio
+import cProfile
+import io
+import itertools
+import json
 import os
+import pstats
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Union
+from urllib.parse import urlparse
 
 import click
-from bs4 import BeautifulSoup
 from loguru import logger
-from scrapingant_client import ScrapingAntClient  # type: ignore
-from tqdm import tqdm
 
-from scraper.cli import create_cli_options, format_options_overview
+from scraper.batch import BatchLimits, BatchSite, iter_summary_lines, load_job
+from scraper.cli import (
+    DefaultCommandGroup,
+    create_cli_options,
+    create_reextract_options,
+    format_options_overview,
+)
 from scraper.config import LinkConfig, TextConfig
-from scraper.content_scraper import save_content
-from scraper.content_scrapers import MockClient
-from scraper.link_scraper import extract_links
+from scraper.frontier import Frontier, FrontierItem, in_scope
+from scraper.html_archive import HtmlArchive
+from scraper.link import Link
+from scraper.link_scraper import chunk_text, extract_links, iter_links
+from scraper.metrics import CrawlMetrics, MetricsReporter, serve_prometheus
+from scraper.output_writer import OutputPatcher, OutputWriter
+from scraper.parsers import parse_html, resolve_parser
+from scraper.response_cache import ResponseCache
 from scraper.scraping_ant_utils import save_scraping_response
-from scraper.scraping_page_log import (
-    ScrapingPage,
-    append_to_page_log,
-    load_or_create_page_log,
+from scraper.scraping_page_log import PageLog, ScrapingPage
+from scraper.sinks import open_sink
+from scraper.state_store import (
+    SQLitePageLog,
+    find_page_log,
+    migrate_csv_log,
+    open_page_log,
 )
 from scraper.utils import create_dir_name_from_netloc, create_title_from_url
+from scraper.work_queue import (
+    QUEUE_POLL_SECONDS,
+    WorkQueue,
+    default_worker_id,
+    worker_file_name,
+)
+
 
+@click.group(cls=DefaultCommandGroup, default_command="crawl")
+def cli() -> None:
+    """Scrape documentation sites. Runs `crawl` when no command is given."""
 
-@click.command()
+
+@cli.command("crawl")
 @click.argument("url", type=str)
 @create_cli_options
 def main(
@@ -33,14 +66,61 @@ def main(
     link_class_name: Optional[str],
     link_class_contains: Optional[str],
     link_id: Optional[str],
+    link_selector: Optional[str],
+    link_include: tuple[str, ...],
+    link_exclude: tuple[str, ...],
+    same_origin: bool,
     save_html: bool,
     overwrite: bool,
     use_scraping_ant: bool,
+    scraping_ant_concurrency: int,
+    render: str,
     text_tag: str,
     text_class_name: Optional[str],
     text_class_contains: Optional[str],
     text_id: Optional[str],
     text_role: Optional[str],
+    text_selector: Optional[str],
+    text_nesting: str,
+    output_format: str,
+    dedupe_boilerplate: bool,
+    concurrency: int,
+    per_host_limit: int,
+    parse_workers: int,
+    markdown_workers: Optional[int],
+    rate: float,
+    burst: float,
+    max_retries: int,
+    respect_robots: bool,
+    connect_timeout: float,
+    read_timeout: float,
+    max_bytes: int,
+    content_type: tuple[str, ...],
+    cache_dir: Optional[Path],
+    cache_ttl: float,
+    cache_max_bytes: int,
+    incremental: bool,
+    revalidate: bool,
+    parser: str,
+    max_depth: int,
+    max_pages: Optional[int],
+    scope: str,
+    state_store: str,
+    flush_bytes: int,
+    flush_interval: float,
+    sink: tuple[str, ...],
+    shard_bytes: int,
+    compress_shards: bool,
+    row_group_size: int,
+    archive: bool,
+    queue: Optional[Path],
+    worker_id: Optional[str],
+    lease_seconds: float,
+    metrics_interval: float,
+    prometheus_file: Optional[Path],
+    prometheus_port: Optional[int],
+    metrics_host: str,
+    profile: bool,
 ) -> None:
     """
     Scrape documentation from a given URL.
@@ -60,6 +140,26 @@ def main(
 
     logger.info(format_options_overview(**options))
 
+    # The fetch stack (requests, tqdm, ...) is only imported once a crawl
+    # runs, so --help and the other commands start without paying for it
+    from tqdm import tqdm
+
+    from scraper.content_scraper import (
+        BoilerplateFilter,
+        PageResult,
+        fetch_html,
+        scrape_page,
+        write_page,
+    )
+    from scraper.content_scrapers import MockClient, MockResponse
+    from scraper.fetcher import Fetcher, ResponseRejected, ValidatorStore
+    from scraper.markdown_pool import MarkdownPool
+    from scraper.orchestrator import CrawlOrchestrator
+    from scraper.parse_pool import ParsePool
+    from scraper.politeness import DisallowedByRobots, PolitenessScheduler, RobotsCache
+    from scraper.scraping_ant import ScrapingAntFetcher
+    from scraper.sitemap import load_sitemap
+
     # 1. SCRAPING ANT TO GET THE BASE PAGE
     # get api key from os.environ if None
     if not api_key:
@@ -71,12 +171,91 @@ def main(
             "ScrapingAnt API key is required when using --use-scraping-ant. Set it via --api-key or SCRAPING_ANT_API_KEY environment variable."
         )
 
+    try:
+        parser = resolve_parser(parser)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+    logger.info(f"Parsing HTML with {parser}")
+
+    # Workers of a shared queue append to one crawl log from many processes
+    if queue is not None:
+        if archive:
+            raise click.UsageError(
+                "--archive cannot be shared by --queue workers; use --save-html"
+            )
+        if state_store != "sqlite":
+            logger.info("Workers of a --queue share logs.sqlite")
+            state_store = "sqlite"
+
+    # Set when the crawl is one site of a `batch` job
+    batch_site = click.get_current_context().find_object(BatchSite)
+
+    # Stage timers, throughput, per-host latencies and error counters
+    metrics = CrawlMetrics()
+    if batch_site is not None:
+        batch_site.metrics = metrics
+
+    # Development cache of response bodies, shared by requests and ScrapingAnt
+    cache = None
+    if cache_dir is not None:
+        cache = ResponseCache(
+            cache_dir, ttl=cache_ttl or None, max_bytes=cache_max_bytes
+        )
+
+        def close_cache() -> None:
+            logger.info(f"Response cache: {cache.stats}")
+            cache.close()
+
+        click.get_current_context().call_on_close(close_cache)
+
+    # One pooled keep-alive session shared by every plain request
+    fetcher = Fetcher(
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout,
+        pool_size=max(concurrency, per_host_limit),
+        max_bytes=max_bytes or None,
+        content_types=content_type,
+        cache=cache,
+        metrics=metrics,
+    )
+
+    # Rate limits, robots.txt and retries apply per host, to the base page
+    # as much as to the crawl
+    scheduler = PolitenessScheduler(
+        rate=rate,
+        burst=burst,
+        max_retries=max_retries,
+        robots=RobotsCache(fetcher.session, timeout=connect_timeout)
+        if respect_robots
+        else None,
+    )
+
     # Setup client for initial page scraping
+    ant = None
     if use_scraping_ant:
-        client = ScrapingAntClient(token=api_key) if use_scraping_ant else None
+        from scrapingant_client import ScrapingAntClient  # type: ignore
+
+        client = ScrapingAntClient(token=api_key)
+        # Concurrent, retried ScrapingAnt requests that only render JavaScript
+        # when the plain HTML has nothing to extract
+        ant = ScrapingAntFetcher(
+            client,
+            concurrency=scraping_ant_concurrency,
+            render=render,
+            max_retries=max_retries,
+            cache=cache,
+            metrics=metrics,
+        )
+
+        def log_credits() -> None:
+            logger.info(
+                f"ScrapingAnt: {ant.requests} requests, {ant.credits_spent} credits"
+            )
+
+        click.get_current_context().call_on_close(log_credits)
     else:
         # set teh client to have a general_request() method that uses requests. Mock this behaviour
-        client = MockClient()
+        client = MockClient(fetcher)
 
     # 2. SETUP THE directory, logging, txt output file
     # Create domain-specific directory inside output_dir
@@ -89,47 +268,167 @@ def main(
             f"Permission denied: Cannot create directory {domain_dir}"
         )
 
-    # Initialize log file
-    log_path = domain_dir / "logs.csv"
-    processed_pages = load_or_create_page_log(log_path)
+    work_queue = None
+    if queue is not None:
+        work_queue = WorkQueue(queue, worker_id=worker_id, lease_seconds=lease_seconds)
+        click.get_current_context().call_on_close(work_queue.close)
+
+    # Initialize log file, closed (and flushed) however the command exits.
+    # Workers of a queue share its journal mode, as WAL only works on one host
+    page_log = open_page_log(
+        domain_dir, state_store, wal=work_queue.wal if work_queue is not None else None
+    )
+    click.get_current_context().call_on_close(page_log.close)
+
+    # Compressed, deduplicated store for raw HTML, replacing loose .html files
+    html_archive = HtmlArchive(domain_dir / "archive") if archive else None
+    if html_archive is not None:
+        click.get_current_context().call_on_close(html_archive.close)
+
+    # ETag/Last-Modified from previous runs, used to revalidate saved pages
+    validators = ValidatorStore(domain_dir / "validators.json", html_archive)
+    fetcher.validators = validators
 
     # Log if we're reprocessing an already processed URL
-    if any(page.url == url for page in processed_pages):
+    if url in page_log:
         logger.info("Reprocessing previously scraped URL due to --overwrite flag")
 
     # Log the base URL scraping
     base_html_title = create_title_from_url(url)
-    output_path = domain_dir / f"{base_html_title}.txt"
+    # Every worker of a shared queue writes output files of its own
+    output_name = base_html_title
+    if work_queue is not None:
+        output_name = f"{base_html_title}.{worker_file_name(work_queue.worker_id)}"
+        logger.info(f"Crawling as worker {work_queue.worker_id} of {queue}")
+    output_path = domain_dir / f"{output_name}.txt"
     logger.info(f"Output will be saved to: {output_path}")
 
-    # Initialize output file - write to txt file
+    # Resume an interrupted crawl from its saved frontier, or work through
+    # the shared queue, which survives interruptions by itself
+    frontier: Union[Frontier, WorkQueue]
+    if work_queue is not None:
+        frontier = work_queue
+        resuming = True
+    else:
+        frontier = Frontier.load(domain_dir / f"{base_html_title}.frontier.json")
+        resuming = len(frontier) > 0
+        if resuming:
+            logger.info(f"Resuming crawl with {len(frontier)} queued pages")
+
+    # Initialize output file - write to txt file, keeping it when resuming.
+    # Incremental runs patch the pages that changed into the existing file
+    writer: OutputWriter
     try:
-        with open(output_path, "w") as f:
-            f.write("SCRAPED CONTENT\n\n")
+        if incremental:
+            writer = OutputPatcher(
+                output_path, flush_bytes=flush_bytes, flush_interval=flush_interval
+            )
+        else:
+            writer = OutputWriter(
+                output_path,
+                append=resuming,
+                flush_bytes=flush_bytes,
+                flush_interval=flush_interval,
+            )
     except PermissionError:
         raise click.ClickException(f"Permission denied: Cannot write to {output_path}")
+    click.get_current_context().call_on_close(writer.close)
+
+    # Sharded JSONL/Parquet copies of the output that downstream jobs can
+    # read in parallel, loading only the columns they need
+    sinks = []
+    for kind in dict.fromkeys(sink):
+        try:
+            page_sink = open_sink(
+                kind,
+                domain_dir / "records",
+                output_name,
+                max_bytes=shard_bytes,
+                compress=compress_shards,
+                row_group_size=row_group_size,
+            )
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        click.get_current_context().call_on_close(page_sink.close)
+        sinks.append(page_sink)
+    if work_queue is not None:
+        # Pages only count as done in the queue once they are on disk
+        work_queue.before_commit += [page_log.flush, writer.flush]
+        work_queue.before_commit += [page_sink.flush for page_sink in sinks]
 
     # Setup the html directory
     html_dir = domain_dir / "html" if save_html else None
     if html_dir:
         html_dir.mkdir(parents=True, exist_ok=True)
 
+    config = LinkConfig(
+        tag=link_tag,
+        class_name=link_class_name,
+        class_contains=link_class_contains,
+        id=link_id,
+        selector=link_selector,
+        include=link_include,
+        exclude=link_exclude,
+        same_origin=same_origin,
+    )
+
+    text_config = TextConfig(
+        tag=text_tag,
+        class_name=text_class_name,
+        class_contains=text_class_contains,
+        id=text_id,
+        role=text_role,
+        selector=text_selector,
+        nesting=text_nesting,
+        format=output_format,
+    )
+
+    def find_links(html: str) -> List[Link]:
+        # extract links from the base page's link containers. Without a CSS
+        # selector they are streamed out of the body without building a tree
+        if config.selector:
+            return extract_links(parse_html(html, parser), url, config=config)
+        return list(iter_links(chunk_text(html), url, config))
+
     # 3. GET LINKS FROM BASE PAGE
     # Get links using ScrapingAnt API or requests
-    if not client:
-        if use_scraping_ant:
-            raise click.ClickException("ScrapingAnt client not initialized")
+    base_credits = None
+    try:
+        if ant is not None:
+            # Rendered only if the plain HTML has no links
+            ant_response, links = asyncio.run(
+                scheduler.call(
+                    url,
+                    lambda: ant.fetch(
+                        url,
+                        lambda html: asyncio.to_thread(find_links, html),
+                        is_empty=lambda found: not found,
+                    ),
+                )
+            )
+            response = MockResponse(content=ant_response.content)
+            base_credits = ant_response.credits
         else:
-            # html_content, soup = get_content_with_requests(url)
-            response = client.general_request(url)
-    else:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36"
-        }
-        response = client.general_request(url, kwargs=dict(headers=headers))
+            headers = {
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36"
+            }
+            response = asyncio.run(
+                scheduler.call(
+                    url,
+                    lambda: asyncio.to_thread(
+                        client.general_request, url, kwargs=dict(headers=headers)
+                    ),
+                )
+            )
+            links = find_links(response.content)
+    except DisallowedByRobots as e:
+        raise click.ClickException(f"{e}; pass --ignore-robots to crawl it anyway")
 
     # Save response for debugging
-    if html_dir:
+    debug_path: Optional[Union[str, Path]]
+    if html_archive is not None:
+        debug_path = html_archive.put(url, response.content)
+    elif html_dir:
         debug_path = save_scraping_response(
             response=response,
             title="BASE_" + base_html_title,
@@ -141,64 +440,640 @@ def main(
     # Log the base URL scraping
     base_page = ScrapingPage.create(
         url=url,
-        html_path=str(debug_path) if html_dir else None,
+        html_path=str(debug_path) if debug_path else None,
         title=base_html_title,
+        credits=base_credits,
     )
-    append_to_page_log(log_path, base_page)
-    processed_pages.append(base_page)
+    page_log.append(base_page)
 
-    # parse it as a BeautifulSoup object
-    soup = BeautifulSoup(response.content, "html.parser")
+    # Incremental runs also crawl the sitemap, whose lastmod tells which
+    # known pages changed without requesting them
+    lastmods = (
+        asyncio.run(load_sitemap(fetcher, scheduler, url)) if incremental else {}
+    )
+    links.extend(
+        Link(
+            title=create_title_from_url(page_url),
+            href=page_url,
+            text="",
+            domain=urlparse(page_url).netloc,
+        )
+        for page_url in lastmods
+    )
 
-    config = LinkConfig(
-        tag=link_tag,
-        class_name=link_class_name,
-        class_contains=link_class_contains,
-        id=link_id,
+    if not links:
+        raise click.ClickException(
+            f"No navigation links found on the page.\nCheck: {debug_path}"
+        )
+
+    # 4. SAVE CONTENT FROM EACH LINK, CRAWLING BREADTH-FIRST UP TO --max-depth
+    frontier.mark_seen(url)
+
+    def is_done(href: str) -> bool:
+        if incremental:
+            return not page_log.needs_refresh(href, lastmods.get(href))
+        # With --revalidate, known pages are re-requested conditionally
+        return not revalidate and page_log.should_skip(href, overwrite)
+
+    def enqueue(discovered: List[Link], depth: int) -> int:
+        added = 0
+        for link in discovered:
+            if not in_scope(link.href, url, scope) or link.href in frontier:
+                continue
+            if is_done(link.href):
+                frontier.mark_seen(link.href)
+                continue
+            added += frontier.add(link, depth)
+        return added
+
+    if isinstance(frontier, Frontier) and resuming:
+        # Pages finished after the last checkpoint of a killed crawl are
+        # still queued, but already logged (and written to the output)
+        dropped = frontier.drop_done(is_done)
+        if dropped:
+            logger.info(f"Dropped {dropped} queued pages the crawl log has as done")
+    if work_queue is not None:
+        # Registers the worker and keeps its leases alive until it stops
+        work_queue.start()
+    enqueue(links, depth=1)
+    if batch_site is not None:
+        # One bar per site of the batch, each on its own line
+        progress = tqdm(
+            total=len(frontier), desc=batch_site.name, position=batch_site.position
+        )
+    else:
+        progress = tqdm(total=len(frontier), desc="Extracting content")
+
+    # Navigation, footers and the like are written for the first page only
+    boilerplate = BoilerplateFilter() if dedupe_boilerplate else None
+
+    # Bodies are only kept past parsing when they are saved
+    keep_html = html_dir is not None or html_archive is not None
+
+    # With --parse-workers, fetch threads only download and worker processes
+    # parse, so extraction is not limited to one core by the GIL
+    parse_pool = None
+    if parse_workers:
+        parse_pool = ParsePool(
+            text_config,
+            parser=parser,
+            link_config=config,
+            max_depth=max_depth,
+            workers=parse_workers,
+            keep_html=keep_html,
+        )
+        click.get_current_context().call_on_close(parse_pool.close)
+
+    # With --format markdown, matched elements are converted on worker
+    # processes. Conversions are memoized by the hash of the element's HTML
+    # across runs, so a re-crawl only converts what changed
+    markdown_pool = None
+    if output_format == "markdown":
+        markdown_cache = ResponseCache(domain_dir / "markdown", ttl=None)
+        click.get_current_context().call_on_close(markdown_cache.close)
+        markdown_pool = MarkdownPool(markdown_cache, workers=markdown_workers)
+        click.get_current_context().call_on_close(markdown_pool.close)
+
+    def fetch_page(item: FrontierItem) -> PageResult:
+        if parse_pool is not None:
+            html_content = fetch_html(
+                item.link,
+                use_scraping_ant=use_scraping_ant,
+                client=client if use_scraping_ant else None,
+                fetcher=fetcher,
+            )
+            return PageResult(link=item.link, html_content=html_content)
+        return scrape_page(
+            item.link,
+            text_config,
+            use_scraping_ant=use_scraping_ant,
+            client=client if use_scraping_ant else None,
+            fetcher=fetcher,
+            parser=parser,
+            follow_links=item.depth < max_depth,
+            link_config=config,
+            keep_html=keep_html,
+        )
+
+    async def fetch_page_with_ant(item: FrontierItem) -> PageResult:
+        assert ant is not None
+        return await ant.scrape_page(
+            item.link,
+            text_config,
+            parser=parser,
+            depth=item.depth,
+            follow_links=item.depth < max_depth,
+            link_config=config,
+            keep_html=keep_html,
+            parse_pool=parse_pool,
+        )
+
+    def handle_page(result: PageResult) -> None:
+        # Runs in link order on a single thread, so output and log stay ordered
+        progress.update(1)
+        for stage, seconds in result.timings.items():
+            metrics.observe(stage, seconds)
+        try:
+            if result.error is not None:
+                raise result.error
+            with metrics.timer("write"):
+                status = write_page(
+                    result,
+                    writer,
+                    html_dir,
+                    page_log=page_log,
+                    overwrite=overwrite,
+                    validators=validators,
+                    archive=html_archive,
+                    skip_unchanged=incremental,
+                    boilerplate=boilerplate,
+                    sinks=sinks,
+                )
+            metrics.record_page(status)
+            if result.links:
+                added = enqueue(result.links, depth=result.depth + 1)
+                if progress.total is not None:
+                    progress.total += added
+                    progress.refresh()
+        except (DisallowedByRobots, ResponseRejected) as e:
+            logger.info(str(e))
+            status = "disallowed" if isinstance(e, DisallowedByRobots) else "skipped"
+            metrics.record_page(status)
+            page_log.append(
+                ScrapingPage.create(
+                    url=result.link.href,
+                    html_path=None,
+                    title=result.link.title,
+                    status=status,
+                )
+            )
+        except Exception as e:
+            # Log failed scraping
+            logger.error(f"Failed to scrape {result.link.href}: {str(e)}")
+            metrics.record_page("failed")
+            metrics.record_error(e)
+            page_log.append(
+                ScrapingPage.create(
+                    url=result.link.href,
+                    html_path=None,
+                    title=result.link.title,
+                    status="failed",
+                )
+            )
+
+    orchestrator = CrawlOrchestrator(
+        fetch=fetch_page_with_ant if ant is not None else fetch_page,
+        handle=handle_page,
+        concurrency=concurrency,
+        per_host_limit=per_host_limit,
+        max_pages=max_pages,
+        scheduler=scheduler,
+        # The ScrapingAnt path runs its own extraction, rendering on empty pages
+        parse_pool=parse_pool if ant is None else None,
+        metrics=metrics,
+        markdown_pool=markdown_pool,
+        limits=batch_site.limits if batch_site is not None else None,
     )
 
+    # Periodic summary in the log, plus the Prometheus file/endpoint if asked
+    reporter = None
+    if metrics_interval:
+        reporter = MetricsReporter(metrics, metrics_interval, prometheus_file)
+        reporter.start()
+    server = None
+    if prometheus_port:
+        server = serve_prometheus(metrics, prometheus_port, host=metrics_host)
+    profiler = cProfile.Profile() if profile else None
+
+    try:
+        if profiler is not None:
+            profiler.enable()
+        while True:
+            fetched = orchestrator.run(frontier)
+            if work_queue is None or work_queue.exhausted:
+                break
+            if orchestrator.max_pages is not None:
+                orchestrator.max_pages -= fetched
+                if orchestrator.max_pages <= 0:
+                    break
+            # Pages other workers are fetching may link to more work, and
+            # the leases of crashed workers expire back into the queue
+            time.sleep(QUEUE_POLL_SECONDS)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile_path = domain_dir / f"{output_name}.prof"
+            profiler.dump_stats(profile_path)
+            top = io.StringIO()
+            pstats.Stats(profiler, stream=top).sort_stats("cumulative").print_stats(25)
+            logger.info(f"Profile saved to {profile_path}\n{top.getvalue()}")
+        progress.close()
+        if isinstance(frontier, WorkQueue):
+            # Unfinished URLs go straight back to the other workers
+            frontier.stop()
+            logger.info(
+                f"Worker {frontier.worker_id} crawled {frontier.completed} "
+                f"pages; queue: {frontier.counts()}"
+            )
+        # Keep the frontier on disk only while there is work left to resume
+        elif frontier.exhausted:
+            frontier.clear()
+        else:
+            frontier.save()
+            logger.info(f"Crawl stopped with {len(frontier)} pages left to crawl")
+        validators.save()
+        fetcher.close()
+
+        if reporter is not None:
+            reporter.stop()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        metrics_path = domain_dir / f"{output_name}.metrics.json"
+        metrics.write_json(metrics_path)
+        if prometheus_file is not None:
+            metrics.write_prometheus(prometheus_file)
+        logger.info(f"Metrics: {metrics.summary()} (saved to {metrics_path})")
+        if boilerplate is not None:
+            logger.info(f"Dropped {boilerplate.dropped} repeated boilerplate blocks")
+
+
+@cli.command("reextract")
+@click.argument("url", type=str)
+@create_reextract_options
+def reextract_command(
+    url: str,
+    output_dir: Path,
+    text_tag: str,
+    text_class_name: Optional[str],
+    text_class_contains: Optional[str],
+    text_id: Optional[str],
+    text_role: Optional[str],
+    text_selector: Optional[str],
+    text_nesting: str,
+    output_format: str,
+    dedupe_boilerplate: bool,
+    parser: str,
+    state_store: Optional[str],
+    workers: Optional[int],
+) -> None:
+    """
+    Re-extract text from saved HTML without fetching anything.
+
+    Reads the pages saved by a previous `crawl URL --save-html` (or --archive)
+    run and regenerates its combined .txt output with the given text options.
+    """
+    from scraper.reextract import find_saved_pages, reextract
+
+    domain_dir = output_dir / create_dir_name_from_netloc(url)
+    if not domain_dir.exists():
+        raise click.ClickException(f"Nothing has been crawled into {domain_dir}")
+
+    try:
+        parser = resolve_parser(parser)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    try:
+        page_log = find_page_log(domain_dir, state_store)
+    except FileNotFoundError as e:
+        if state_store is not None or not (domain_dir / "html").exists():
+            raise click.ClickException(str(e))
+        # Only loose .html files to go by; the empty log is never written
+        page_log = PageLog(domain_dir / "logs.csv")
+    try:
+        pages = find_saved_pages(page_log, domain_dir / "html", base_url=url)
+    finally:
+        page_log.close()
+    if not pages:
+        raise click.ClickException(f"No saved HTML found in {domain_dir}")
+
     text_config = TextConfig(
         tag=text_tag,
         class_name=text_class_name,
         class_contains=text_class_contains,
         id=text_id,
         role=text_role,
+        selector=text_selector,
+        nesting=text_nesting,
+        format=output_format,
+    )
+    output_path = domain_dir / f"{create_title_from_url(url)}.txt"
+    written = reextract(
+        pages,
+        output_path,
+        text_config,
+        parser=parser,
+        workers=workers,
+        archive_dir=domain_dir / "archive",
+        dedupe_boilerplate=dedupe_boilerplate,
+        markdown_dir=domain_dir / "markdown" if output_format == "markdown" else None,
     )
+    logger.info(f"Re-extracted {written} of {len(pages)} pages into {output_path}")
 
-    # extract links from the base page
-    links = extract_links(soup, url)
 
-    if not links:
-        raise click.ClickException(
-            f"No navigation links found on the page.\nCheck: {debug_path}"
-        )
+@cli.command("migrate")
+@click.argument(
+    "csv_paths",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+def migrate(csv_paths: tuple[Path, ...]) -> None:
+    """Import logs.csv files into logs.sqlite next to each of them."""
+    for csv_path in csv_paths:
+        db_path = csv_path.with_name("logs.sqlite")
+        try:
+            imported = migrate_csv_log(csv_path, db_path)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        logger.info(f"Imported {imported} rows from {csv_path} into {db_path}")
+
 
-    # 4. SAVE CONTENT FROM EACH LINK
-    for link in tqdm(links, desc="Extracting content"):
+def _site_context(site: BatchSite, base_dir: Path) -> click.Context:
+    """Build the `crawl` context of one batch site, validating its options."""
+    ctx = main.make_context(site.name, [site.url], obj=site)
+    params = {param.name: param for param in main.params}
+    for key, value in site.options.items():
+        param = params.get(key)
+        if param is None or param.name == "url":
+            raise click.UsageError(f"Site {site.name}: unknown crawl option {key!r}")
+        if isinstance(param.type, click.Path) and value is not None:
+            # Relative paths are relative to the job file
+            value = base_dir / Path(value).expanduser()
+        if param.multiple and isinstance(value, str):
+            value = [value]
         try:
-            save_content(
-                link,
-                output_path,
-                text_config,
-                html_dir,
-                use_scraping_ant=use_scraping_ant,
-                client=client if use_scraping_ant else None,
-                processed_pages=processed_pages,
-                log_path=log_path,
-                overwrite=overwrite,
-            )
+            ctx.params[key] = param.type_cast_value(ctx, value)
+        except click.BadParameter as e:
+            raise click.UsageError(f"Site {site.name}: {key}: {e.format_message()}")
+    return ctx
+
+
+@cli.command("batch")
+@click.argument(
+    "job_file", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    help="Pages fetched in parallel across all sites (job file's `concurrency`, else 32)",
+)
+@click.option(
+    "--per-domain",
+    type=click.IntRange(min=1),
+    help="Pages fetched in parallel from one domain across all sites (job file's `per_domain`, else 4)",
+)
+@click.option(
+    "--max-sites",
+    type=click.IntRange(min=1),
+    help="Sites crawled at the same time. Defaults to all of them",
+)
+@click.option(
+    "--summary",
+    "summary_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Also write the per-site summary to this JSON file",
+)
+def batch(
+    job_file: Path,
+    concurrency: Optional[int],
+    per_domain: Optional[int],
+    max_sites: Optional[int],
+    summary_path: Optional[Path],
+) -> None:
+    """
+    Crawl every site of a TOML or YAML job file in one process.
+
+    Each site has its own URL and crawl options. All sites run at the same
+    time, sharing one budget of parallel fetches and a cap per domain, so the
+    batch takes about as long as its slowest site.
+    """
+    try:
+        job = load_job(job_file)
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    limits = BatchLimits(
+        concurrency=concurrency or job.concurrency or 32,
+        per_domain=per_domain or job.per_domain or 4,
+    )
+    # Every site's options are checked before the first crawl starts
+    contexts = []
+    for site in job.sites:
+        site.limits = limits
+        contexts.append(_site_context(site, job_file.parent))
+    logger.info(
+        f"Crawling {len(job.sites)} sites with {limits.concurrency} parallel "
+        f"fetches, at most {limits.per_domain} per domain"
+    )
+
+    finished = itertools.count(1)
+
+    def run_site(site: BatchSite, ctx: click.Context) -> None:
+        started = time.monotonic()
+        try:
+            with ctx:
+                main.invoke(ctx)
+        except click.ClickException as e:
+            site.error = e.format_message()
         except Exception as e:
-            # Log failed scraping
-            logger.error(f"Failed to scrape {link.href}: {str(e)}")
-            page_entry = ScrapingPage.create(
-                url=link.href,
-                html_path=None,
-                title=link.title,
-                status="failed",
+            logger.exception(f"Crawl of {site.name} failed")
+            site.error = f"{type(e).__name__}: {e}"
+        site.elapsed = time.monotonic() - started
+        outcome = f"failed: {site.error}" if site.error else "done"
+        logger.info(
+            f"[{next(finished)}/{len(job.sites)}] {site.name} {outcome} "
+            f"in {site.elapsed:.1f}s"
+        )
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(
+        max_workers=max_sites or len(job.sites), thread_name_prefix="batch"
+    ) as pool:
+        list(pool.map(run_site, job.sites, contexts))
+    elapsed = time.monotonic() - started
+
+    report = "\n".join(iter_summary_lines(job.sites))
+    logger.info(f"Batch finished in {elapsed:.1f}s:\n{report}")
+    if summary_path is not None:
+        summary = {
+            "elapsed_seconds": round(elapsed, 3),
+            "sites": [site.summary() for site in job.sites],
+        }
+        summary_path.write_text(json.dumps(summary, indent=2))
+
+    failed = [site.name for site in job.sites if site.error]
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {len(job.sites)} sites failed: {', '.join(failed)}"
+        )
+
+
+@cli.command("coordinate", context_settings={"ignore_unknown_options": True})
+@click.argument("url", type=str)
+@click.option(
+    "--queue",
+    "queue_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    required=True,
+    help="SQLite work queue to create or join, on a filesystem every worker can reach",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=0),
+    default=os.cpu_count() or 1,
+    show_default="CPU count",
+    help="Worker processes to run on this machine; 0 only reports on workers started elsewhere",
+)
+@click.option(
+    "--shards",
+    type=click.IntRange(min=1),
+    default=64,
+    show_default=True,
+    help="Host shards of a new queue",
+)
+@click.option(
+    "--nfs",
+    is_flag=True,
+    help="Create the queue for workers on several nodes: the queue and the shared logs.sqlite use a rollback journal, as WAL only works within one host",
+)
+@click.option(
+    "--max-restarts",
+    type=click.IntRange(min=0),
+    default=3,
+    show_default=True,
+    help="Times a crashed worker is restarted",
+)
+@click.option(
+    "--status-interval",
+    type=click.FloatRange(min=1),
+    default=10.0,
+    show_default=True,
+    help="Seconds between progress reports",
+)
+@click.argument("crawl_args", nargs=-1, type=click.UNPROCESSED)
+def coordinate(
+    url: str,
+    queue_path: Path,
+    workers: int,
+    shards: int,
+    nfs: bool,
+    max_restarts: int,
+    status_interval: float,
+    crawl_args: tuple[str, ...],
+) -> None:
+    """
+    Crawl URL with worker processes sharing one work queue.
+
+    Creates the queue and runs WORKERS `crawl URL --queue QUEUE` processes,
+    passing them any other CRAWL_ARGS. The first worker seeds the queue from
+    the base page before the others start. Crashed workers are restarted,
+    and the URLs they had leased go to the other workers once their lease
+    expires. Workers on other nodes join by running the same `crawl` command
+    against the queue file.
+    """
+    work_queue = WorkQueue(
+        queue_path, worker_id="coordinator", shards=shards, wal=not nfs
+    )
+
+    def start_worker(slot: int) -> subprocess.Popen:
+        command = [
+            sys.executable,
+            str(Path(__file__).resolve()),
+            "crawl",
+            url,
+            "--queue",
+            str(queue_path),
+            "--worker-id",
+            f"{default_worker_id()}-{slot}",
+            *crawl_args,
+        ]
+        return subprocess.Popen(command)
+
+    processes: dict[int, subprocess.Popen] = {}
+    restarts = dict.fromkeys(range(workers), 0)
+    failed: list[int] = []
+    # One worker fetches the base page; the rest start once it seeded the queue
+    if workers:
+        processes[0] = start_worker(0)
+    waiting = list(range(1, workers))
+    logger.info(f"Coordinating {workers} local workers on {queue_path}")
+
+    def remote_work_left() -> bool:
+        return not workers and not (work_queue.seeded and work_queue.exhausted)
+
+    try:
+        while processes or remote_work_left():
+            time.sleep(QUEUE_POLL_SECONDS if waiting else status_interval)
+            if waiting and work_queue.seeded:
+                for slot in waiting:
+                    processes[slot] = start_worker(slot)
+                waiting = []
+
+            for slot, process in list(processes.items()):
+                returncode = process.poll()
+                if returncode is None:
+                    continue
+                del processes[slot]
+                if returncode == 0:
+                    continue
+                if restarts[slot] < max_restarts and not work_queue.exhausted:
+                    restarts[slot] += 1
+                    logger.warning(
+                        f"Worker {slot} exited with {returncode}, restarting "
+                        f"({restarts[slot]}/{max_restarts})"
+                    )
+                    processes[slot] = start_worker(slot)
+                else:
+                    logger.error(f"Worker {slot} exited with {returncode}")
+                    failed.append(slot)
+            if not waiting:
+                logger.info(
+                    f"Queue: {work_queue.counts()}, "
+                    f"{len(processes)} local workers running"
+                )
+    finally:
+        # Interrupted workers hand their leases back before exiting
+        for process in processes.values():
+            process.wait()
+        counts = work_queue.counts()
+        report = "\n".join(
+            f"{worker['id']:30} {worker['completed']:8} pages"
+            for worker in work_queue.workers()
+        )
+        work_queue.close()
+
+    logger.info(f"Crawl finished: {counts}\n{report}")
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} of {workers} workers failed; run `coordinate` again "
+            "to finish the queue"
+        )
+
+
+@cli.command("stats")
+@click.argument(
+    "db_path", type=click.Path(exists=True, dir_okay=False, path_type=Path)
+)
+@click.option("--max-attempts", default=3, show_default=True)
+def stats(db_path: Path, max_attempts: int) -> None:
+    """Show per-domain stats, failed pages and pages to retry from a logs.sqlite."""
+    page_log = SQLitePageLog(db_path)
+    try:
+        for row in page_log.domain_stats():
+            click.echo(
+                f"{row['domain']:30} {row['pages']:8} pages "
+                f"{row['succeeded']:8} ok {row['failed']:8} failed "
+                f"{row['credits']:8} credits (last {row['last_scraped']})"
             )
-            append_to_page_log(log_path, page_entry)
-            processed_pages.append(page_entry)
+        for page in page_log.failed_pages():
+            click.echo(f"FAILED  {page.url}")
+        for page in page_log.pages_to_retry(max_attempts):
+            click.echo(f"RETRY   {page.url}")
+    finally:
+        page_log.close()
 
 
 if __name__ == "__main__":
-    main()
+    cli()
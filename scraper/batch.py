@@ -0,0 +1,247 @@
+import asyncio
+import importlib.util
+import threading
+import tomllib
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import urlparse
+
+if TYPE_CHECKING:
+    from .metrics import CrawlMetrics
+
+
+class SharedLimit:
+    """Counting semaphore shared by crawls running on different event loops.
+
+    asyncio.Semaphore belongs to a single event loop, but every site of a
+    batch crawls on its own thread and loop. Waiters are woken on their own
+    loop with `call_soon_threadsafe`, and a released slot is handed straight
+    to the longest waiting crawl, so no site starves.
+
+    Args:
+        value: Number of slots
+    """
+
+    def __init__(self, value: int) -> None:
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = (
+            deque()
+        )
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Granted before the cancellation arrived: pass the slot on.
+            # A cancelled future is released by `_grant` instead
+            if not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._value += 1
+                return
+            loop, future = self._waiters.popleft()
+        loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class BatchLimits:
+    """Fetch limits shared by all sites of a batch.
+
+    Args:
+        concurrency: Maximum number of fetches in flight across all sites
+        per_domain: Maximum number of fetches in flight against one domain,
+            whichever sites its pages belong to
+    """
+
+    def __init__(self, concurrency: int, per_domain: int) -> None:
+        self.concurrency = concurrency
+        self.per_domain = per_domain
+        self._total = SharedLimit(concurrency)
+        self._domains: defaultdict[str, SharedLimit] = defaultdict(
+            lambda: SharedLimit(per_domain)
+        )
+        self._domains_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def slot(self, domain: str) -> AsyncIterator[None]:
+        """Hold a fetch slot for a domain and one from the global budget."""
+        with self._domains_lock:
+            domain_limit = self._domains[domain]
+        # The domain is waited for first, so a crawl queued behind a busy
+        # domain does not sit on a global slot
+        await domain_limit.acquire()
+        try:
+            await self._total.acquire()
+            try:
+                yield
+            finally:
+                self._total.release()
+        finally:
+            domain_limit.release()
+
+
+@dataclass
+class BatchSite:
+    """One site of a batch job and the outcome of its crawl"""
+
+    name: str
+    url: str
+    options: Dict[str, Any]
+    position: int = 0
+    limits: Optional[BatchLimits] = None
+    metrics: Optional["CrawlMetrics"] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        snapshot = self.metrics.to_dict() if self.metrics is not None else {}
+        return {
+            "name": self.name,
+            "url": self.url,
+            "status": "failed" if self.error else "done",
+            "error": self.error,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "pages": snapshot.get("pages", {}),
+            "bytes": snapshot.get("bytes", 0),
+            "retries": snapshot.get("retries", 0),
+            "errors": snapshot.get("errors", {}),
+        }
+
+
+@dataclass
+class BatchJob:
+    """A parsed job file"""
+
+    sites: List[BatchSite]
+    concurrency: Optional[int] = None
+    per_domain: Optional[int] = None
+
+
+def _normalize(options: Dict[str, Any]) -> Dict[str, Any]:
+    """Accept option names as in the CLI (`text-tag`) or as Python (`text_tag`)."""
+    return {key.replace("-", "_"): value for key, value in options.items()}
+
+
+def _read_job_file(path: Path) -> Dict[str, Any]:
+    if path.suffix in (".yaml", ".yml"):
+        if importlib.util.find_spec("yaml") is None:
+            raise ValueError("YAML job files need PyYAML: pip install pyyaml")
+        import yaml  # type: ignore
+
+        with open(path) as f:
+            try:
+                data = yaml.safe_load(f) or {}
+            except yaml.YAMLError as e:
+                raise ValueError(f"Cannot parse {path}: {e}")
+    else:
+        with open(path, "rb") as f:
+            try:
+                data = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"Cannot parse {path}: {e}")
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a mapping at the top level")
+    return data
+
+
+def load_job(path: Path) -> BatchJob:
+    """
+    Read a TOML or YAML job file.
+
+    The file has an optional `batch` table with the global `concurrency` and
+    `per_domain` limits, an optional `defaults` table of crawl options shared
+    by all sites, and a `sites` list. Every site needs a `url` and may set a
+    `name` (the URL's host by default) and any crawl option, which overrides
+    the defaults:
+
+        [batch]
+        concurrency = 32
+        per_domain = 4
+
+        [defaults]
+        output_dir = "docs"
+        max_depth = 2
+
+        [[sites]]
+        url = "https://docs.example.com/"
+        text_selector = "main article"
+
+    Raises:
+        ValueError: If the file cannot be parsed, has unknown batch settings
+            or a site has no URL
+    """
+    data = _read_job_file(path)
+    settings = _normalize(data.get("batch") or {})
+    unknown = set(settings) - {"concurrency", "per_domain"}
+    if unknown:
+        raise ValueError(f"Unknown batch settings in {path}: {sorted(unknown)}")
+    defaults = _normalize(data.get("defaults") or {})
+    sites = []
+    for position, entry in enumerate(data.get("sites") or []):
+        options = {**defaults, **_normalize(entry)}
+        url = options.pop("url", None)
+        if not url:
+            raise ValueError(f"Site {position + 1} in {path} has no url")
+        name = str(options.pop("name", None) or urlparse(url).netloc)
+        sites.append(BatchSite(name=name, url=url, options=options, position=position))
+    if not sites:
+        raise ValueError(f"{path} lists no sites")
+
+    names = [site.name for site in sites]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Site names must be unique, repeated: {sorted(duplicates)}")
+
+    return BatchJob(
+        sites=sites,
+        concurrency=settings.get("concurrency"),
+        per_domain=settings.get("per_domain"),
+    )
+
+
+def iter_summary_lines(sites: List[BatchSite]) -> Iterator[str]:
+    """Render the consolidated report of a batch, one line per site."""
+    width = max(len(site.name) for site in sites)
+    for site in sites:
+        summary = site.summary()
+        pages = summary["pages"]
+        if site.error:
+            outcome = f"FAILED: {site.error}"
+        else:
+            outcome = ", ".join(f"{count} {status}" for status, count in pages.items())
+        yield f"{site.name:{width}}  {site.elapsed:8.1f}s  {outcome or 'no pages'}"
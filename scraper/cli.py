@@ -1,11 +1,45 @@
 # scraper/cli.py
 from pathlib import Path
+from typing import Any, Callable, TypeVar
 
 import click
 
+from scraper.config import (
+    DEFAULT_MAX_BYTES,
+    HTML_CONTENT_TYPES,
+    NESTING_MODES,
+    OUTPUT_FORMATS,
+    RENDER_MODES,
+)
+from scraper.frontier import SCOPES
+from scraper.parsers import PARSER_CHOICES
+from scraper.sinks import SINK_CHOICES
+from scraper.state_store import STATE_STORES
 from scraper.utils import get_default_downloads_dir
 
 
+# A command function, or a command, being decorated with options
+FC = TypeVar("FC", bound=Callable[..., Any])
+
+
+class DefaultCommandGroup(click.Group):
+    """Command group that runs `default_command` when no subcommand is named.
+
+    This keeps `main.py URL [OPTIONS]` working next to subcommands such as
+    `main.py migrate`.
+    """
+
+    def __init__(self, *args, default_command: str, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        is_subcommand = args and args[0] in self.commands
+        if args and not is_subcommand and args[0] not in ctx.help_option_names:
+            args.insert(0, self.default_command)
+        return super().parse_args(ctx, args)
+
+
 def format_options_overview(**kwargs) -> str:
     """Format all options into a single string overview."""
     options = ["\nRunning scraper with options:", "---------------------------"]
@@ -14,6 +48,98 @@ def format_options_overview(**kwargs) -> str:
     return "\n".join(options)
 
 
+def output_dir_option():
+    """Option for the directory the domain folders are created in."""
+    return click.option(
+        "--output-dir",
+        type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
+        default=get_default_downloads_dir(),
+        show_default="Downloads folder",
+        help="Directory to save the output file.",
+    )
+
+
+def parser_option():
+    """Option for the HTML parser backend."""
+    return click.option(
+        "--parser",
+        type=click.Choice(PARSER_CHOICES),
+        default="auto",
+        show_default=True,
+        help="HTML parser backend. 'auto' picks selectolax, then lxml, then html.parser",
+    )
+
+
+def state_store_option():
+    """Option for the crawl log backend."""
+    return click.option(
+        "--state-store",
+        type=click.Choice(STATE_STORES),
+        default="csv",
+        show_default=True,
+        help="Where the crawl log is kept: logs.csv, or logs.sqlite for large or parallel crawls",
+    )
+
+
+def text_options() -> list:
+    """Options building the TextConfig used to extract content."""
+    return [
+        click.option(
+            "--text-tag",
+            default="div",
+            help="HTML tag to use for extracting text content from linked pages (e.g., 'article' or 'main')",
+        ),
+        click.option(
+            "--text-class-name",
+            help="Exact class name to match when extracting text content (e.g., 'content' or 'article-body')",
+        ),
+        click.option(
+            "--text-class-contains",
+            help="String that should be contained in the class name when extracting text content",
+        ),
+        click.option(
+            "--text-id",
+            help="ID of the element containing the main text content (e.g., 'main-content')",
+        ),
+        click.option(
+            "--text-role",
+            help="ARIA role attribute of the text content element (e.g., 'main' or 'article')",
+        ),
+        click.option(
+            "--text-selector",
+            help="CSS selector for the text content elements (e.g., 'main article > div.prose'). Overrides the other --text-* options",
+        ),
+        click.option(
+            "--text-nesting",
+            type=click.Choice(NESTING_MODES),
+            default="all",
+            show_default=True,
+            help="Which nested matches to extract: all of them (nested text repeats per matching ancestor), only the outermost or only the innermost",
+        ),
+        click.option(
+            "--format",
+            "output_format",
+            type=click.Choice(OUTPUT_FORMATS),
+            default="text",
+            show_default=True,
+            help="Write the matched elements as plain text, or converted to Markdown keeping headings, lists and code blocks",
+        ),
+        click.option(
+            "--dedupe-boilerplate",
+            is_flag=True,
+            help="Drop text blocks already written for an earlier page, such as navigation, footers and cookie banners",
+        ),
+    ]
+
+
+def apply_options(command: FC, options: list) -> FC:
+    """Apply a list of click options to a command."""
+    for option in options:
+        command = option(command)
+
+    return command
+
+
 def create_cli_options(command: click.Command) -> click.Command:
     """Add CLI options to the command."""
     options = [
@@ -22,13 +148,7 @@ def create_cli_options(command: click.Command) -> click.Command:
             envvar="SCRAPING_ANT_API_KEY",
             help="ScrapingAnt API key. Can also be set via SCRAPING_ANT_API_KEY environment variable.",
         ),
-        click.option(
-            "--output-dir",
-            type=click.Path(file_okay=False, dir_okay=True, path_type=Path),
-            default=get_default_downloads_dir(),
-            show_default="Downloads folder",
-            help="Directory to save the output file.",
-        ),
+        output_dir_option(),
         # Link extraction options (for finding navigation links on the base page)
         click.option(
             "--link-tag",
@@ -48,11 +168,35 @@ def create_cli_options(command: click.Command) -> click.Command:
             "--link-id",
             help="ID of the element containing navigation links (e.g., 'main-navigation')",
         ),
+        click.option(
+            "--link-selector",
+            help="CSS selector for the elements containing navigation links (e.g., 'aside nav.sidebar'). Overrides the other --link-* options",
+        ),
+        click.option(
+            "--link-include",
+            multiple=True,
+            help="Regular expression a link URL must match to be followed. Can be repeated",
+        ),
+        click.option(
+            "--link-exclude",
+            multiple=True,
+            help="Regular expression excluding matching link URLs (e.g., '/(de|fr|ja)/'). Can be repeated",
+        ),
+        click.option(
+            "--same-origin",
+            is_flag=True,
+            help="Only follow links with the same scheme and host as the page they are on",
+        ),
         click.option(
             "--save-html",
             is_flag=True,
             help="Save HTML content for each scraped page",
         ),
+        click.option(
+            "--archive",
+            is_flag=True,
+            help="Save raw HTML into a compressed, deduplicated archive in <domain>/archive instead of one file per page",
+        ),
         click.option(
             "--overwrite",
             is_flag=True,
@@ -63,31 +207,271 @@ def create_cli_options(command: click.Command) -> click.Command:
             is_flag=True,
             help="Use ScrapingAnt for content scraping (requires API key)",
         ),
-        # Text extraction options (for extracting content from linked pages)
         click.option(
-            "--text-tag",
-            default="div",
-            help="HTML tag to use for extracting text content from linked pages (e.g., 'article' or 'main')",
+            "--scraping-ant-concurrency",
+            type=click.IntRange(min=1),
+            default=1,
+            show_default=True,
+            help="Maximum parallel ScrapingAnt requests; keep within your plan's concurrency limit",
         ),
         click.option(
-            "--text-class-name",
-            help="Exact class name to match when extracting text content (e.g., 'content' or 'article-body')",
+            "--render",
+            type=click.Choice(RENDER_MODES),
+            default="auto",
+            show_default=True,
+            help="Render JavaScript with ScrapingAnt's browser: auto renders only pages with nothing to extract",
         ),
+        *text_options(),
+        # Crawl engine options
         click.option(
-            "--text-class-contains",
-            help="String that should be contained in the class name when extracting text content",
+            "--concurrency",
+            type=click.IntRange(min=1),
+            default=8,
+            show_default=True,
+            help="Maximum number of pages fetched in parallel",
         ),
         click.option(
-            "--text-id",
-            help="ID of the element containing the main text content (e.g., 'main-content')",
+            "--per-host-limit",
+            type=click.IntRange(min=1),
+            default=6,
+            show_default=True,
+            help="Maximum number of parallel connections to a single host",
         ),
         click.option(
-            "--text-role",
-            help="ARIA role attribute of the text content element (e.g., 'main' or 'article')",
+            "--parse-workers",
+            type=click.IntRange(min=0),
+            default=0,
+            show_default=True,
+            help="Worker processes that parse pages while the threads keep fetching (0 parses on the fetch threads)",
+        ),
+        click.option(
+            "--markdown-workers",
+            type=click.IntRange(min=1),
+            help="Worker processes converting pages with --format markdown. Defaults to one per CPU core",
+        ),
+        # Politeness options
+        click.option(
+            "--rate",
+            type=click.FloatRange(min=0, min_open=True),
+            default=5.0,
+            show_default=True,
+            help="Maximum requests per second against a single host",
+        ),
+        click.option(
+            "--burst",
+            type=click.FloatRange(min=1),
+            default=2.0,
+            show_default=True,
+            help="Requests that may be sent back to back to a single host",
+        ),
+        click.option(
+            "--max-retries",
+            type=click.IntRange(min=0),
+            default=3,
+            show_default=True,
+            help="Retries of a timed out, refused or throttled (429/5xx) request",
+        ),
+        click.option(
+            "--respect-robots/--ignore-robots",
+            default=True,
+            show_default=True,
+            help="Skip pages disallowed by robots.txt and honor its Crawl-delay",
+        ),
+        # HTTP options
+        click.option(
+            "--connect-timeout",
+            type=click.FloatRange(min=0, min_open=True),
+            default=10.0,
+            show_default=True,
+            help="Seconds to wait for a connection to a server",
+        ),
+        click.option(
+            "--read-timeout",
+            type=click.FloatRange(min=0, min_open=True),
+            default=30.0,
+            show_default=True,
+            help="Seconds to wait for a server to send data",
+        ),
+        click.option(
+            "--max-bytes",
+            type=click.IntRange(min=0),
+            default=DEFAULT_MAX_BYTES,
+            show_default=True,
+            help="Skip pages whose body is larger than this many bytes (0 for no limit)",
+        ),
+        click.option(
+            "--content-type",
+            multiple=True,
+            default=HTML_CONTENT_TYPES,
+            show_default=True,
+            help="Media type of pages to download, repeatable; other responses are dropped after their headers",
+        ),
+        # Development cache options
+        click.option(
+            "--cache-dir",
+            type=click.Path(file_okay=False, path_type=Path),
+            default=None,
+            help="Cache response bodies here and reuse them on later runs (requests and ScrapingAnt)",
+        ),
+        click.option(
+            "--cache-ttl",
+            type=click.FloatRange(min=0),
+            default=86400.0,
+            show_default=True,
+            help="Seconds a cached response stays fresh (0 keeps it until evicted)",
+        ),
+        click.option(
+            "--cache-max-bytes",
+            type=click.IntRange(min=0),
+            default=1 << 30,
+            show_default=True,
+            help="Size limit of the cache; least recently used responses are evicted",
+        ),
+        click.option(
+            "--incremental",
+            is_flag=True,
+            help="Only fetch pages that are new or changed since the last run (using sitemap.xml lastmod and content hashes) and patch the existing output in place",
+        ),
+        click.option(
+            "--revalidate",
+            is_flag=True,
+            help="Re-request already scraped pages with If-None-Match/If-Modified-Since instead of skipping them (needs --save-html)",
+        ),
+        parser_option(),
+        # Crawl scope options
+        click.option(
+            "--max-depth",
+            type=click.IntRange(min=1),
+            default=1,
+            show_default=True,
+            help="How many links away from the base page to crawl (1 = only pages linked from the base page)",
+        ),
+        click.option(
+            "--max-pages",
+            type=click.IntRange(min=1),
+            help="Stop after fetching this many pages; the rest of the frontier is kept for the next run",
+        ),
+        click.option(
+            "--scope",
+            type=click.Choice(SCOPES),
+            default="any",
+            show_default=True,
+            help="Which discovered links to follow: any, same domain as the base page, or under its path prefix",
+        ),
+        state_store_option(),
+        # Output options
+        click.option(
+            "--flush-bytes",
+            type=click.IntRange(min=1),
+            default=4 << 20,
+            show_default=True,
+            help="Flush the combined output after this many bytes were written",
+        ),
+        click.option(
+            "--flush-interval",
+            type=click.FloatRange(min=0),
+            default=5.0,
+            show_default=True,
+            help="Flush the combined output at least this often, in seconds",
+        ),
+        click.option(
+            "--sink",
+            type=click.Choice(SINK_CHOICES),
+            multiple=True,
+            help="Also write every page with its fetch metadata to sharded JSONL or Parquet files in a records/ folder, repeatable",
+        ),
+        click.option(
+            "--shard-bytes",
+            type=click.IntRange(min=1),
+            default=256 << 20,
+            show_default=True,
+            help="Start a new --sink shard once the current one reaches this size",
+        ),
+        click.option(
+            "--compress-shards/--no-compress-shards",
+            default=True,
+            show_default=True,
+            help="Gzip JSONL shards",
+        ),
+        click.option(
+            "--row-group-size",
+            type=click.IntRange(min=1),
+            default=1000,
+            show_default=True,
+            help="Pages per Parquet row group",
+        ),
+        # Distributed crawl options
+        click.option(
+            "--queue",
+            type=click.Path(dir_okay=False, path_type=Path),
+            default=None,
+            help="Crawl as a worker of this shared SQLite work queue, together with every other process pointed at it (see `coordinate`)",
+        ),
+        click.option(
+            "--worker-id",
+            default=None,
+            help="Name of this worker in the --queue, unique among its workers. Defaults to HOST-PID",
+        ),
+        click.option(
+            "--lease-seconds",
+            type=click.FloatRange(min=1),
+            default=300.0,
+            show_default=True,
+            help="Seconds the URLs of a --queue worker that stopped sending heartbeats stay leased before other workers take them over",
+        ),
+        # Instrumentation options
+        click.option(
+            "--metrics-interval",
+            type=click.FloatRange(min=0),
+            default=30.0,
+            show_default=True,
+            help="Seconds between metrics summaries in the log (0 disables them)",
+        ),
+        click.option(
+            "--prometheus-file",
+            type=click.Path(dir_okay=False, path_type=Path),
+            default=None,
+            help="Keep metrics in this file in the Prometheus text format, e.g. for node_exporter's textfile collector",
+        ),
+        click.option(
+            "--prometheus-port",
+            type=click.IntRange(min=1, max=65535),
+            default=None,
+            help="Serve Prometheus metrics at http://METRICS_HOST:PORT/metrics during the crawl",
+        ),
+        click.option(
+            "--metrics-host",
+            default="127.0.0.1",
+            show_default=True,
+            help="Address the --prometheus-port server listens on; 0.0.0.0 exposes it to the network",
+        ),
+        click.option(
+            "--profile",
+            is_flag=True,
+            help="Run the crawl under cProfile and save the stats next to the output",
         ),
     ]
 
-    for option in options:
-        command = option(command)
+    return apply_options(command, options)
 
-    return command
+
+def create_reextract_options(command: FC) -> FC:
+    """Add the options of the `reextract` command."""
+    options = [
+        output_dir_option(),
+        *text_options(),
+        parser_option(),
+        click.option(
+            "--state-store",
+            type=click.Choice(STATE_STORES),
+            default=None,
+            help="Crawl log to read. Defaults to the one the crawl left in the output directory",
+        ),
+        click.option(
+            "--workers",
+            type=click.IntRange(min=1),
+            help="Number of worker processes. Defaults to one per CPU core",
+        ),
+    ]
+
+    return apply_options(command, options)
@@ -1,5 +1,20 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Tuple
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+DEFAULT_MAX_BYTES = 20 << 20
+
+# ScrapingAnt render modes: "auto" renders only pages with nothing to extract
+RENDER_MODES = ("auto", "always", "never")
+
+# Which of several nested text matches are extracted: every match (so text in
+# nested matches repeats once per ancestor), only the outermost or only the
+# innermost ones
+NESTING_MODES = ("all", "outermost", "innermost")
+
+# How matched elements are written: flattened to plain text, or converted to
+# Markdown keeping headings, lists and code blocks
+OUTPUT_FORMATS = ("text", "markdown")
 
 
 @dataclass
@@ -10,6 +25,13 @@ class LinkConfig:
     class_name: Optional[str] = None
     class_contains: Optional[str] = None
     id: Optional[str] = None
+    # Full CSS selector; when set, the fields above are ignored
+    selector: Optional[str] = None
+    # Regular expressions a link's absolute URL must (not) match
+    include: Tuple[str, ...] = ()
+    exclude: Tuple[str, ...] = ()
+    # Only keep links with the same scheme and host as the page
+    same_origin: bool = False
 
 
 @dataclass
@@ -21,3 +43,10 @@ class TextConfig:
     class_contains: Optional[str] = None
     id: Optional[str] = None
     role: Optional[str] = None
+    # Full CSS selector; when set, the fields above are ignored
+    selector: Optional[str] = None
+    # One of NESTING_MODES
+    nesting: str = "all"
+    # One of OUTPUT_FORMATS. With "markdown", extraction returns each
+    # element's HTML and a later stage converts it
+    format: str = "text"
@@ -1,42 +1,279 @@
-import re
+import hashlib
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Pattern, Union
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
 
-from bs4 import BeautifulSoup
-from scrapingant_client import ScrapingAntClient  # type: ignore
-
-from .config import TextConfig
-from .content_scrapers import get_content_with_requests, get_content_with_scraping_ant
+from .config import LinkConfig, TextConfig
+from .fetcher import Fetcher, ValidatorStore, get_default_fetcher
+from .html_archive import HtmlArchive
 from .link import Link
-from .scraping_page_log import ScrapingPage, append_to_page_log, should_skip_url
+from .link_scraper import extract_links
+from .matchers import ElementMatcher, compile_matcher
+from .output_writer import OutputWriter, content_hash
+from .parsers import Document, node_html, node_text, parse_html
+from .scraping_page_log import PageLog, ScrapingPage, should_skip_url
+from .sinks import OutputSink, PageRecord
+
+if TYPE_CHECKING:
+    from scrapingant_client import ScrapingAntClient  # type: ignore
 
 
-def extract_text(soup: BeautifulSoup, config: TextConfig) -> List[str]:
+def extract_text(soup: Document, config: TextConfig | ElementMatcher) -> List[str]:
     """
     Extract text from HTML based on the provided configuration.
 
     Args:
-        soup: BeautifulSoup object containing the parsed HTML
-        config: TextConfig object with extraction parameters
+        soup: Parsed HTML, from BeautifulSoup or the selectolax backend
+        config: TextConfig object with extraction parameters, or its compiled
+            ElementMatcher. A TextConfig is compiled once and then reused.
+
+    Returns:
+        List of extracted text strings. For the "markdown" format these are
+        the elements' HTML, to be converted by `scraper.markdown`.
+    """
+    matcher = config if isinstance(config, ElementMatcher) else compile_matcher(config)
+    if getattr(matcher.config, "format", "text") == "markdown":
+        return [node_html(element) for element in matcher.select(soup)]
+    return [node_text(element) for element in matcher.select(soup)]
+
+
+class BoilerplateFilter:
+    """Drops text blocks that were already written for an earlier page.
+
+    Navigation, footers and cookie banners come out of every page of a site
+    the same way. Each block is hashed and only its first occurrence in the
+    crawl is kept; 8-byte digests keep the memory to a few bytes per block.
+    Meant for the single thread that writes pages in crawl order.
+    """
+
+    def __init__(self) -> None:
+        self._seen: set[bytes] = set()
+        self.dropped = 0
+
+    def __call__(self, texts: List[str]) -> List[str]:
+        kept = []
+        for text in texts:
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+            if digest in self._seen:
+                self.dropped += 1
+                continue
+            self._seen.add(digest)
+            kept.append(text)
+        return kept
+
+
+@dataclass
+class PageResult:
+    """Outcome of fetching and extracting a single link"""
+
+    link: Link
+    html_content: Optional[str] = None
+    texts: List[str] = field(default_factory=list)
+    links: List[Link] = field(default_factory=list)
+    depth: int = 0
+    error: Optional[Exception] = None
+    credits: Optional[int] = None
+    # Seconds spent per pipeline stage, e.g. "parse" and "extract"
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def fetch_html(
+    link: Link,
+    use_scraping_ant: bool = False,
+    client: Optional["ScrapingAntClient"] = None,
+    fetcher: Optional[Fetcher] = None,
+) -> str:
+    """
+    Fetch the decoded HTML of a link without parsing it.
+
+    Args:
+        link: Link object containing URL and metadata
+        use_scraping_ant: Whether to use ScrapingAnt for scraping
+        client: ScrapingAnt client (required if use_scraping_ant is True)
+        fetcher: Fetcher used for plain requests. Defaults to the shared one.
+
+    Returns:
+        str: The page body
+    """
+    if use_scraping_ant:
+        if not client:
+            raise ValueError("Client is required when using ScrapingAnt")
+        return client.general_request(link.href).content
+
+    return (fetcher or get_default_fetcher()).get(link.href).text
+
+
+def extract_page(
+    html: str | Document,
+    base_url: str,
+    text_config: TextConfig,
+    parser: str = "html.parser",
+    follow_links: bool = False,
+    link_config: Optional[LinkConfig] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> tuple[List[str], List[Link]]:
+    """
+    Parse a page once and extract its texts and, optionally, its links.
+
+    Args:
+        html: The page body, or an already parsed document
+        base_url: URL of the page, for resolving relative links
+        text_config: Configuration for text extraction
+        parser: Parser backend used when `html` is a string
+        follow_links: Whether to also extract the page's links
+        link_config: Configuration scoping which of the page's links are followed
+        timings: Optional dict the "parse" and "extract" durations are added to
+
+    Returns:
+        tuple[List[str], List[Link]]: The extracted texts and followed links
+    """
+    started = time.perf_counter()
+    soup = parse_html(html, parser) if isinstance(html, str) else html
+    parsed = time.perf_counter()
+    texts = extract_text(soup, text_config)
+    links = extract_links(soup, base_url, config=link_config) if follow_links else []
+    if timings is not None:
+        timings["parse"] = timings.get("parse", 0.0) + parsed - started
+        timings["extract"] = (
+            timings.get("extract", 0.0) + time.perf_counter() - parsed
+        )
+    return texts, links
+
+
+def scrape_page(
+    link: Link,
+    text_config: TextConfig,
+    use_scraping_ant: bool = False,
+    client: Optional["ScrapingAntClient"] = None,
+    fetcher: Optional[Fetcher] = None,
+    parser: str = "html.parser",
+    follow_links: bool = False,
+    link_config: Optional[LinkConfig] = None,
+    keep_html: bool = True,
+) -> PageResult:
+    """
+    Fetch a link and extract its text, without touching any output files.
+
+    Args:
+        link: Link object containing URL and metadata
+        text_config: Configuration for text extraction
+        use_scraping_ant: Whether to use ScrapingAnt for scraping
+        client: ScrapingAnt client (required if use_scraping_ant is True)
+        fetcher: Fetcher used for plain requests. Defaults to the shared one.
+        parser: Parser backend used to parse the page once
+        follow_links: Whether to also extract the page's links for deeper crawling
+        link_config: Configuration scoping which of the page's links are followed
+        keep_html: Whether to return the raw HTML, e.g. to save it. Without it
+            the body is released as soon as the page is parsed.
 
     Returns:
-        List of extracted text strings
+        PageResult: The raw HTML, the extracted texts and any followed links
     """
-    attrs: dict[str, Union[str, Pattern[str]]] = {}
+    html_content: Optional[str] = fetch_html(link, use_scraping_ant, client, fetcher)
+    timings: Dict[str, float] = {}
+    texts, links = extract_page(
+        html_content, link.href, text_config, parser, follow_links, link_config, timings
+    )
+    if not keep_html:
+        html_content = None
+    return PageResult(
+        link=link, html_content=html_content, texts=texts, links=links, timings=timings
+    )
 
-    if config.class_name:
-        attrs["class"] = config.class_name
-    elif config.class_contains:
-        attrs["class"] = re.compile(config.class_contains)
 
-    if config.id:
-        attrs["id"] = config.id
+def write_page(
+    result: PageResult,
+    writer: OutputWriter,
+    html_dir: Optional[Path] = None,
+    page_log: Optional[PageLog] = None,
+    overwrite: bool = False,
+    validators: Optional[ValidatorStore] = None,
+    archive: Optional[HtmlArchive] = None,
+    skip_unchanged: bool = False,
+    boilerplate: Optional[BoilerplateFilter] = None,
+    sinks: Sequence[OutputSink] = (),
+) -> str:
+    """
+    Write a scraped page to the combined output file and log it.
 
-    if config.role:
-        attrs["role"] = config.role
+    Args:
+        result: PageResult returned by `scrape_page`
+        writer: Writer for the combined output file
+        html_dir: Optional directory to save raw HTML content
+        page_log: Log the page is recorded in
+        overwrite: Whether to overwrite existing HTML files
+        validators: Optional store that keeps ETag/Last-Modified for saved pages
+        archive: Optional HTML archive, used instead of html_dir when given
+        skip_unchanged: Leave the output alone if the extracted content hashes
+            the same as on the last logged fetch
+        boilerplate: Optional filter dropping blocks written for earlier pages.
+            The content hash is taken before filtering, so it does not depend
+            on the crawl order.
+        sinks: Further outputs the page is written to, e.g. JSONL shards
 
-    elements = soup.find_all(config.tag, attrs=attrs)
-    return [element.get_text(strip=True) for element in elements]
+    Returns:
+        str: The status the page was logged with, "success" or "unchanged"
+    """
+    link = result.link
+    digest = content_hash(result.texts)
+    unchanged = (
+        skip_unchanged
+        and page_log is not None
+        and page_log.content_hash(link.href) == digest
+    )
+    html_path: Optional[Path | str] = None
+    html_written = False
+
+    if archive is not None:
+        # Identical bodies are stored once, so there is nothing to overwrite
+        if result.html_content is not None:
+            html_path = archive.put(link.href, result.html_content)
+            html_written = True
+    elif html_dir:
+        # Save HTML content if html_dir is provided
+        html_path = html_dir / f"{link.title}.html"
+        if result.html_content is not None and (overwrite or not html_path.exists()):
+            with open(html_path, "w") as f:
+                f.write(result.html_content)
+            html_written = True
+
+    # Only pair validators with a body that is known to match them
+    if validators is not None:
+        validators.commit(link.href, html_path if html_written else None)
+
+    status = "unchanged" if unchanged else "success"
+    entry = ScrapingPage.create(
+        url=link.href,
+        html_path=str(html_path) if html_path else None,
+        title=link.title,
+        status=status,
+        content_hash=digest,
+        credits=result.credits,
+    )
+
+    if not unchanged:
+        texts = result.texts if boilerplate is None else boilerplate(result.texts)
+        writer.write_document(link.title, texts, link.href)
+        if sinks:
+            record = PageRecord(
+                url=link.href,
+                title=link.title,
+                texts=texts,
+                fetched_at=entry.timestamp,
+                status=status,
+                depth=result.depth,
+                content_hash=digest,
+                credits=result.credits,
+                html_path=entry.html_path,
+            )
+            for sink in sinks:
+                sink.write(record)
+
+    # Log successful scraping
+    if page_log is not None:
+        page_log.append(entry)
+    return status
 
 
 def save_content(
@@ -45,10 +282,10 @@ def save_content(
     text_config: TextConfig,
     html_dir: Optional[Path] = None,
     use_scraping_ant: bool = False,
-    client: Optional[ScrapingAntClient] = None,
-    processed_pages: Optional[List[ScrapingPage]] = None,
-    log_path: Optional[Path] = None,
+    client: Optional["ScrapingAntClient"] = None,
+    page_log: Optional[PageLog] = None,
     overwrite: bool = False,
+    sinks: Sequence[OutputSink] = (),
 ) -> bool:
     """
     Save content from a link to a file.
@@ -60,51 +297,17 @@ def save_content(
         html_dir: Optional directory to save raw HTML content
         use_scraping_ant: Whether to use ScrapingAnt for scraping
         client: ScrapingAnt API key (required if use_scraping_ant is True)
-        processed_pages: List of already processed ScrapingPage entries
-        log_path: Path to the logging CSV file
+        page_log: Log of already processed pages, updated with this one
         overwrite: Whether to overwrite existing HTML files
+        sinks: Further outputs the page is written to, e.g. JSONL shards
 
     Returns:
         bool: True if content was processed, False if skipped
     """
-    if should_skip_url(link.href, processed_pages, overwrite):
+    if should_skip_url(link.href, page_log, overwrite):
         return False
 
-    if use_scraping_ant:
-        if not client:
-            raise ValueError("Client is required when using ScrapingAnt")
-
-        assert isinstance(
-            client, ScrapingAntClient
-        ), f"Client is not a ScrapingAntClient: {type(client)}"
-        html_content, soup = get_content_with_scraping_ant(link.href, client)
-    else:
-        html_content, soup = get_content_with_requests(link.href)
-
-    # Save HTML content if html_dir is provided
-    if html_dir:
-        html_path = html_dir / f"{link.title}.html"
-        if overwrite or not html_path.exists():
-            with open(html_path, "w") as f:
-                f.write(html_content)
-
-    with open(output_path, "a") as f:
-        f.write(f"<TITLE>{link.title}</TITLE>\n\n")
-
-        extracted_texts = extract_text(soup, text_config)
-        for text in extracted_texts:
-            f.write(f"<CONTENT>{text}</CONTENT>\n")
-
-        f.write("<END_OF_CONTENT></END_OF_CONTENT>\n\n")
-
-    # Log successful scraping
-    if log_path is not None and processed_pages is not None:
-        page_entry = ScrapingPage.create(
-            url=link.href,
-            html_path=str(html_dir / f"{link.title}.html") if html_dir else None,
-            title=link.title,
-        )
-        append_to_page_log(log_path, page_entry)
-        processed_pages.append(page_entry)
-
+    result = scrape_page(link, text_config, use_scraping_ant, client)
+    with OutputWriter(output_path, append=True) as writer:
+        write_page(result, writer, html_dir, page_log, overwrite, sinks=sinks)
     return True
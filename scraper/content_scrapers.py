@@ -1,9 +1,7 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Optional
 
-import requests
-from bs4 import BeautifulSoup
-from scrapingant_client import ScrapingAntClient
+from .fetcher import Fetcher, get_default_fetcher
 
 
 @dataclass
@@ -24,30 +22,10 @@ class MockClient:
         ['__class__', '__delattr__', '__dict__', '__dir__', '__doc__', '__eq__', '__format__', '__ge__', '__getattribute__', '__getstate__', '__gt__', '__hash__', '__init__', '__init_subclass__', '__le__', '__lt__', '__module__', '__ne__', '__new__', '__reduce__', '__reduce_ex__', '__repr__', '__setattr__', '__sizeof__', '__str__', '__subclasshook__', '__weakref__', 'content', 'cookies', 'status_code', 'text']
     """
 
+    def __init__(self, fetcher: Optional[Fetcher] = None):
+        self.fetcher = fetcher or get_default_fetcher()
+
     def general_request(self, url, kwargs: dict[str, Any] = {}):
-        response = requests.get(url, **kwargs)
+        response = self.fetcher.get(url, headers=kwargs.get("headers"))
         # Make the response match ScrapingAnt's response structure
         return MockResponse(content=response.text)
-
-
-def get_content_with_requests(url: str) -> tuple[str, BeautifulSoup]:
-    """Get content using requests library.
-
-    Args:
-        url (str): The URL to get content from.
-
-    Returns:
-        tuple[str, BeautifulSoup]: The content and the BeautifulSoup object.
-    """
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, "html.parser")
-    return response.text, soup
-
-
-def get_content_with_scraping_ant(
-    url: str, client: ScrapingAntClient
-) -> tuple[str, BeautifulSoup]:
-    """Get content using ScrapingAnt."""
-    response = client.general_request(url)
-    soup = BeautifulSoup(response.content, "html.parser")
-    return response.content, soup
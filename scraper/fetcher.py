@@ -0,0 +1,441 @@
+import codecs
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from charset_normalizer import from_bytes
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .config import DEFAULT_MAX_BYTES, HTML_CONTENT_TYPES
+from .html_archive import ARCHIVE_PREFIX, HtmlArchive, load_html
+from .metrics import CrawlMetrics
+from .response_cache import ResponseCache
+
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+CHUNK_SIZE = 1 << 16
+
+# Types a URL's extension must name before it is skipped without a request.
+# Server-side extensions (.php, .aspx, ...) guess to odd types but serve HTML
+BINARY_MAIN_TYPES = ("image", "audio", "video", "font")
+BINARY_TYPES = (
+    "application/pdf",
+    "application/zip",
+    "application/gzip",
+    "application/x-tar",
+    "application/octet-stream",
+    "application/msword",
+)
+
+
+# Where an HTML page declares its encoding, if the Content-Type does not
+CHARSET_PARAM = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.IGNORECASE)
+META_CHARSET = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.IGNORECASE
+)
+# The <meta> tag must be within the first 1024 bytes per the HTML standard;
+# a bit more covers pages that ignore it
+META_SNIFF_BYTES = 4096
+
+
+def _known_codec(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(content_type: Optional[str], body: bytes | bytearray) -> str:
+    """
+    Pick the encoding of an HTML body the way browsers do.
+
+    The charset of the Content-Type header wins, then a byte order mark, then
+    a `<meta charset>` (or `http-equiv`) declaration in the head. Undeclared
+    bodies are taken as UTF-8 if they decode as such, else the encoding is
+    guessed from the bytes. The ISO-8859-1 default requests assumes for any
+    text/* response without a charset is never used.
+    """
+    match = CHARSET_PARAM.search(content_type or "")
+    encoding = _known_codec(match.group(1)) if match else None
+    if encoding:
+        return encoding
+    if body.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if body.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    meta = META_CHARSET.search(body[:META_SNIFF_BYTES])
+    encoding = _known_codec(meta.group(1).decode("ascii")) if meta else None
+    if encoding:
+        return encoding
+    try:
+        body.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        # charset_normalizer is what requests' apparent_encoding uses
+        guess = from_bytes(bytes(body)).best()
+        return _known_codec(guess.encoding if guess else None) or "cp1252"
+
+
+class FetchError(Exception):
+    """Raised when a server answers with an HTTP error status"""
+
+    def __init__(
+        self, url: str, status_code: int, retry_after: Optional[float] = None
+    ) -> None:
+        super().__init__(f"HTTP {status_code} for {url}")
+        self.url = url
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in RETRYABLE_STATUS_CODES
+
+
+class ResponseRejected(Exception):
+    """Raised for pages skipped because of their content type or size"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Turn a Retry-After header (seconds or an HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class FetchResponse:
+    """A fetched page with the metadata needed for revalidation"""
+
+    url: str
+    status_code: int
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+    from_cache: bool = False
+
+
+class ValidatorStore:
+    """ETag/Last-Modified validators saved between runs.
+
+    A validator is only sent back to the server when the page body it belongs
+    to is still on disk, because a 304 response has no body of its own.
+
+    Args:
+        path: JSON file the validators are persisted to
+        archive: Archive that `archive:` html paths are read from
+    """
+
+    def __init__(self, path: Path, archive: Optional[HtmlArchive] = None) -> None:
+        self.path = path
+        self.archive = archive
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Optional[str]]] = {}
+        self._observed: dict[str, tuple[Optional[str], Optional[str]]] = {}
+        self._committed: set[str] = set()
+
+        if path.exists():
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable validator file {path}: {e}")
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """Return revalidation headers for a URL whose body is still on disk."""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry or not self._has_body(str(entry.get("html_path") or "")):
+            return {}
+
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = str(entry["etag"])
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = str(entry["last_modified"])
+        return headers
+
+    def cached_body(self, url: str) -> Optional[str]:
+        """Read the body previously saved for a URL, if any."""
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry or not entry.get("html_path"):
+            return None
+        try:
+            return load_html(str(entry["html_path"]), self.archive)
+        except OSError:
+            return None
+
+    def _has_body(self, html_path: str) -> bool:
+        if not html_path:
+            return False
+        if html_path.startswith(ARCHIVE_PREFIX):
+            return self.archive is not None
+        return Path(html_path).exists()
+
+    def observe(
+        self, url: str, etag: Optional[str], last_modified: Optional[str]
+    ) -> None:
+        """Remember the validators of a response until its body is saved."""
+        if etag or last_modified:
+            with self._lock:
+                self._observed[url] = (etag, last_modified)
+
+    def commit(self, url: str, html_path: Optional[Path | str]) -> None:
+        """Record the validators of a response whose body was saved to `html_path`."""
+        with self._lock:
+            observed = self._observed.pop(url, None)
+            if observed is None or html_path is None:
+                return
+            etag, last_modified = observed
+            self._entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "html_path": str(html_path),
+            }
+            self._committed.add(url)
+
+    def save(self) -> None:
+        """Write the validators to disk atomically.
+
+        Entries other processes saved since the file was loaded, e.g. the
+        workers of a shared queue, are kept; the pages committed here win.
+        """
+        with self._lock:
+            entries = dict(self._entries)
+            committed = set(self._committed)
+        if committed and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    on_disk = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                on_disk = {}
+            entries = {
+                **on_disk,
+                **{url: entries[url] for url in committed if url in entries},
+            }
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        tmp_path.replace(self.path)
+
+
+class Fetcher:
+    """Shared HTTP fetcher with a pooled keep-alive session.
+
+    Every request goes through one `requests.Session`, so connections are
+    reused across pages. Compressed transfer encodings are negotiated for
+    whichever decoders urllib3 has available (gzip/deflate, plus brotli when
+    installed), and pages with saved validators are revalidated with
+    `If-None-Match`/`If-Modified-Since`.
+
+    Bodies are streamed in chunks and given up on as soon as they grow past
+    `max_bytes`, so a request never holds more than that in memory.
+    Responses of another content type are dropped after their headers
+    arrive, and URLs whose extension names another type (.pdf, .png, ...)
+    are not requested at all.
+
+    With a response cache, fresh cached bodies are returned without any
+    request, which makes repeated development runs near-instant.
+
+    Args:
+        connect_timeout: Seconds to wait for a connection to be established
+        read_timeout: Seconds to wait between bytes of the response
+        pool_size: Number of keep-alive connections kept per host
+        validators: Optional store of validators from previous runs
+        max_bytes: Largest (decompressed) body accepted, None for no limit
+        content_types: Media types accepted, empty to accept anything
+        cache: Optional on-disk cache of response bodies
+        metrics: Optional metrics that ttfb/download times, per-host
+            latencies and body sizes are recorded in
+    """
+
+    def __init__(
+        self,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 30.0,
+        pool_size: int = 10,
+        validators: Optional[ValidatorStore] = None,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        content_types: Tuple[str, ...] = HTML_CONTENT_TYPES,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[CrawlMetrics] = None,
+    ) -> None:
+        self.timeout = (connect_timeout, read_timeout)
+        self.validators = validators
+        self.cache = cache
+        self.metrics = metrics
+        self.max_bytes = max_bytes
+        self.content_types = tuple(t.lower() for t in content_types)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"}
+        )
+
+    def _accepts(self, content_type: Optional[str]) -> bool:
+        if not self.content_types or not content_type:
+            return True
+        return content_type.split(";")[0].strip().lower() in self.content_types
+
+    def _check_url(self, url: str) -> None:
+        """Reject URLs whose extension names a type that is not accepted."""
+        guessed, _ = mimetypes.guess_type(urlsplit(url).path)
+        if guessed is None or self._accepts(guessed):
+            return
+        if guessed.split("/")[0] in BINARY_MAIN_TYPES or guessed in BINARY_TYPES:
+            raise ResponseRejected(f"Skipping {guessed} URL {url}")
+
+    def _read_body(self, url: str, response: requests.Response) -> tuple[str, int]:
+        """Read a streamed body in chunks, enforcing the size limit.
+
+        Returns:
+            tuple[str, int]: The decoded body and its size in bytes
+        """
+        content_type = response.headers.get("Content-Type")
+        if not self._accepts(content_type):
+            raise ResponseRejected(f"Skipping {content_type} response for {url}")
+
+        limit = self.max_bytes
+        declared = response.headers.get("Content-Length")
+        # Content-Length counts encoded bytes, so it can only rule out early
+        if limit is not None and declared and declared.isdigit():
+            if "Content-Encoding" not in response.headers and int(declared) > limit:
+                raise ResponseRejected(
+                    f"Skipping {url}: {declared} bytes exceeds --max-bytes {limit}"
+                )
+
+        body = bytearray()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            body += chunk
+            if limit is not None and len(body) > limit:
+                raise ResponseRejected(
+                    f"Skipping {url}: body exceeds --max-bytes {limit}"
+                )
+        # Decode once; the raw bytes are released when this returns
+        encoding = detect_encoding(content_type, body)
+        return body.decode(encoding, errors="replace"), len(body)
+
+    def get(self, url: str, headers: Optional[dict[str, str]] = None) -> FetchResponse:
+        """Fetch a URL, revalidating against saved validators when possible.
+
+        Raises:
+            FetchError: If the server answers with an HTTP error status
+            ResponseRejected: If the content type or size is not accepted
+        """
+        self._check_url(url)
+        cache_options = {"via": "requests", "headers": headers or {}}
+        if self.cache is not None:
+            cached = self.cache.get(url, cache_options)
+            if cached is not None:
+                return FetchResponse(
+                    url=url, status_code=200, text=cached, from_cache=True
+                )
+
+        request_headers = dict(headers or {})
+        if self.validators is not None:
+            request_headers.update(self.validators.conditional_headers(url))
+
+        # With stream=True this returns once the headers are in, so DNS,
+        # connect, TLS and server time all count as "ttfb"
+        started = time.perf_counter()
+        response = self.session.get(
+            url, headers=request_headers, timeout=self.timeout, stream=True
+        )
+        headers_received = time.perf_counter()
+
+        if response.status_code == 304 and self.validators is not None:
+            response.close()
+            cached = self.validators.cached_body(url)
+            if cached is not None:
+                logger.debug(f"Not modified: {url}")
+                self.validators.observe(
+                    url,
+                    response.headers.get("ETag")
+                    or request_headers.get("If-None-Match"),
+                    response.headers.get("Last-Modified")
+                    or request_headers.get("If-Modified-Since"),
+                )
+                return FetchResponse(
+                    url=url,
+                    status_code=304,
+                    text=cached,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    not_modified=True,
+                )
+            # The saved body vanished between the check and now: fetch it again
+            response = self.session.get(
+                url, headers=headers, timeout=self.timeout, stream=True
+            )
+
+        # Closing before the body was read drops the connection instead of
+        # downloading whatever is left of a rejected response
+        with response:
+            if response.status_code >= 400:
+                raise FetchError(
+                    url,
+                    response.status_code,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+            text, size = self._read_body(url, response)
+
+        if self.metrics is not None:
+            finished = time.perf_counter()
+            self.metrics.observe("ttfb", headers_received - started)
+            self.metrics.observe("download", finished - headers_received)
+            self.metrics.record_fetch(urlsplit(url).netloc, finished - started, size)
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if self.validators is not None:
+            self.validators.observe(url, etag, last_modified)
+        if self.cache is not None:
+            self.cache.put(url, cache_options, text)
+
+        return FetchResponse(
+            url=url,
+            status_code=response.status_code,
+            text=text,
+            etag=etag,
+            last_modified=last_modified,
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_fetcher: Optional[Fetcher] = None
+
+
+def get_default_fetcher() -> Fetcher:
+    """Return the process-wide fetcher, creating it on first use."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = Fetcher()
+    return _default_fetcher
@@ -0,0 +1,223 @@
+import json
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Deque, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from loguru import logger
+
+from .link import Link
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+SCOPES = ("any", "domain", "prefix")
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL so that equivalent spellings share one seen-set key.
+
+    The fragment is dropped, scheme and host are lowercased, default ports are
+    removed, trailing slashes are stripped from the path and query parameters
+    are sorted.
+
+    Example:
+        'HTTPS://Docs.Example.com:443/guide/?b=2&a=1#intro'
+        -> 'https://docs.example.com/guide?a=1&b=2'
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/")
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def in_scope(url: str, base_url: str, scope: str) -> bool:
+    """
+    Check whether a URL falls inside the crawl scope of a base URL.
+
+    Args:
+        url: The discovered URL
+        base_url: The URL the crawl started from
+        scope: "any", "domain" (same host) or "prefix" (same host and path prefix)
+
+    Returns:
+        bool: True if the URL should be crawled
+    """
+    if scope == "any":
+        return True
+
+    target = urlsplit(normalize_url(url))
+    base = urlsplit(normalize_url(base_url))
+    if target.netloc != base.netloc:
+        return False
+    if scope == "domain":
+        return True
+
+    # Prefix scope: everything under the base page's directory, which needs the
+    # un-normalized path since '/docs/' and '/docs' name different directories
+    prefix = urlsplit(base_url).path.rsplit("/", 1)[0] + "/"
+    return (target.path + "/").startswith(prefix)
+
+
+@dataclass(frozen=True)
+class FrontierItem:
+    """A link waiting to be crawled, with its distance from the base page"""
+
+    link: Link
+    depth: int
+
+
+class Frontier:
+    """Breadth-first queue of links to crawl, persisted to disk.
+
+    Links are deduplicated on their normalized URL through an in-memory set,
+    so `add` is O(1). Items handed out by `pop` stay "in flight" until `done`
+    is called and are written back to the queue on `save`, so an interrupted
+    crawl resumes without losing pages that were being fetched. The seen-set
+    grows with the whole crawl, so a checkpoint only appends the URLs seen
+    since the previous one to a journal next to the queue file.
+
+    Args:
+        path: Optional JSON file the frontier is checkpointed to
+        checkpoint_every: Save after this many completed items
+    """
+
+    def __init__(
+        self, path: Optional[Path] = None, checkpoint_every: int = 100
+    ) -> None:
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self._queue: Deque[FrontierItem] = deque()
+        self._in_flight: dict[str, FrontierItem] = {}
+        self._seen: set[str] = set()
+        self._unsaved_seen: List[str] = []
+        self._completed_since_save = 0
+
+    @property
+    def seen_path(self) -> Optional[Path]:
+        """Journal of the seen-set, appended to at every checkpoint."""
+        return self.path.with_suffix(".seen") if self.path is not None else None
+
+    def _see(self, key: str) -> bool:
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        if self.path is not None:
+            self._unsaved_seen.append(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._seen
+
+    @property
+    def exhausted(self) -> bool:
+        """True when nothing is queued and nothing is in flight."""
+        return not self._queue and not self._in_flight
+
+    def mark_seen(self, url: str) -> None:
+        """Record a URL as seen without queueing it."""
+        self._see(normalize_url(url))
+
+    def add(self, link: Link, depth: int) -> bool:
+        """Queue a link unless its normalized URL was seen before."""
+        if not self._see(normalize_url(link.href)):
+            return False
+        self._queue.append(FrontierItem(link=link, depth=depth))
+        return True
+
+    def pop(self) -> FrontierItem:
+        """Take the next link in breadth-first order."""
+        item = self._queue.popleft()
+        self._in_flight[normalize_url(item.link.href)] = item
+        return item
+
+    def drop_done(self, is_done: Callable[[str], bool]) -> int:
+        """
+        Remove queued links that were handled since the last checkpoint.
+
+        A crawl that was killed between two checkpoints resumes with the
+        pages completed after the last one still queued; the crawl log knows
+        they are done.
+
+        Returns:
+            int: The number of links dropped
+        """
+        queued = len(self._queue)
+        self._queue = deque(item for item in self._queue if not is_done(item.link.href))
+        return queued - len(self._queue)
+
+    def done(self, item: FrontierItem) -> None:
+        """Mark an item as handled, checkpointing periodically."""
+        self._in_flight.pop(normalize_url(item.link.href), None)
+        self._completed_since_save += 1
+        if self.path and self._completed_since_save >= self.checkpoint_every:
+            self.save()
+
+    def save(self) -> None:
+        """Write the queue and in-flight items, and journal newly seen URLs.
+
+        The queue is replaced atomically first: if the journal append is cut
+        short, `load` still finds every queued URL in the queue itself.
+        """
+        if self.path is None or self.seen_path is None:
+            return
+
+        pending = list(self._in_flight.values()) + list(self._queue)
+        state = {
+            "queue": [{**asdict(item.link), "depth": item.depth} for item in pending],
+        }
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        tmp_path.replace(self.path)
+
+        if self._unsaved_seen:
+            with open(self.seen_path, "a") as f:
+                f.write("".join(f"{key}\n" for key in self._unsaved_seen))
+            self._unsaved_seen.clear()
+        self._completed_since_save = 0
+
+    def clear(self) -> None:
+        """Remove the checkpoint files once the crawl has finished."""
+        for path in (self.path, self.seen_path):
+            if path is not None and path.exists():
+                path.unlink()
+
+    @classmethod
+    def load(cls, path: Path, checkpoint_every: int = 100) -> "Frontier":
+        """Restore a frontier from a checkpoint, or start an empty one."""
+        frontier = cls(path, checkpoint_every)
+        if not path.exists():
+            return frontier
+
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable frontier file {path}: {e}")
+            return frontier
+
+        # Checkpoints written before the journal kept the seen-set inline;
+        # it moves to the journal with the next checkpoint
+        frontier._unsaved_seen = list(state.get("seen", []))
+        frontier._seen = set(frontier._unsaved_seen)
+        seen_path = frontier.seen_path
+        if seen_path is not None and seen_path.exists():
+            with open(seen_path) as f:
+                # A line without its newline is from a crash mid-append
+                frontier._seen.update(
+                    line[:-1] for line in f if line.endswith("\n")
+                )
+        for entry in state.get("queue", []):
+            depth = entry.pop("depth")
+            item = FrontierItem(link=Link(**entry), depth=depth)
+            frontier._queue.append(item)
+            frontier._seen.add(normalize_url(item.link.href))
+        return frontier
@@ -0,0 +1,223 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # zlib is always available
+    zstandard = None
+
+ARCHIVE_PREFIX = "archive:"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    codec TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES blobs (digest),
+    timestamp TEXT NOT NULL
+);
+"""
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zstd"
+    return zlib.compress(data, 6), "zlib"
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archive entry is zstd-compressed; install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class HtmlArchive:
+    """Compressed, content-addressed store for raw HTML.
+
+    Bodies are keyed by their SHA-256, so identical pages are stored once, and
+    appended compressed (zstd when installed, zlib otherwise) to a single
+    `archive.dat` file. A SQLite index maps digests to their offset and length
+    and URLs to their latest digest, so any page is read back with a single
+    positioned read. Everything lives in one directory, which replaces one
+    loose .html file per page.
+
+    Every `put` is committed to the index before it returns, so an html_path
+    the crawl log records always resolves after a crash. Commits are cheap in
+    WAL mode; the data file is fsynced every `sync_every` entries, and blobs a
+    power loss cut short are dropped from the index when it is reopened.
+
+    Args:
+        directory: Directory holding archive.dat and archive.sqlite
+        sync_every: Number of new entries between fsyncs of archive.dat
+        read_only: Open for reading only, e.g. from worker processes
+    """
+
+    def __init__(
+        self, directory: Path, sync_every: int = 100, read_only: bool = False
+    ) -> None:
+        if not read_only:
+            directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.sync_every = sync_every
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._unsynced = 0
+
+        self._conn = sqlite3.connect(
+            directory / "archive.sqlite", timeout=30, check_same_thread=False
+        )
+        if not read_only:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+        self._data = None
+        if not read_only:
+            self._data = open(directory / "archive.dat", "ab")
+            self._end = self._recover(os.fstat(self._data.fileno()).st_size)
+            # Bytes past the last indexed blob were never committed: drop them
+            self._data.truncate(self._end)
+        self._reader_fd = os.open(directory / "archive.dat", os.O_RDONLY)
+
+    def __enter__(self) -> "HtmlArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _recover(self, size: int) -> int:
+        """Drop index entries of blobs missing from a data file of `size` bytes."""
+        lost = "SELECT digest FROM blobs WHERE offset + length > ?"
+        self._conn.execute(f"DELETE FROM urls WHERE digest IN ({lost})", (size,))
+        self._conn.execute(f"DELETE FROM blobs WHERE digest IN ({lost})", (size,))
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(offset + length) FROM blobs").fetchone()
+        return row[0] or 0
+
+    def __contains__(self, url: str) -> bool:
+        return self._digest_for(url) is not None
+
+    def put(self, url: str, html: str) -> str:
+        """
+        Store the HTML of a URL, writing the body only if it is new.
+
+        Args:
+            url: The page URL
+            html: The decoded page body
+
+        Returns:
+            str: The html_path to record in the crawl log
+        """
+        if self._data is None:
+            raise RuntimeError(f"Archive {self.directory} is opened read-only")
+
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            known = self._conn.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+            if not known:
+                compressed, codec = _compress(body)
+                self._data.write(compressed)
+                self._conn.execute(
+                    "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+                    (digest, self._end, len(compressed), len(body), codec),
+                )
+                self._end += len(compressed)
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?)",
+                (url, digest, datetime.now().isoformat()),
+            )
+            # The blob reaches the file before the index entry pointing at it
+            self._data.flush()
+            self._conn.commit()
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every:
+                self._sync()
+        return f"{ARCHIVE_PREFIX}{digest}"
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the latest HTML stored for a URL."""
+        digest = self._digest_for(url)
+        return self.get_by_digest(digest) if digest else None
+
+    def get_by_digest(self, digest: str) -> Optional[str]:
+        """Return the HTML stored under a content digest."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset, length, codec FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+            if row is None:
+                return None
+        offset, length, codec = row
+        body = _decompress(os.pread(self._reader_fd, length, offset), codec)
+        return body.decode("utf-8")
+
+    def load(self, html_path: str) -> Optional[str]:
+        """Resolve an `archive:<digest>` html_path from the crawl log."""
+        if not html_path.startswith(ARCHIVE_PREFIX):
+            return None
+        return self.get_by_digest(html_path[len(ARCHIVE_PREFIX) :])
+
+    def _digest_for(self, url: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _sync(self) -> None:
+        if self._data is not None:
+            self._data.flush()
+            os.fsync(self._data.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        if self._reader_fd < 0:
+            return
+        with self._lock:
+            self._sync()
+            if self._data is not None:
+                self._data.close()
+        os.close(self._reader_fd)
+        self._reader_fd = -1
+        self._conn.close()
+
+
+def load_html(html_path: str, archive: Optional[HtmlArchive] = None) -> str:
+    """
+    Read the HTML behind an html_path from the crawl log.
+
+    Args:
+        html_path: A file path, or `archive:<digest>` for archived pages
+        archive: The archive to resolve `archive:` paths against
+
+    Returns:
+        str: The page HTML
+
+    Raises:
+        FileNotFoundError: If the file or archive entry does not exist
+    """
+    if html_path.startswith(ARCHIVE_PREFIX):
+        html = archive.load(html_path) if archive is not None else None
+        if html is None:
+            raise FileNotFoundError(f"No archive entry for {html_path}")
+        return html
+
+    with open(html_path) as f:
+        return f.read()
@@ -1,35 +1,245 @@
-from typing import List, Set
+import re
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional, Set
 from urllib.parse import urljoin, urlparse
 
-from bs4 import BeautifulSoup
+from loguru import logger
 
 from scraper.utils import create_title_from_url
 
+from .config import LinkConfig
 from .link import Link
+from .matchers import compile_matcher
+from .parsers import Document, is_selectolax, parse_html
 
+FOLLOWED_SCHEMES = ("http", "https")
 
-def extract_links(html: str | BeautifulSoup, base_url: str) -> List[Link]:
-    """Extract links (<a> tags!) from the HTML content."""
+
+class LinkFilter:
+    """Decide which hrefs found on a page become Links.
+
+    Hrefs are resolved against the page URL. Anything that is not http(s)
+    (mailto:, javascript:, ...), fails the include/exclude patterns of the
+    LinkConfig or, with `same_origin`, points to another origin is dropped.
+
+    Args:
+        base_url: URL of the page the links were found on
+        config: Optional LinkConfig with include/exclude/same_origin settings
+    """
+
+    def __init__(self, base_url: str, config: Optional[LinkConfig] = None) -> None:
+        self.base_url = base_url
+        base = urlparse(base_url)
+        self.origin = (base.scheme, base.netloc)
+        self.same_origin = bool(config and config.same_origin)
+        self.include = [re.compile(p) for p in (config.include if config else ())]
+        self.exclude = [re.compile(p) for p in (config.exclude if config else ())]
+
+    def __call__(self, href: str, text: str) -> Optional[Link]:
+        """Build the Link for an href, or return None if it is filtered out."""
+        if not href:
+            return None
+
+        # join the relative href with the base_url to get an absolute url
+        absolute_url = urljoin(self.base_url, href.strip())
+        parsed_url = urlparse(absolute_url)
+        if parsed_url.scheme not in FOLLOWED_SCHEMES:
+            return None
+        if self.same_origin and (parsed_url.scheme, parsed_url.netloc) != self.origin:
+            return None
+        if self.include and not any(p.search(absolute_url) for p in self.include):
+            return None
+        if any(p.search(absolute_url) for p in self.exclude):
+            return None
+
+        return Link(
+            title=create_title_from_url(absolute_url),
+            href=absolute_url,
+            text=text,
+            domain=parsed_url.netloc,
+        )
+
+
+def _iter_anchors(soup: Document) -> Iterator[tuple[str, str]]:
+    """Yield (href, text) for every <a href> in a parsed document or element."""
+    if is_selectolax(soup):
+        for node in soup.css("a[href]"):
+            yield node.attributes.get("href") or "", node.text(strip=True)
+        return
+
+    for a_tag in soup.find_all("a", href=True):
+        href = a_tag.get("href")  # This returns str, not Sequence[str]
+        yield str(href), a_tag.get_text(strip=True)
+
+
+def extract_links(
+    html: str | Document,
+    base_url: str,
+    parser: str = "html.parser",
+    config: Optional[LinkConfig] = None,
+) -> List[Link]:
+    """Extract links (<a> tags!) from the HTML content.
+
+    With a LinkConfig, only links inside the elements it matches (e.g. the
+    <nav>) are returned, filtered by its include/exclude patterns and origin
+    setting. If no element matches, the whole page is used.
+    """
     if isinstance(html, str):
-        soup = BeautifulSoup(html, "html.parser")
+        soup = parse_html(html, parser)
     else:
         soup = html
-    links: Set[Link] = set()
 
-    for a_tag in soup.find_all("a", href=True):
-        href = a_tag.get("href")  # This returns str, not Sequence[str]
-        if href:
-            # join the relative href with the base_url to get an absolute url
-            absolute_url = urljoin(base_url, str(href))
-            parsed_url = urlparse(str(absolute_url))
-
-            # Create Link object with proper string type
-            link = Link(
-                title=create_title_from_url(absolute_url),
-                href=str(absolute_url),
-                text=a_tag.get_text(strip=True),
-                domain=parsed_url.netloc,
+    containers = [soup]
+    if config is not None:
+        matched = compile_matcher(config).select(soup)
+        if matched:
+            containers = matched
+        else:
+            logger.warning(
+                f"No link container matched on {base_url}, using the whole page"
             )
-            links.add(link)
+
+    link_filter = LinkFilter(base_url, config)
+    links: Set[Link] = set()
+    for container in containers:
+        for href, text in _iter_anchors(container):
+            link = link_filter(href, text)
+            if link is not None:
+                links.add(link)
 
     return list(links)
+
+
+class StreamingLinkExtractor(HTMLParser):
+    """Incremental link extractor that never builds a document tree.
+
+    Feed it the page in chunks and collect the links found so far with
+    `drain`. Containers are matched on the tag/class/id fields of the
+    LinkConfig; nesting is tracked by counting open tags of the container's
+    name. Links outside any container are buffered only until the first
+    container shows up, so a page without one still yields all its links.
+
+    Args:
+        base_url: URL of the page being parsed
+        config: LinkConfig selecting the containers, without a CSS selector
+    """
+
+    def __init__(self, base_url: str, config: Optional[LinkConfig] = None) -> None:
+        super().__init__(convert_charrefs=True)
+        if config is not None and config.selector:
+            raise ValueError("CSS selectors need a parsed document, use extract_links")
+
+        self.config = config
+        self.container_tag = config.tag if config is not None else None
+        self.link_filter = LinkFilter(base_url, config)
+        self.class_pattern = (
+            re.compile(config.class_contains)
+            if config is not None and config.class_contains
+            else None
+        )
+        self._seen: Set[Link] = set()
+        self._ready: List[Link] = []
+        # Kept apart so a link repeated inside the container is not taken
+        # for a duplicate once the outside links are dropped
+        self._outside_seen: Set[Link] = set()
+        self._outside: List[Link] = []
+        self._container_depth = 0
+        self._found_container = config is None
+        self._href: Optional[str] = None
+        self._text: List[str] = []
+
+    def _is_container(self, tag: str, attrs: dict[str, Optional[str]]) -> bool:
+        config = self.config
+        if config is None or tag != config.tag:
+            return False
+        if config.id and attrs.get("id") != config.id:
+            return False
+
+        class_attr = attrs.get("class") or ""
+        candidates = class_attr.split() + [class_attr]
+        if config.class_name and config.class_name not in candidates:
+            return False
+        if self.class_pattern is not None:
+            return any(self.class_pattern.search(c) for c in candidates)
+        return True
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        attr_map = dict(attrs)
+        if self._container_depth:
+            if tag == self.container_tag:
+                self._container_depth += 1
+        elif self._is_container(tag, attr_map):
+            self._container_depth = 1
+            if not self._found_container:
+                self._found_container = True
+                self._outside.clear()
+                self._outside_seen.clear()
+
+        if tag == "a" and attr_map.get("href"):
+            self._href = attr_map["href"]
+            self._text = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "a" and self._href is not None:
+            self._emit(self._href, "".join(self._text).strip())
+            self._href = None
+        elif self._container_depth and tag == self.container_tag:
+            self._container_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._href is not None:
+            self._text.append(data.strip())
+
+    def _emit(self, href: str, text: str) -> None:
+        in_container = self.config is None or self._container_depth > 0
+        if not in_container and self._found_container:
+            return
+        link = self.link_filter(href, text)
+        seen = self._seen if in_container else self._outside_seen
+        if link is None or link in seen:
+            return
+        seen.add(link)
+        (self._ready if in_container else self._outside).append(link)
+
+    def drain(self) -> List[Link]:
+        """Return the container links found since the last call."""
+        ready, self._ready = self._ready, []
+        return ready
+
+    def close(self) -> None:
+        super().close()
+        if not self._found_container and self._outside:
+            logger.warning(
+                f"No link container matched on {self.link_filter.base_url}, "
+                "using the whole page"
+            )
+            self._ready.extend(self._outside)
+            self._outside = []
+
+
+def iter_links(
+    chunks: Iterable[str], base_url: str, config: Optional[LinkConfig] = None
+) -> Iterator[Link]:
+    """
+    Yield Links while the HTML is still being read.
+
+    Args:
+        chunks: The page body as an iterable of decoded text chunks
+        base_url: URL of the page, for resolving relative links
+        config: Optional LinkConfig without a CSS selector
+
+    Yields:
+        Link: Each accepted link, as soon as its </a> has been parsed
+    """
+    extractor = StreamingLinkExtractor(base_url, config)
+    for chunk in chunks:
+        extractor.feed(chunk)
+        yield from extractor.drain()
+    extractor.close()
+    yield from extractor.drain()
+
+
+def chunk_text(text: str, size: int = 1 << 16) -> Iterator[str]:
+    """Split an already decoded body into chunks for `iter_links`."""
+    for start in range(0, len(text), size):
+        yield text[start : start + size]
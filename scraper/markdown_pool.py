@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional
+
+from .content_scraper import PageResult
+from .parse_pool import worker_context
+from .response_cache import ResponseCache
+
+# Cache options of converted fragments; bump "version" when the conversion
+# changes so stale Markdown is not served
+CACHE_OPTIONS = {"format": "markdown", "version": 1}
+
+# Created on first use in every process that converts
+_converter: Any = None
+
+
+def html_to_markdown(html: str) -> str:
+    """Convert an HTML fragment to Markdown with markitdown."""
+    global _converter
+    if _converter is None:
+        from markitdown import MarkItDown  # type: ignore
+
+        _converter = MarkItDown()
+    result = _converter.convert_stream(
+        io.BytesIO(html.encode("utf-8")), file_extension=".html"
+    )
+    return result.text_content.strip()
+
+
+def _convert_in_worker(fragments: List[str]) -> List[str]:
+    return [html_to_markdown(fragment) for fragment in fragments]
+
+
+def fragment_key(html: str) -> str:
+    """Content hash a converted fragment is memoized under."""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+def convert_fragments(
+    fragments: List[str], cache: Optional[ResponseCache] = None
+) -> List[str]:
+    """
+    Convert HTML fragments to Markdown in this process, memoized in a cache.
+
+    Empty conversions are dropped, like elements without text are in the
+    text format's output.
+    """
+    converted = []
+    for fragment in fragments:
+        key = fragment_key(fragment)
+        markdown = cache.get(key, CACHE_OPTIONS) if cache is not None else None
+        if markdown is None:
+            markdown = html_to_markdown(fragment)
+            if cache is not None:
+                cache.put(key, CACHE_OPTIONS, markdown)
+        if markdown:
+            converted.append(markdown)
+    return converted
+
+
+class MarkdownPool:
+    """Process pool converting the extracted elements of pages to Markdown.
+
+    With the "markdown" format, extraction returns the HTML of every matched
+    element and this stage turns it into Markdown, keeping the headings,
+    lists and code blocks that plain text extraction flattens. Conversion is
+    CPU-bound, so it runs on `workers` processes like parsing does on a
+    ParsePool, with at most `queue_size` pages waiting for a worker.
+
+    Converted fragments are memoized by the hash of their HTML in `cache`,
+    which persists across runs: on a re-crawl only fragments whose HTML
+    changed are converted again. Cache lookups stay in this process, so only
+    the misses are sent to the workers; they run on a thread, as the cache
+    is a SQLite database and the event loop must not wait for its disk.
+
+    Args:
+        cache: Optional cache of converted fragments
+        workers: Number of worker processes (defaults to the CPU count)
+        queue_size: Maximum number of pages queued for the workers
+            (defaults to twice the number of workers)
+    """
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ) -> None:
+        self.cache = cache
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=worker_context()
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def convert(self, result: PageResult) -> PageResult:
+        """Replace the HTML fragments of an extracted page with Markdown."""
+        if not result.texts:
+            return result
+        started = time.perf_counter()
+        keys = [fragment_key(fragment) for fragment in result.texts]
+        converted: List[Optional[str]] = [None] * len(keys)
+        if self.cache is not None:
+            converted = await asyncio.to_thread(self._lookup, keys)
+        missing = [i for i, markdown in enumerate(converted) if markdown is None]
+
+        if missing:
+            # The queue belongs to the event loop of the crawl using the pool
+            loop = asyncio.get_running_loop()
+            if self._slots is None or self._slots_loop is not loop:
+                self._slots = asyncio.Semaphore(self.queue_size)
+                self._slots_loop = loop
+
+            async with self._slots:
+                fresh = await loop.run_in_executor(
+                    self._executor,
+                    _convert_in_worker,
+                    [result.texts[i] for i in missing],
+                )
+            for i, markdown in zip(missing, fresh):
+                converted[i] = markdown
+            if self.cache is not None:
+                await asyncio.to_thread(self._store, [keys[i] for i in missing], fresh)
+
+        result.texts = [markdown for markdown in converted if markdown]
+        result.timings["markdown"] = (
+            result.timings.get("markdown", 0.0) + time.perf_counter() - started
+        )
+        return result
+
+    def _lookup(self, keys: List[str]) -> List[Optional[str]]:
+        assert self.cache is not None
+        return [self.cache.get(key, CACHE_OPTIONS) for key in keys]
+
+    def _store(self, keys: List[str], markdowns: List[str]) -> None:
+        assert self.cache is not None
+        for key, markdown in zip(keys, markdowns):
+            self.cache.put(key, CACHE_OPTIONS, markdown)
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(cancel_futures=True)
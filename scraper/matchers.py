@@ -0,0 +1,144 @@
+import re
+from dataclasses import astuple
+from typing import Any, Callable, List, Optional, Pattern, Union
+
+from .config import LinkConfig, TextConfig
+from .parsers import Document, is_selectolax
+
+Config = Union[TextConfig, LinkConfig]
+
+
+def _drop_nested(
+    elements: List[Any], nesting: str, key: Callable[[Any], int]
+) -> List[Any]:
+    """
+    Keep only the outermost or innermost of nested matches.
+
+    Only the matches' ancestor chains are walked, so this stays linear in the
+    number of matches times the nesting depth. Extracting the text of the
+    kept, disjoint elements then visits every node at most once.
+
+    Args:
+        elements: Matches in document order
+        nesting: "outermost" or "innermost"
+        key: Identity of an element, stable across parent lookups
+    """
+    matched = {key(element) for element in elements}
+    nested: set[int] = set()
+    for element in elements:
+        parent = element.parent
+        while parent is not None:
+            parent_key = key(parent)
+            if parent_key in matched:
+                if nesting == "outermost":
+                    nested.add(key(element))
+                    break
+                if parent_key in nested:
+                    # Marked by a sibling, along with every matched ancestor
+                    break
+                nested.add(parent_key)
+            parent = parent.parent
+    return [element for element in elements if key(element) not in nested]
+
+
+def _quote(value: str) -> str:
+    """Quote a value for use inside a CSS attribute selector."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _is_literal(pattern: str) -> bool:
+    """Check whether a regular expression only matches its own text."""
+    return not any(char in pattern for char in r".^$*+?{}[]\|()")
+
+
+class ElementMatcher:
+    """A TextConfig or LinkConfig compiled once into a reusable matcher.
+
+    The config is turned into a single CSS selector, which soupsieve
+    precompiles for BeautifulSoup documents and selectolax evaluates natively
+    (the fast path). A `class_contains` value that is a real regular
+    expression cannot be written in CSS, so it is precompiled and applied to
+    the selector's matches instead. A config with `selector` set uses that CSS
+    selector as is.
+
+    Args:
+        config: The TextConfig or LinkConfig to compile
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.class_pattern: Optional[Pattern[str]] = None
+        self.css = config.selector or self._build_css(config)
+        self._compiled: Any = None
+
+    def _build_css(self, config: Config) -> str:
+        selector = config.tag or "*"
+        if config.id:
+            selector += f"[id={_quote(config.id)}]"
+        role = getattr(config, "role", None)
+        if role:
+            selector += f"[role={_quote(role)}]"
+
+        if config.class_name:
+            # BeautifulSoup matches a single class, or the attribute as a whole
+            if " " in config.class_name.strip():
+                selector += f"[class={_quote(config.class_name)}]"
+            else:
+                selector += f"[class~={_quote(config.class_name)}]"
+        elif config.class_contains:
+            if _is_literal(config.class_contains):
+                selector += f"[class*={_quote(config.class_contains)}]"
+            else:
+                selector += "[class]"
+                self.class_pattern = re.compile(config.class_contains)
+        return selector
+
+    def _class_matches(self, class_attr: Any) -> bool:
+        if self.class_pattern is None:
+            return True
+        if isinstance(class_attr, list):
+            class_attr = " ".join(class_attr)
+        # BeautifulSoup tries each class on its own, then the whole attribute value
+        candidates = str(class_attr or "").split() + [str(class_attr or "")]
+        return any(self.class_pattern.search(candidate) for candidate in candidates)
+
+    def select(self, document: Document) -> List[Any]:
+        """Return the matching elements in document order.
+
+        With a TextConfig whose `nesting` is "outermost" or "innermost",
+        matches nested in other matches are dropped accordingly.
+        """
+        nesting = getattr(self.config, "nesting", "all")
+        if is_selectolax(document):
+            nodes = document.css(self.css)
+            if self.class_pattern is not None:
+                nodes = [
+                    n for n in nodes if self._class_matches(n.attributes.get("class"))
+                ]
+            if nesting == "all":
+                return nodes
+            # selectolax hands out a new wrapper object on every lookup
+            return _drop_nested(nodes, nesting, key=lambda node: node.mem_id)
+
+        if self._compiled is None:
+            import soupsieve  # type: ignore
+
+            self._compiled = soupsieve.compile(self.css)
+        elements = self._compiled.select(document)
+        if self.class_pattern is not None:
+            elements = [e for e in elements if self._class_matches(e.get("class"))]
+        if nesting == "all":
+            return elements
+        return _drop_nested(elements, nesting, key=id)
+
+
+_matchers: dict[tuple, ElementMatcher] = {}
+
+
+def compile_matcher(config: Config) -> ElementMatcher:
+    """Return the matcher for a config, compiling it on first use."""
+    key = (type(config).__name__,) + astuple(config)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        matcher = _matchers[key] = ElementMatcher(config)
+    return matcher
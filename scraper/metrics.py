@@ -0,0 +1,286 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Pipeline stages, in the order a page goes through them. "ttfb" (time to
+# first byte) runs until the response headers are in, so it includes the DNS
+# lookup, connect and TLS handshake as well as the server's own time
+STAGES = ("ttfb", "download", "parse", "extract", "markdown", "write")
+
+
+class Histogram:
+    """Fixed-bucket histogram, cumulative like Prometheus' histograms.
+
+    Args:
+        buckets: Sorted upper bounds of the buckets; +Inf is implied
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile like Prometheus' `histogram_quantile`.
+
+        The value is interpolated linearly within the bucket holding it,
+        assuming observations are spread evenly over the bucket. A quantile
+        in the +Inf bucket is reported as the largest finite bound.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count) pairs for the Prometheus text format."""
+        pairs, seen = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            pairs.append((f"{bound:g}", seen))
+        pairs.append(("+Inf", self.count))
+        return pairs
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class CrawlMetrics:
+    """Counters, stage timers and per-host latencies of one crawl.
+
+    Every method is thread-safe: fetch threads, the event loop and the
+    writer all record into the same instance. Timings measured in parse
+    worker processes travel back with the page and are recorded here.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self.pages: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.bytes = 0
+        self.retries = 0
+        self.stages: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.hosts: defaultdict[str, Histogram] = defaultdict(Histogram)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Record the time one page spent in a pipeline stage."""
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_fetch(self, host: str, seconds: float, size: int) -> None:
+        """Record a completed download: its latency and body size."""
+        with self._lock:
+            self.hosts[host].observe(seconds)
+            self.bytes += size
+
+    def record_page(self, status: str) -> None:
+        with self._lock:
+            self.pages[status] += 1
+
+    def record_error(self, error: BaseException) -> None:
+        with self._lock:
+            self.errors[type(error).__name__] += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of every metric, for the JSON metrics file."""
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+            pages = sum(self.pages.values())
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "pages": dict(self.pages),
+                "pages_per_second": round(pages / elapsed, 3) if elapsed else 0.0,
+                "bytes": self.bytes,
+                "bytes_per_second": round(self.bytes / elapsed, 1) if elapsed else 0.0,
+                "retries": self.retries,
+                "errors": dict(self.errors),
+                "stages": {name: h.to_dict() for name, h in self.stages.items()},
+                "hosts": {name: h.to_dict() for name, h in self.hosts.items()},
+            }
+
+    def summary(self) -> str:
+        """One-line summary for the periodic log."""
+        snapshot = self.to_dict()
+        stages = ", ".join(
+            f"{name} {stats['mean'] * 1000:.0f}ms"
+            for name, stats in sorted(
+                snapshot["stages"].items(),
+                key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else 99,
+            )
+        )
+        return (
+            f"{sum(snapshot['pages'].values())} pages "
+            f"({snapshot['pages_per_second']:.1f}/s), "
+            f"{snapshot['bytes'] / 1e6:.1f} MB "
+            f"({snapshot['bytes_per_second'] / 1e6:.2f} MB/s), "
+            f"{sum(snapshot['errors'].values())} errors, {snapshot['retries']} retries"
+            + (f" | mean {stages}" if stages else "")
+        )
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# TYPE crawler_pages_total counter",
+                *(
+                    f'crawler_pages_total{{status="{status}"}} {count}'
+                    for status, count in self.pages.items()
+                ),
+                "# TYPE crawler_errors_total counter",
+                *(
+                    f'crawler_errors_total{{type="{name}"}} {count}'
+                    for name, count in self.errors.items()
+                ),
+                "# TYPE crawler_bytes_total counter",
+                f"crawler_bytes_total {self.bytes}",
+                "# TYPE crawler_retries_total counter",
+                f"crawler_retries_total {self.retries}",
+                "# TYPE crawler_uptime_seconds gauge",
+                f"crawler_uptime_seconds {time.monotonic() - self.started:.3f}",
+            ]
+            for metric, label, histograms in (
+                ("crawler_stage_seconds", "stage", self.stages),
+                ("crawler_host_latency_seconds", "host", self.hosts),
+            ):
+                lines.append(f"# TYPE {metric} histogram")
+                for name, histogram in histograms.items():
+                    for le, count in histogram.cumulative():
+                        lines.append(
+                            f'{metric}_bucket{{{label}="{name}",le="{le}"}} {count}'
+                        )
+                    series = f'{{{label}="{name}"}}'
+                    lines.append(f"{metric}_sum{series} {histogram.sum:.6f}")
+                    lines.append(f"{metric}_count{series} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: Path) -> None:
+        _write_atomic(path, json.dumps(self.to_dict(), indent=2))
+
+    def write_prometheus(self, path: Path) -> None:
+        _write_atomic(path, self.to_prometheus())
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    # Scrapers (e.g. node_exporter's textfile collector) never see half a file
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsReporter(threading.Thread):
+    """Background thread logging a summary and refreshing the Prometheus file.
+
+    Args:
+        metrics: The metrics to report
+        interval: Seconds between two reports
+        prometheus_file: Optional file rewritten with every report
+    """
+
+    def __init__(
+        self,
+        metrics: CrawlMetrics,
+        interval: float = 30.0,
+        prometheus_file: Optional[Path] = None,
+    ) -> None:
+        super().__init__(name="metrics-reporter", daemon=True)
+        self.metrics = metrics
+        self.interval = interval
+        self.prometheus_file = prometheus_file
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.report()
+
+    def report(self) -> None:
+        logger.info(f"Metrics: {self.metrics.summary()}")
+        if self.prometheus_file is not None:
+            self.metrics.write_prometheus(self.prometheus_file)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+
+def serve_prometheus(
+    metrics: CrawlMetrics, port: int, host: str = "127.0.0.1"
+) -> "ThreadingHTTPServer":
+    """
+    Serve the metrics at http://<host>:<port>/metrics from a daemon thread.
+
+    Only local scrapers can reach the default host; pass "0.0.0.0" to serve
+    the metrics to the network.
+
+    Returns:
+        ThreadingHTTPServer: The server; call `shutdown()` and
+            `server_close()` to stop it
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    ).start()
+    logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+    return server
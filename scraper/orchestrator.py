@@ -0,0 +1,177 @@
+import asyncio
+import inspect
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional, Union, cast
+
+from .batch import BatchLimits
+from .content_scraper import PageResult
+from .frontier import Frontier, FrontierItem
+from .markdown_pool import MarkdownPool
+from .metrics import CrawlMetrics
+from .parse_pool import ParsePool
+from .politeness import PolitenessScheduler
+from .work_queue import WorkQueue
+
+
+class CrawlOrchestrator:
+    """Fetch frontier items concurrently and hand the results back in order.
+
+    At most `concurrency` fetches run at a time, and up to as many more items
+    are taken from the frontier to wait for a host that is at its
+    `per_host_limit`, without holding a fetch slot. Each blocking `fetch`
+    call runs on a thread (a coroutine function is awaited on the event loop
+    instead). Results are
+    buffered until every earlier item has finished, so `handle` (writing the
+    combined output, appending to the log and queueing newly discovered links)
+    always runs on the event loop thread, one page at a time, in the order the
+    items left the frontier.
+
+    With a `parse_pool`, `fetch` only downloads the page and parsing runs on
+    worker processes. A fetch slot is freed as soon as the body is in, so up
+    to `concurrency` downloads and the pool's queue of pages are in flight at
+    the same time; when the queue is full, finished downloads wait for it and
+    no new ones start. A `markdown_pool` converts the extracted elements
+    after that, with its own queue.
+
+    Args:
+        fetch: Callable that fetches and extracts a single item, blocking or async
+        handle: Callable run for every result, in dispatch order
+        concurrency: Maximum number of pages fetched at the same time
+        per_host_limit: Maximum number of concurrent fetches against one host
+        max_pages: Optional cap on the number of pages fetched in this run
+        scheduler: Optional politeness scheduler for rate limits, robots.txt
+            and retries
+        parse_pool: Optional process pool that extracts the fetched pages
+        markdown_pool: Optional process pool converting extracted pages to Markdown
+        limits: Optional fetch limits shared with the other crawls of a batch
+        metrics: Optional metrics that retries are counted in
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[
+            [FrontierItem], Union[PageResult, Awaitable[PageResult]]
+        ],
+        handle: Callable[[PageResult], None],
+        concurrency: int = 8,
+        per_host_limit: int = 6,
+        max_pages: Optional[int] = None,
+        scheduler: Optional[PolitenessScheduler] = None,
+        parse_pool: Optional[ParsePool] = None,
+        metrics: Optional[CrawlMetrics] = None,
+        markdown_pool: Optional[MarkdownPool] = None,
+        limits: Optional[BatchLimits] = None,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        if per_host_limit < 1:
+            raise ValueError(f"per_host_limit must be at least 1, got {per_host_limit}")
+
+        self.fetch = fetch
+        self.handle = handle
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.max_pages = max_pages
+        self.scheduler = scheduler
+        self.parse_pool = parse_pool
+        self.markdown_pool = markdown_pool
+        self.limits = limits
+        self.metrics = metrics
+
+    def run(self, frontier: Union[Frontier, WorkQueue]) -> int:
+        """Crawl until the frontier is empty or `max_pages` is reached.
+
+        A shared WorkQueue counts as empty when this worker cannot lease
+        more URLs, though other workers may still be adding some.
+
+        Returns:
+            int: The number of pages fetched
+        """
+        return asyncio.run(self._run(frontier))
+
+    async def _run(self, frontier: Union[Frontier, WorkQueue]) -> int:
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.concurrency))
+
+        host_limits: defaultdict[str, asyncio.Semaphore] = defaultdict(
+            lambda: asyncio.Semaphore(self.per_host_limit)
+        )
+        fetch_slots = asyncio.Semaphore(self.concurrency)
+        # Room for as many tasks waiting on a busy host as are fetching, so
+        # the fetch slots they leave free can go to other hosts
+        max_in_flight = 2 * self.concurrency
+        if self.parse_pool is not None:
+            max_in_flight += self.parse_pool.queue_size
+        if self.markdown_pool is not None:
+            max_in_flight += self.markdown_pool.queue_size
+        in_flight: dict[asyncio.Task[PageResult], tuple[int, FrontierItem]] = {}
+        finished: dict[int, tuple[FrontierItem, PageResult]] = {}
+        dispatched = 0
+        next_seq = 0
+
+        async def fetch_item(item: FrontierItem) -> PageResult:
+            # The host comes first: a task queued behind a busy host must not
+            # sit on a global slot that a fetch from another host could use
+            async with host_limits[item.link.domain], fetch_slots:
+                if self.limits is not None:
+                    async with self.limits.slot(item.link.domain):
+                        result = await self._fetch_with_retries(item)
+                else:
+                    result = await self._fetch_with_retries(item)
+            result.depth = item.depth
+            if self.parse_pool is not None and result.error is None:
+                try:
+                    result = await self.parse_pool.extract(result)
+                except Exception as e:
+                    result.error = e
+            if self.markdown_pool is not None and result.error is None:
+                try:
+                    result = await self.markdown_pool.convert(result)
+                except Exception as e:
+                    result.error = e
+            return result
+
+        def can_dispatch() -> bool:
+            if self.max_pages is not None and dispatched >= self.max_pages:
+                return False
+            return len(in_flight) < max_in_flight and len(frontier) > 0
+
+        while True:
+            while can_dispatch():
+                item = frontier.pop()
+                task = asyncio.create_task(fetch_item(item))
+                in_flight[task] = (dispatched, item)
+                dispatched += 1
+
+            if not in_flight:
+                break
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                seq, item = in_flight.pop(task)
+                finished[seq] = (item, task.result())
+
+            # Handling may queue new links, which the next loop iteration picks up
+            while next_seq in finished:
+                item, result = finished.pop(next_seq)
+                self.handle(result)
+                frontier.done(item)
+                next_seq += 1
+
+        return dispatched
+
+    async def _fetch_with_retries(self, item: FrontierItem) -> PageResult:
+        async def fetch() -> PageResult:
+            if inspect.iscoroutinefunction(self.fetch):
+                return await self.fetch(item)
+            # Not a coroutine function, so it returns the result itself
+            return cast(PageResult, await asyncio.to_thread(self.fetch, item))
+
+        try:
+            if self.scheduler is None:
+                return await fetch()
+            on_retry = self.metrics.record_retry if self.metrics is not None else None
+            return await self.scheduler.call(item.link.href, fetch, on_retry)
+        except Exception as e:
+            return PageResult(link=item.link, error=e)
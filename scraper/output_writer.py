@@ -0,0 +1,239 @@
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+OUTPUT_HEADER = "SCRAPED CONTENT\n\n"
+TITLE_OPEN, TITLE_CLOSE = b"<TITLE>", b"</TITLE>\n"
+URL_OPEN, URL_CLOSE = b"<URL>", b"</URL>\n"
+DOCUMENT_END = b"<END_OF_CONTENT></END_OF_CONTENT>\n"
+
+
+def format_document(title: str, texts: List[str], url: Optional[str] = None) -> str:
+    """Render one page in the combined output format."""
+    parts = [f"<TITLE>{title}</TITLE>\n"]
+    if url is not None:
+        parts.append(f"<URL>{url}</URL>\n")
+    parts.append("\n")
+    parts.extend(f"<CONTENT>{text}</CONTENT>\n" for text in texts)
+    parts.append("<END_OF_CONTENT></END_OF_CONTENT>\n\n")
+    return "".join(parts)
+
+
+def content_hash(texts: List[str]) -> str:
+    """Fingerprint the extracted texts of a page, to detect changed content."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class OutputWriter:
+    """Buffered writer for the combined .txt output.
+
+    One handle stays open for the whole crawl with a large buffer, and every
+    page is rendered into a single string before it is written. Data is
+    flushed once `flush_bytes` have accumulated or `flush_interval` seconds
+    have passed, and fsynced on close, so a crash loses at most one interval.
+    Documents are written in the order `write_document` is called, which the
+    orchestrator keeps equal to page order.
+
+    Args:
+        path: The combined output file
+        append: Keep existing content instead of starting a new file
+        buffer_size: Size of the file buffer in bytes
+        flush_bytes: Flush after this many bytes were written
+        flush_interval: Flush after this many seconds since the last flush
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        append: bool = False,
+        buffer_size: int = 1 << 20,
+        flush_bytes: int = 4 << 20,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self._file = open(path, "a" if append else "w", buffering=buffer_size)
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+        if not append:
+            self._write(OUTPUT_HEADER)
+
+    def __enter__(self) -> "OutputWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_document(
+        self, title: str, texts: List[str], url: Optional[str] = None
+    ) -> None:
+        """Write one page with a single buffered write."""
+        self._write(format_document(title, texts, url))
+
+    def _write(self, data: str) -> None:
+        self._file.write(data)
+        self._unflushed += len(data)
+        if (
+            self._unflushed >= self.flush_bytes
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Hand buffered data to the operating system."""
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Flush, fsync and close the file."""
+        if self._file.closed:
+            return
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+def index_documents(
+    path: Path,
+) -> Tuple[Dict[str, List[Tuple[int, int]]], Dict[str, List[Tuple[int, int]]]]:
+    """
+    Find the byte range of every document in a combined output file.
+
+    Returns:
+        Tuple: (start, end) ranges in file order, per page URL and, for
+            documents written without a `<URL>` line by older versions, per
+            title. A page appears more than once if it was written again, e.g.
+            by a resumed crawl.
+    """
+    by_url: Dict[str, List[Tuple[int, int]]] = {}
+    by_title: Dict[str, List[Tuple[int, int]]] = {}
+    title, url, start, position = None, None, 0, 0
+    after_title = False
+    with open(path, "rb") as f:
+        for line in f:
+            if line.startswith(TITLE_OPEN) and line.endswith(TITLE_CLOSE):
+                title = line[len(TITLE_OPEN) : -len(TITLE_CLOSE)].decode("utf-8")
+                url = None
+                start = position
+                after_title = True
+            else:
+                # The URL, if any, is on the line right after the title
+                is_url = line.startswith(URL_OPEN) and line.endswith(URL_CLOSE)
+                if after_title and is_url:
+                    url = line[len(URL_OPEN) : -len(URL_CLOSE)].decode("utf-8")
+                after_title = False
+            position += len(line)
+            if title is not None and line == DOCUMENT_END:
+                # The blank line after the end marker belongs to the document
+                if f.peek(1)[:1] == b"\n":
+                    position += len(f.readline())
+                if url is not None:
+                    by_url.setdefault(url, []).append((start, position))
+                else:
+                    by_title.setdefault(title, []).append((start, position))
+                title = None
+    return by_url, by_title
+
+
+def _copy_range(src: BinaryIO, dst: BinaryIO, start: int, end: int) -> None:
+    src.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        chunk = src.read(min(remaining, 1 << 20))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
+
+
+class OutputPatcher(OutputWriter):
+    """Writer that updates an existing combined output instead of rewriting it.
+
+    Documents whose URL is not in the file yet are appended like with
+    `OutputWriter`. Documents that replace an existing one are kept until
+    `close`, which splices them into the file in a single pass: untouched
+    byte ranges are copied as they are, stale copies of a page are dropped,
+    and the result is fsynced and swapped in atomically. Pages are matched by
+    URL, as titles only keep the end of the URL path and can collide. Titles
+    are only used for documents an older version wrote without a `<URL>` line,
+    each of which is replaced at most once. Only changed pages have to be
+    passed in, so an incremental crawl never rebuilds the output.
+
+    Args:
+        path: The combined output file, created if it does not exist
+        buffer_size: Size of the file buffer in bytes
+        flush_bytes: Flush after this many bytes were written
+        flush_interval: Flush after this many seconds since the last flush
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        buffer_size: int = 1 << 20,
+        flush_bytes: int = 4 << 20,
+        flush_interval: float = 5.0,
+    ) -> None:
+        exists = path.exists()
+        self._by_url, self._by_title = index_documents(path) if exists else ({}, {})
+        # Replaced ranges, keyed by the start of the first copy of the page
+        self._replacements: Dict[int, Tuple[List[Tuple[int, int]], bytes]] = {}
+        super().__init__(
+            path,
+            append=exists,
+            buffer_size=buffer_size,
+            flush_bytes=flush_bytes,
+            flush_interval=flush_interval,
+        )
+
+    def write_document(
+        self, title: str, texts: List[str], url: Optional[str] = None
+    ) -> None:
+        """Append a new page, or queue the replacement of an existing one."""
+        ranges = self._by_url.get(url) if url is not None else None
+        if ranges is None:
+            ranges = self._by_title.pop(title, None)
+        if ranges is None:
+            super().write_document(title, texts, url)
+            return
+        document = format_document(title, texts, url).encode("utf-8")
+        self._replacements[ranges[0][0]] = (ranges, document)
+
+    def close(self) -> None:
+        """Close the file, then splice the replaced documents into it."""
+        if self._file.closed:
+            return
+        super().close()
+        if self._replacements:
+            self._apply_replacements()
+
+    def _apply_replacements(self) -> None:
+        # The first copy of a page is replaced, any later ones are removed
+        edits = []
+        for ranges, document in self._replacements.values():
+            edits.append((ranges[0], document))
+            edits.extend((extra, b"") for extra in ranges[1:])
+        edits.sort(key=lambda edit: edit[0])
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            position = 0
+            for (start, end), document in edits:
+                _copy_range(src, dst, position, start)
+                dst.write(document)
+                position = end
+            src.seek(position)
+            shutil.copyfileobj(src, dst, 1 << 20)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, self.path)
+        self._replacements.clear()
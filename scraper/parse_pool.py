@@ -0,0 +1,117 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .config import LinkConfig, TextConfig
+from .content_scraper import PageResult, extract_page
+from .link import Link
+
+# Set once per worker process by `_init_worker`
+_worker_options: Optional[tuple[TextConfig, str, Optional[LinkConfig]]] = None
+
+
+def _init_worker(
+    text_config: TextConfig, parser: str, link_config: Optional[LinkConfig]
+) -> None:
+    global _worker_options
+    _worker_options = (text_config, parser, link_config)
+
+
+def _extract_in_worker(
+    html: str, base_url: str, follow_links: bool
+) -> tuple[List[str], List[Link], Dict[str, float]]:
+    assert _worker_options is not None, "worker was not initialized"
+    text_config, parser, link_config = _worker_options
+    timings: Dict[str, float] = {}
+    texts, links = extract_page(
+        html, base_url, text_config, parser, follow_links, link_config, timings
+    )
+    return texts, links, timings
+
+
+def worker_context() -> multiprocessing.context.BaseContext:
+    """Start method for the crawl's worker processes.
+
+    Pools are started while fetch threads (and a queue worker's heartbeat)
+    are running, and a forked child inherits whatever locks those threads
+    held at the time. Workers are started from a forkserver instead, or
+    spawned where there is none.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class ParsePool:
+    """Process pool that parses and extracts fetched pages off the fetch threads.
+
+    Parsing and text extraction are CPU-bound and hold the GIL, so with many
+    fetch threads one core saturates long before the network does. Pages are
+    handed to `workers` processes instead. The extraction settings are sent
+    to every worker once, so a job is only the body and the page URL. At most
+    `queue_size` pages wait for or are in a worker at a time; fetches that
+    finish while the queue is full wait for a free slot, which is the
+    backpressure that keeps memory bounded.
+
+    Args:
+        text_config: Configuration for text extraction
+        parser: Parser backend used in the workers
+        link_config: Configuration scoping which links are followed
+        max_depth: Pages at this depth or deeper do not have their links extracted
+        workers: Number of worker processes (defaults to the CPU count)
+        queue_size: Maximum number of pages queued for the workers
+            (defaults to twice the number of workers)
+        keep_html: Whether results keep the raw HTML after extraction
+    """
+
+    def __init__(
+        self,
+        text_config: TextConfig,
+        parser: str = "html.parser",
+        link_config: Optional[LinkConfig] = None,
+        max_depth: int = 1,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        keep_html: bool = True,
+    ) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size or 2 * self.workers
+        self.max_depth = max_depth
+        self.keep_html = keep_html
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=worker_context(),
+            initializer=_init_worker,
+            initargs=(text_config, parser, link_config),
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def extract(self, result: PageResult) -> PageResult:
+        """Fill in the texts and links of a fetched page on a worker."""
+        if result.html_content is None:
+            return result
+        # The queue belongs to the event loop of the crawl using the pool
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.queue_size)
+            self._slots_loop = loop
+
+        async with self._slots:
+            result.texts, result.links, timings = await loop.run_in_executor(
+                self._executor,
+                _extract_in_worker,
+                result.html_content,
+                result.link.href,
+                result.depth < self.max_depth,
+            )
+        result.timings.update(timings)
+        if not self.keep_html:
+            result.html_content = None
+        return result
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        self._executor.shutdown(cancel_futures=True)
@@ -0,0 +1,93 @@
+import importlib.util
+from typing import TYPE_CHECKING, Any, List, TypeGuard, Union
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+    from selectolax.parser import HTMLParser as SelectolaxTree  # type: ignore
+
+# Fastest first: "auto" picks the first one that is installed
+PARSER_BACKENDS = ("selectolax", "lxml", "html.parser")
+PARSER_CHOICES = ("auto",) + PARSER_BACKENDS
+
+# Tags whose text BeautifulSoup's get_text() leaves out
+NON_TEXT_TAGS = ["script", "style", "template"]
+
+Document = Union["BeautifulSoup", "SelectolaxTree"]
+
+
+def available_parsers() -> List[str]:
+    """List the parser backends that can be used in this environment."""
+    # html.parser ships with Python, the others are optional installs
+    return [
+        backend
+        for backend in PARSER_BACKENDS
+        if backend == "html.parser" or importlib.util.find_spec(backend) is not None
+    ]
+
+
+def resolve_parser(name: str = "auto") -> str:
+    """
+    Turn a parser choice into a concrete, installed backend.
+
+    Args:
+        name: One of PARSER_CHOICES
+
+    Returns:
+        str: The backend name to pass to `parse_html`
+
+    Raises:
+        ValueError: If the backend is unknown or not installed
+    """
+    if name not in PARSER_CHOICES:
+        raise ValueError(f"Unknown parser {name!r}, expected one of {PARSER_CHOICES}")
+
+    available = available_parsers()
+    if name == "auto":
+        return available[0]
+    if name not in available:
+        raise ValueError(f"Parser {name!r} is not installed")
+    return name
+
+
+def parse_html(html: str, parser: str = "html.parser") -> Document:
+    """
+    Parse an already decoded HTML string with the given backend.
+
+    Args:
+        html: The decoded page body
+        parser: A backend returned by `resolve_parser`
+
+    Returns:
+        Document: A BeautifulSoup object, or a selectolax tree for "selectolax"
+    """
+    if parser == "selectolax":
+        from selectolax.parser import HTMLParser  # type: ignore
+
+        tree = HTMLParser(html)
+        # Match BeautifulSoup, whose get_text() does not return script/style text
+        tree.strip_tags(NON_TEXT_TAGS)
+        return tree
+
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html, parser)
+
+
+def is_selectolax(document: Document) -> TypeGuard["SelectolaxTree"]:
+    """Check whether a parsed document came from the selectolax backend."""
+    # Checked by module so bs4 is not imported just to answer this
+    return type(document).__module__.startswith("selectolax")
+
+
+def node_text(node: Any) -> str:
+    """Return the stripped text of an element from either backend."""
+    if hasattr(node, "get_text"):
+        return node.get_text(strip=True)
+    return node.text(deep=True, separator="", strip=True)
+
+
+def node_html(node: Any) -> str:
+    """Return the outer HTML of an element from either backend."""
+    if hasattr(node, "get_text"):
+        return str(node)
+    return node.html or ""
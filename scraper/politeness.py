@@ -0,0 +1,264 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional, TypeVar
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+from loguru import logger
+
+from .fetcher import FetchError
+
+
+T = TypeVar("T")
+
+# Rules standing in for a robots.txt that could not be read
+ALLOW_ALL: list[str] = []
+DISALLOW_ALL = ["User-agent: *", "Disallow: /"]
+
+
+class DisallowedByRobots(Exception):
+    """Raised for URLs the site's robots.txt does not allow us to fetch"""
+
+
+class TokenBucket:
+    """Token bucket limiting the request rate against one host.
+
+    The rate adapts AIMD-style: it is halved when the host pushes back
+    (429/503) and creeps back up towards `max_rate` with every success, so a
+    crawl settles at the highest rate the host tolerates.
+
+    Args:
+        rate: Requests per second allowed at most
+        burst: Number of requests that may be sent back to back
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        while True:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+            elif self.tokens >= 1:
+                self.tokens -= 1
+                return
+            else:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def slow_down(self, pause: float = 0.0, min_rate: float = 0.05) -> None:
+        """Halve the rate and optionally stop sending for `pause` seconds."""
+        self.rate = max(min_rate, self.rate / 2)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    def speed_up(self, step: float = 0.1) -> None:
+        """Recover part of the rate after a successful request."""
+        self.rate = min(self.max_rate, self.rate + step * self.max_rate)
+
+
+class RobotsCache:
+    """Parsed robots.txt per host, fetched once and kept for the whole crawl.
+
+    Args:
+        session: Session used to download robots.txt
+        user_agent: User agent the rules are evaluated for
+        timeout: Timeout for the robots.txt request
+    """
+
+    def __init__(
+        self, session: requests.Session, user_agent: str = "*", timeout: float = 10.0
+    ) -> None:
+        self.session = session
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self._parsers: dict[str, RobotFileParser] = {}
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+    def _download(self, root: str) -> RobotFileParser:
+        url = f"{root}/robots.txt"
+        parser = RobotFileParser()
+        parser.set_url(url)
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Could not fetch {url}, allowing everything: {e}")
+            parser.parse(ALLOW_ALL)
+            return parser
+
+        # Same conventions as RobotFileParser.read()
+        if response.status_code in (401, 403):
+            parser.parse(DISALLOW_ALL)
+        elif response.status_code >= 400:
+            parser.parse(ALLOW_ALL)
+        else:
+            parser.parse(response.text.splitlines())
+        return parser
+
+    async def get(self, url: str) -> RobotFileParser:
+        """Return the robots.txt rules for the host of a URL."""
+        parts = urlsplit(url)
+        root = f"{parts.scheme}://{parts.netloc}"
+        if root not in self._parsers:
+            async with self._locks[root]:
+                if root not in self._parsers:
+                    self._parsers[root] = await asyncio.to_thread(self._download, root)
+        return self._parsers[root]
+
+
+class PolitenessScheduler:
+    """Per-host rate limiting, robots.txt rules and retries with backoff.
+
+    Every host gets its own token bucket. A `Crawl-delay` in robots.txt
+    lowers that host's rate, 429/503 responses halve it and pause the host
+    for `Retry-After` (or an exponential backoff), and transient failures are
+    retried with full jitter.
+
+    Args:
+        rate: Maximum requests per second against one host
+        burst: Requests that may be sent back to back to one host
+        max_retries: Retries of a transient failure before giving up
+        backoff_base: Base delay of the exponential backoff, in seconds
+        max_backoff: Upper bound for a single backoff delay, in seconds
+        max_retry_after: Upper bound for a server's Retry-After, in seconds;
+            longer pauses are shortened to it rather than given up on
+        robots: Optional robots.txt cache; None ignores robots.txt
+    """
+
+    def __init__(
+        self,
+        rate: float = 5.0,
+        burst: float = 2.0,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        max_backoff: float = 60.0,
+        max_retry_after: float = 600.0,
+        robots: Optional[RobotsCache] = None,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.robots = robots
+        self._buckets: dict[str, TokenBucket] = {}
+
+    async def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.rate, self.burst
+            if self.robots is not None:
+                rules = await self.robots.get(url)
+                delay = rules.crawl_delay(self.robots.user_agent)
+                if delay:
+                    rate, burst = min(rate, 1 / float(delay)), 1.0
+                    logger.info(f"Honoring Crawl-delay of {delay}s for {host}")
+            bucket = self._buckets.setdefault(host, TokenBucket(rate, burst))
+        return bucket
+
+    async def admit(self, url: str) -> None:
+        """
+        Wait until a request to `url` may be sent.
+
+        Raises:
+            DisallowedByRobots: If robots.txt forbids fetching the URL
+        """
+        if self.robots is not None:
+            rules = await self.robots.get(url)
+            if not rules.can_fetch(self.robots.user_agent, url):
+                raise DisallowedByRobots(f"robots.txt disallows {url}")
+        await (await self._bucket(url)).acquire()
+
+    async def call(
+        self,
+        url: str,
+        fetch: Callable[[], Awaitable[T]],
+        on_retry: Optional[Callable[[], None]] = None,
+    ) -> T:
+        """
+        Run a request to `url` once admitted, retrying transient failures.
+
+        Args:
+            url: The URL requested
+            fetch: Makes the request; called again for every retry
+            on_retry: Called before every retry, e.g. to count it
+
+        Raises:
+            DisallowedByRobots: If robots.txt forbids fetching the URL
+            Exception: The last error of `fetch` once it is not retried
+        """
+        attempt = 0
+        while True:
+            try:
+                await self.admit(url)
+                result = await fetch()
+            except Exception as e:
+                delay = self.retry_delay(url, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                if on_retry is not None:
+                    on_retry()
+                logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempt}): {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            self.record_success(url)
+            return result
+
+    def record_success(self, url: str) -> None:
+        bucket = self._buckets.get(urlsplit(url).netloc)
+        if bucket is not None:
+            bucket.speed_up()
+
+    def retry_delay(self, url: str, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Decide whether a failed request is retried, and after how long.
+
+        Args:
+            url: The URL that failed
+            error: The exception raised by the fetch
+            attempt: Number of retries already made
+
+        Returns:
+            Optional[float]: Seconds to wait before retrying, or None to give up
+        """
+        if attempt >= self.max_retries:
+            return None
+
+        backoff = min(self.max_backoff, self.backoff_base * 2**attempt)
+        delay = random.uniform(0, backoff)  # full jitter
+
+        if isinstance(error, FetchError):
+            if not error.retryable:
+                return None
+            if error.status_code in (429, 503):
+                pause = backoff
+                if error.retry_after is not None:
+                    # Retrying before the server's Retry-After would only be
+                    # refused, so it is waited out even past max_backoff
+                    pause = min(error.retry_after, self.max_retry_after)
+                bucket = self._buckets.get(urlsplit(url).netloc)
+                if bucket is not None:
+                    bucket.slow_down(pause=pause)
+                delay = max(delay, pause)
+            return delay
+
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return delay
+        return None
@@ -0,0 +1,130 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from loguru import logger
+
+from .config import TextConfig
+from .content_scraper import BoilerplateFilter, extract_text
+from .html_archive import HtmlArchive, load_html
+from .markdown_pool import convert_fragments
+from .output_writer import OutputWriter
+from .parse_pool import worker_context
+from .parsers import parse_html
+from .response_cache import ResponseCache
+from .scraping_page_log import PageLog
+
+# Opened once per worker process by `_init_worker`
+_worker_archive: Optional[HtmlArchive] = None
+_worker_markdown_cache: Optional[ResponseCache] = None
+
+
+def _init_worker(archive_dir: Optional[Path], markdown_dir: Optional[Path]) -> None:
+    global _worker_archive, _worker_markdown_cache
+    if archive_dir is not None and (archive_dir / "archive.sqlite").exists():
+        _worker_archive = HtmlArchive(archive_dir, read_only=True)
+    if markdown_dir is not None:
+        _worker_markdown_cache = ResponseCache(markdown_dir, ttl=None)
+
+
+def _extract_saved_page(
+    task: tuple[str, str, TextConfig, str],
+) -> tuple[str, Optional[List[str]]]:
+    title, html_path, text_config, parser = task
+    try:
+        html = load_html(html_path, _worker_archive)
+    except OSError as e:
+        logger.warning(f"Cannot read saved HTML for {title}: {e}")
+        return title, None
+    texts = extract_text(parse_html(html, parser), text_config)
+    if text_config.format == "markdown":
+        texts = convert_fragments(texts, _worker_markdown_cache)
+    return title, texts
+
+
+def find_saved_pages(
+    page_log: PageLog, html_dir: Optional[Path] = None, base_url: Optional[str] = None
+) -> List[tuple[str, str, Optional[str]]]:
+    """
+    List the saved pages to re-extract, in the order they were first crawled.
+
+    Args:
+        page_log: The domain's crawl log
+        html_dir: Directory of saved .html files, used when the log has none
+        base_url: Base page of the crawl, which is not part of the output
+
+    Returns:
+        List of (title, html_path, url) tuples; the URL is None for pages
+        found only in `html_dir`
+    """
+    pages: List[tuple[str, str, Optional[str]]] = [
+        (page.title, page.html_path, page.url)
+        for page in page_log
+        if page.status in ("success", "unchanged")
+        and page.html_path
+        and page.url != base_url
+    ]
+    if pages or html_dir is None or not html_dir.exists():
+        return pages
+
+    return [
+        (path.stem, str(path), None)
+        for path in sorted(html_dir.glob("*.html"))
+        if not path.name.startswith("BASE_")
+    ]
+
+
+def reextract(
+    pages: List[tuple[str, str, Optional[str]]],
+    output_path: Path,
+    text_config: TextConfig,
+    parser: str = "html.parser",
+    workers: Optional[int] = None,
+    archive_dir: Optional[Path] = None,
+    dedupe_boilerplate: bool = False,
+    markdown_dir: Optional[Path] = None,
+) -> int:
+    """
+    Re-run text extraction over saved HTML and rewrite the combined output.
+
+    Pages are parsed on a process pool, one worker per core by default, and
+    written back in their original order.
+
+    Args:
+        pages: (title, html_path, url) tuples from `find_saved_pages`
+        output_path: The combined .txt output to regenerate
+        text_config: Configuration for text extraction
+        parser: Parser backend used in the workers
+        workers: Number of worker processes (defaults to the CPU count)
+        archive_dir: Archive directory for `archive:` html paths
+        dedupe_boilerplate: Drop text blocks already written for an earlier page
+        markdown_dir: Cache of converted fragments for the "markdown" format
+
+    Returns:
+        int: The number of pages written
+    """
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(pages) // (workers * 4))
+    tasks = [(title, html_path, text_config, parser) for title, html_path, _ in pages]
+    urls = [url for _, _, url in pages]
+    boilerplate = BoilerplateFilter() if dedupe_boilerplate else None
+
+    written = 0
+    with (
+        ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=worker_context(),
+            initializer=_init_worker,
+            initargs=(archive_dir, markdown_dir),
+        ) as pool,
+        OutputWriter(output_path) as writer,
+    ):
+        results = pool.map(_extract_saved_page, tasks, chunksize=chunksize)
+        for (title, texts), url in zip(results, urls):
+            if texts is not None:
+                if boilerplate is not None:
+                    texts = boilerplate(texts)
+                writer.write_document(title, texts, url)
+                written += 1
+    return written
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed);
+"""
+
+
+@dataclass
+class CacheStats:
+    """Counters of one run against the response cache"""
+
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    stored: int = 0
+    evicted: int = 0
+
+    def __str__(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate), "
+            f"{self.expired} expired, {self.stored} stored, {self.evicted} evicted"
+        )
+
+
+def cache_key(url: str, options: dict[str, Any]) -> str:
+    """Key a response on its URL and every option that can change it."""
+    payload = json.dumps([url, options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk cache of fetched page bodies for repeated development runs.
+
+    Responses are keyed on the URL plus the request options (backend,
+    headers, ScrapingAnt settings, ...), stored zlib-compressed in a single
+    SQLite file and served until they are older than `ttl`. Once the cache
+    grows past `max_bytes` the least recently used entries are evicted.
+    Only successful responses are cached, so errors are always retried.
+
+    Args:
+        directory: Directory holding cache.sqlite
+        ttl: Seconds an entry stays fresh, None to keep entries until evicted
+        max_bytes: Maximum total size of the compressed bodies
+    """
+
+    def __init__(
+        self, directory: Path, ttl: Optional[float] = 86400.0, max_bytes: int = 1 << 30
+    ) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            directory / "cache.sqlite", timeout=30, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses")
+        self._size: int = row.fetchone()[0]
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get(self, url: str, options: dict[str, Any]) -> Optional[str]:
+        """Return the cached body for a request, if there is a fresh one."""
+        key = cache_key(url, options)
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT body, size, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            body, size, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self.stats.hits += 1
+        logger.debug(f"Cache hit: {url}")
+        return zlib.decompress(body).decode("utf-8")
+
+    def put(self, url: str, options: dict[str, Any], text: str) -> None:
+        """Store the body of a successful request, evicting old entries if full."""
+        key = cache_key(url, options)
+        body = zlib.compress(text.encode("utf-8"), 6)
+        now = time.time()
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if previous:
+                self._size -= previous[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, body, len(body), now, now),
+            )
+            self._size += len(body)
+            self.stats.stored += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits again."""
+        if self._size <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed"
+        ).fetchall()
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+            self.stats.evicted += 1
+
+    def info(self) -> dict[str, Any]:
+        """Entry count and size of the cache, next to this run's counters."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return {"entries": entries[0], "bytes": self._size, **asdict(self.stats)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,249 @@
+import asyncio
+import importlib.util
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from .config import RENDER_MODES, LinkConfig, TextConfig
+from .content_scraper import PageResult, extract_page
+from .link import Link
+from .metrics import CrawlMetrics
+from .parse_pool import ParsePool
+from .response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from scrapingant_client import ScrapingAntClient  # type: ignore
+
+T = TypeVar("T")
+
+# API credits per request, from ScrapingAnt's pricing for datacenter proxies.
+# Failed requests are not charged
+CREDITS_PLAIN = 1
+CREDITS_BROWSER = 10
+
+
+@lru_cache(maxsize=None)
+def transient_errors() -> Tuple[Type[Exception], ...]:
+    """
+    ScrapingAnt errors worth another attempt.
+
+    Invalid tokens or input fail the same way again. Looked up on first use,
+    so crawls without ScrapingAnt never import its client.
+    """
+    import scrapingant_client.errors as ant_errors  # type: ignore
+
+    return tuple(
+        getattr(ant_errors, name)
+        for name in (
+            "ScrapingantInternalException",
+            "ScrapingantTimeoutException",
+            "ScrapingantSiteNotReachableException",
+            "ScrapingantDetectedException",
+            "ScrapingantTooManyRequestsException",
+        )
+        if hasattr(ant_errors, name)
+    )
+
+
+@dataclass
+class AntResponse:
+    """A page fetched through ScrapingAnt and what it cost"""
+
+    content: str
+    credits: int = 0
+    rendered: bool = False
+
+
+class ScrapingAntFetcher:
+    """Concurrent ScrapingAnt requests with retries and credit accounting.
+
+    Requests use the client's async API (falling back to the blocking one on a
+    thread when httpx is not installed), at most `concurrency` at a time so
+    the crawl stays within the plan's concurrency limit. Transient API errors
+    are retried with full-jitter backoff.
+
+    With the "auto" render mode a page is first fetched without the headless
+    browser, at a tenth of the cost, and only rendered when nothing could be
+    extracted from the plain HTML. Cached responses cost nothing.
+
+    Args:
+        client: The ScrapingAnt client
+        concurrency: Maximum number of requests in flight
+        render: "auto", "always" or "never" render JavaScript
+        max_retries: Retries of a transient error before giving up
+        backoff_base: Base delay of the exponential backoff, in seconds
+        cache: Optional response cache, checked before spending credits
+        metrics: Optional metrics that request times are recorded in
+    """
+
+    def __init__(
+        self,
+        client: "ScrapingAntClient",
+        concurrency: int = 1,
+        render: str = "auto",
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[CrawlMetrics] = None,
+    ) -> None:
+        if render not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode {render!r}, expected {RENDER_MODES}")
+        self.client = client
+        self.concurrency = concurrency
+        self.render = render
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.cache = cache
+        self.metrics = metrics
+        self.credits_spent = 0
+        self.requests = 0
+        self._async = importlib.util.find_spec("httpx") is not None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _send(self, url: str, browser: bool) -> str:
+        if self._async:
+            response = await self.client.general_request_async(url, browser=browser)
+        else:
+            response = await asyncio.to_thread(
+                self.client.general_request, url, browser=browser
+            )
+        return response.content
+
+    async def request(self, url: str, browser: bool) -> AntResponse:
+        """Fetch one URL, with or without the headless browser."""
+        options = {"via": "scrapingant", "browser": browser}
+        if self.cache is not None:
+            cached = self.cache.get(url, options)
+            if cached is not None:
+                return AntResponse(cached, credits=0, rendered=browser)
+
+        # The limit belongs to the event loop of the crawl using the fetcher
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._slots_loop = loop
+
+        attempt = 0
+        while True:
+            try:
+                async with self._slots:
+                    started = time.perf_counter()
+                    content = await self._send(url, browser)
+                break
+            except transient_errors() as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, self.backoff_base * 2**attempt)
+                attempt += 1
+                logger.info(f"Retrying {url} in {delay:.1f}s (attempt {attempt}): {e}")
+                await asyncio.sleep(delay)
+
+        if self.metrics is not None:
+            elapsed = time.perf_counter() - started
+            # The API returns the body with the headers: it is all "ttfb"
+            self.metrics.observe("ttfb", elapsed)
+            self.metrics.record_fetch(
+                urlsplit(url).netloc, elapsed, len(content.encode("utf-8"))
+            )
+
+        credits = CREDITS_BROWSER if browser else CREDITS_PLAIN
+        self.credits_spent += credits
+        self.requests += 1
+        if self.cache is not None:
+            self.cache.put(url, options, content)
+        return AntResponse(content, credits=credits, rendered=browser)
+
+    async def fetch(
+        self,
+        url: str,
+        extract: Callable[[str], Awaitable[T]],
+        is_empty: Callable[[T], bool],
+    ) -> Tuple[AntResponse, T]:
+        """
+        Fetch a URL and extract it, rendering JavaScript only when needed.
+
+        Args:
+            url: The URL to fetch
+            extract: Coroutine function extracting what is needed from a body
+            is_empty: Whether an extraction result calls for rendering
+
+        Returns:
+            Tuple[AntResponse, T]: The response used, with the credits of all
+                attempts, and its extraction result
+        """
+        response = await self.request(url, browser=self.render == "always")
+        extracted = await extract(response.content)
+        if self.render == "auto" and is_empty(extracted):
+            logger.info(f"Nothing extracted without JavaScript, rendering {url}")
+            spent = response.credits
+            response = await self.request(url, browser=True)
+            response.credits += spent
+            extracted = await extract(response.content)
+        return response, extracted
+
+    async def scrape_page(
+        self,
+        link: Link,
+        text_config: TextConfig,
+        parser: str = "html.parser",
+        depth: int = 0,
+        follow_links: bool = False,
+        link_config: Optional[LinkConfig] = None,
+        keep_html: bool = True,
+        parse_pool: Optional[ParsePool] = None,
+    ) -> PageResult:
+        """
+        Fetch a link through ScrapingAnt and extract its texts and links.
+
+        Extraction runs on the parse pool when one is given, on a thread
+        otherwise. Pages without any extracted text are rendered in "auto"
+        mode.
+        """
+
+        timings: Dict[str, float] = {}
+
+        async def extract(html: str) -> Tuple[List[str], List[Link]]:
+            if parse_pool is not None:
+                result = PageResult(link=link, html_content=html, depth=depth)
+                result = await parse_pool.extract(result)
+                timings.update(result.timings)
+                return result.texts, result.links
+            return await asyncio.to_thread(
+                extract_page,
+                html,
+                link.href,
+                text_config,
+                parser,
+                follow_links,
+                link_config,
+                timings,
+            )
+
+        response, (texts, links) = await self.fetch(
+            link.href, extract, is_empty=lambda extracted: not extracted[0]
+        )
+        return PageResult(
+            link=link,
+            html_content=response.content if keep_html else None,
+            texts=texts,
+            links=links,
+            depth=depth,
+            credits=response.credits,
+            timings=timings,
+        )
@@ -1,14 +1,16 @@
 from datetime import datetime
 from pathlib import Path
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
-import requests
 from loguru import logger
-from scrapingant_client.response import Response  # type: ignore
+
+if TYPE_CHECKING:
+    import requests
+    from scrapingant_client.response import Response  # type: ignore
 
 
 def save_scraping_response(
-    response: Union[Response, requests.Response], title: str, output_dir: Path
+    response: Union["Response", "requests.Response"], title: str, output_dir: Path
 ) -> Path:
     """
     Save ScrapingAnt response to a file for debugging purposes.
@@ -1,15 +1,15 @@
 import csv
-from dataclasses import asdict, dataclass
-from datetime import datetime
+import os
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, Optional
 from urllib.parse import urlparse
 
-import pandas as pd
 from loguru import logger
 
 
-@dataclass
+@dataclass(slots=True)
 class ScrapingPage:
     """Log entry for a scraped URL"""
 
@@ -19,10 +19,18 @@ class ScrapingPage:
     status: str
     title: str
     domain: str
+    content_hash: Optional[str] = None
+    credits: Optional[int] = None
 
     @classmethod
     def create(
-        cls, url: str, html_path: Optional[str], title: str, status: str = "success"
+        cls,
+        url: str,
+        html_path: Optional[str],
+        title: str,
+        status: str = "success",
+        content_hash: Optional[str] = None,
+        credits: Optional[int] = None,
     ) -> "ScrapingPage":
         return cls(
             timestamp=datetime.now().isoformat(),
@@ -31,12 +39,161 @@ class ScrapingPage:
             status=status,
             title=title,
             domain=urlparse(url).netloc,
+            content_hash=content_hash,
+            credits=credits,
         )
 
 
+LOG_COLUMNS = [f.name for f in fields(ScrapingPage)]
+
+
+class PageLog:
+    """Crawl log stored in logs.csv with an in-memory index by URL.
+
+    Only the latest entry per URL is kept in memory, next to the set of URLs
+    that succeeded at least once and the last fetch that recorded a content
+    hash, so membership, skip and change checks are O(1) regardless of how
+    many rows the log has.
+
+    Args:
+        path: Path to the logging CSV file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._latest: dict[str, ScrapingPage] = {}
+        self._succeeded: set[str] = set()
+        self._hashed: dict[str, ScrapingPage] = {}
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._latest
+
+    def __iter__(self) -> Iterator[ScrapingPage]:
+        """Iterate over the latest entry of every logged URL."""
+        return iter(self._latest.values())
+
+    def get(self, url: str) -> Optional[ScrapingPage]:
+        """Return the latest entry logged for a URL."""
+        return self._latest.get(url)
+
+    def _index(self, entry: ScrapingPage) -> None:
+        self._latest[entry.url] = entry
+        if entry.status == "success":
+            self._succeeded.add(entry.url)
+        if entry.content_hash:
+            self._hashed[entry.url] = entry
+        self._rows += 1
+
+    def content_hash(self, url: str) -> Optional[str]:
+        """Return the hash of the content last extracted from a URL."""
+        entry = self._hashed.get(url)
+        return entry.content_hash if entry else None
+
+    def needs_refresh(self, url: str, lastmod: Optional[datetime] = None) -> bool:
+        """
+        Check if a URL has to be fetched again in an incremental crawl.
+
+        Args:
+            url: The URL to check
+            lastmod: Last modification time announced by the sitemap, if any;
+                taken as UTC if it has no timezone
+
+        Returns:
+            bool: False only if the page was fetched after its lastmod
+        """
+        entry = self._hashed.get(url)
+        if entry is None or lastmod is None:
+            return True
+        if lastmod.tzinfo is None:
+            lastmod = lastmod.replace(tzinfo=timezone.utc)
+        # Log timestamps are naive local time, which astimezone() assumes
+        fetched = datetime.fromisoformat(entry.timestamp).astimezone(timezone.utc)
+        return lastmod > fetched
+
+    def flush(self) -> None:
+        """Write any buffered entries. Rows are appended immediately here."""
+
+    def close(self) -> None:
+        self.flush()
+
+    @classmethod
+    def load_or_create(cls, path: Path) -> "PageLog":
+        """Load an existing log by streaming it row by row, or create a new one."""
+        page_log = cls(path)
+        if not path.exists():
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(LOG_COLUMNS)
+            return page_log
+
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                page_log._index(
+                    ScrapingPage(
+                        timestamp=row["timestamp"],
+                        url=row["url"],
+                        html_path=row["html_path"] or None,
+                        status=row["status"],
+                        title=row["title"],
+                        domain=row["domain"],
+                        content_hash=row.get("content_hash") or None,
+                        credits=int(row["credits"]) if row.get("credits") else None,
+                    )
+                )
+            columns = reader.fieldnames
+
+        # Logs written before a column was added get the new header, so the
+        # rows appended from now on line up with it
+        if columns != LOG_COLUMNS:
+            _upgrade_header(path)
+        return page_log
+
+    def append(self, entry: ScrapingPage) -> None:
+        """Append a new page entry to the log file and the index."""
+        row = [getattr(entry, column) for column in LOG_COLUMNS]
+        with open(self.path, "a", newline="") as f:
+            csv.writer(f).writerow(row)
+        self._index(entry)
+
+    def should_skip(self, url: str, overwrite: bool = False) -> bool:
+        """
+        Check if a URL should be skipped based on existing pages.
+
+        Args:
+            url: The URL to check
+            overwrite: Whether to overwrite existing pages
+
+        Returns:
+            bool: True if the URL should be skipped, False otherwise
+        """
+        if url not in self._latest:
+            return False
+
+        # Only skip if there's a successful page or if we're not overwriting
+        if url in self._succeeded or not overwrite:
+            logger.info(f"Skipping already processed URL: {url}")
+            return True
+
+        return False
+
+
+def _upgrade_header(path: Path) -> None:
+    """Rewrite a logs.csv file with the current columns."""
+    tmp_path = path.with_suffix(".csv.tmp")
+    with open(path, newline="") as src, open(tmp_path, "w", newline="") as dst:
+        writer = csv.DictWriter(dst, fieldnames=LOG_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(csv.DictReader(src))
+    os.replace(tmp_path, path)
+
+
 def should_skip_url(
     url: str,
-    processed_pages: Optional[List[ScrapingPage]],
+    page_log: Optional[PageLog],
     overwrite: bool = False,
 ) -> bool:
     """
@@ -44,52 +201,17 @@ def should_skip_url(
 
     Args:
         url: The URL to check
-        processed_pages: List of already processed ScrapingPage entries
+        page_log: Log of already processed pages
         overwrite: Whether to overwrite existing pages
 
     Returns:
         bool: True if the URL should be skipped, False otherwise
     """
-    if processed_pages is None:
+    if page_log is None:
         return False
-
-    # Find any existing pages with this URL
-    existing_pages = [page for page in processed_pages if page.url == url]
-    if existing_pages:
-        # Only skip if there's a successful page or if we're not overwriting
-        successful_pages = [page for page in existing_pages if page.status == "success"]
-        if successful_pages or not overwrite:
-            logger.info(f"Skipping already processed URL: {url}")
-            return True
-
-    return False
+    return page_log.should_skip(url, overwrite)
 
 
-def load_or_create_page_log(log_path: Path) -> list[ScrapingPage]:
+def load_or_create_page_log(log_path: Path) -> PageLog:
     """Load existing pages from log file or create new log file."""
-    if log_path.exists():
-        df = pd.read_csv(log_path)
-        return [
-            ScrapingPage(
-                timestamp=row["timestamp"],
-                url=row["url"],
-                html_path=row["html_path"],
-                status=row["status"],
-                title=row["title"],
-                domain=row["domain"],
-            )
-            for _, row in df.iterrows()
-        ]
-
-    # Create new log file with headers
-    with open(log_path, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(["timestamp", "url", "html_path", "status", "title", "domain"])
-    return []
-
-
-def append_to_page_log(log_path: Path, entry: ScrapingPage) -> None:
-    """Append a new page entry to the log file."""
-    with open(log_path, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(list(asdict(entry).values()))
+    return PageLog.load_or_create(log_path)
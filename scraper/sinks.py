@@ -0,0 +1,273 @@
+import gzip
+import importlib.util
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional
+
+from loguru import logger
+
+SINK_CHOICES = ("jsonl", "parquet")
+
+
+@dataclass(slots=True)
+class PageRecord:
+    """One extracted page with its fetch metadata, as written to a sink"""
+
+    url: str
+    title: str
+    texts: List[str]
+    fetched_at: str
+    status: str
+    depth: int = 0
+    content_hash: Optional[str] = None
+    credits: Optional[int] = None
+    html_path: Optional[str] = None
+
+
+RECORD_FIELDS = [f.name for f in fields(PageRecord)]
+
+
+class OutputSink(ABC):
+    """Destination for extracted pages, written to in crawl order.
+
+    Sinks stream: every record is handed on as soon as it is written and
+    only a bounded batch is held in memory. Shards are written under a
+    temporary name and only get their final name once complete, so
+    downstream jobs can read finished shards in parallel while a crawl is
+    still running.
+    """
+
+    def __enter__(self) -> "OutputSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @abstractmethod
+    def write(self, record: PageRecord) -> None:
+        """Write one page."""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Finish the current shard."""
+
+    def flush(self) -> None:
+        """Make every record written so far survive a crash.
+
+        An unfinished shard is never read, so this finishes the current one
+        and the next record starts a new shard.
+        """
+        self.close()
+
+
+class ShardedSink(OutputSink):
+    """Base class of sinks rotating through numbered shard files.
+
+    Shards are named `<prefix>-<number><suffix>` in `directory`. Numbering
+    continues after the shards already there, so a resumed or incremental
+    crawl adds shards instead of overwriting them.
+    """
+
+    suffix = ""
+
+    def __init__(self, directory: Path, prefix: str) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.shards: List[Path] = []
+        pattern = re.compile(rf"{re.escape(prefix)}-(\d+){re.escape(self.suffix)}$")
+        existing = [
+            int(match.group(1))
+            for path in directory.iterdir()
+            if (match := pattern.match(path.name))
+        ]
+        self._next_shard = max(existing, default=-1) + 1
+        self._tmp_path: Optional[Path] = None
+
+    def _open_shard(self) -> Path:
+        """Pick the temporary path the next shard is written to."""
+        name = f"{self.prefix}-{self._next_shard:05d}{self.suffix}"
+        self._next_shard += 1
+        self._tmp_path = self.directory / (name + ".tmp")
+        return self._tmp_path
+
+    def _finish_shard(self) -> None:
+        """Give a complete shard its final name."""
+        assert self._tmp_path is not None
+        path = self._tmp_path.with_suffix("")
+        os.replace(self._tmp_path, path)
+        self.shards.append(path)
+        self._tmp_path = None
+        logger.debug(f"Finished shard {path}")
+
+
+class JsonlSink(ShardedSink):
+    """JSON lines shards, rotated by size and optionally gzip-compressed.
+
+    Args:
+        directory: Directory the shards are written to
+        prefix: File name prefix of the shards
+        max_bytes: Start a new shard once this many uncompressed bytes were
+            written to the current one
+        compress: Gzip the shards (`.jsonl.gz`)
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        prefix: str,
+        max_bytes: int = 256 << 20,
+        compress: bool = True,
+    ) -> None:
+        self.suffix = ".jsonl.gz" if compress else ".jsonl"
+        super().__init__(directory, prefix)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self._file: Optional[IO[str]] = None
+        self._written = 0
+
+    def write(self, record: PageRecord) -> None:
+        if self._file is None:
+            path = self._open_shard()
+            if self.compress:
+                self._file = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+            else:
+                self._file = open(path, "w", encoding="utf-8", buffering=1 << 20)
+            self._written = 0
+
+        line = json.dumps(asdict(record), ensure_ascii=False) + "\n"
+        self._file.write(line)
+        self._written += len(line)
+        if self._written >= self.max_bytes:
+            self.close()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._finish_shard()
+
+
+class ParquetSink(ShardedSink):
+    """Parquet shards written one row group at a time.
+
+    Records are batched in memory until `row_group_size` of them are
+    buffered, then written out as one row group, so readers can skip whole
+    row groups and load only the columns they need. A new shard is started
+    once the current file grows past `max_bytes`. Needs pyarrow.
+
+    Args:
+        directory: Directory the shards are written to
+        prefix: File name prefix of the shards
+        max_bytes: Start a new shard once the current one is this large
+        row_group_size: Records per row group
+        compression: Parquet compression codec
+    """
+
+    suffix = ".parquet"
+
+    def __init__(
+        self,
+        directory: Path,
+        prefix: str,
+        max_bytes: int = 256 << 20,
+        row_group_size: int = 1000,
+        compression: str = "zstd",
+    ) -> None:
+        import pyarrow as pa  # type: ignore
+
+        super().__init__(directory, prefix)
+        self.max_bytes = max_bytes
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self._schema = pa.schema(
+            [
+                ("url", pa.string()),
+                ("title", pa.string()),
+                ("texts", pa.list_(pa.string())),
+                ("fetched_at", pa.string()),
+                ("status", pa.string()),
+                ("depth", pa.int32()),
+                ("content_hash", pa.string()),
+                ("credits", pa.int32()),
+                ("html_path", pa.string()),
+            ]
+        )
+        self._batch: Dict[str, List[Any]] = {name: [] for name in RECORD_FIELDS}
+        self._rows = 0
+        self._writer: Any = None
+
+    def write(self, record: PageRecord) -> None:
+        for name in RECORD_FIELDS:
+            self._batch[name].append(getattr(record, name))
+        self._rows += 1
+        if self._rows >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        import pyarrow as pa  # type: ignore
+        import pyarrow.parquet as pq  # type: ignore
+
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(
+                self._open_shard(), self._schema, compression=self.compression
+            )
+        table = pa.Table.from_pydict(self._batch, schema=self._schema)
+        self._writer.write_table(table, row_group_size=self._rows)
+        self._batch = {name: [] for name in RECORD_FIELDS}
+        self._rows = 0
+
+        assert self._tmp_path is not None
+        if self._tmp_path.stat().st_size >= self.max_bytes:
+            self._close_writer()
+
+    def _close_writer(self) -> None:
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        self._finish_shard()
+
+    def close(self) -> None:
+        self._write_row_group()
+        self._close_writer()
+
+
+def open_sink(
+    kind: str,
+    directory: Path,
+    prefix: str,
+    max_bytes: int = 256 << 20,
+    compress: bool = True,
+    row_group_size: int = 1000,
+) -> OutputSink:
+    """
+    Create one of the SINK_CHOICES sinks.
+
+    Args:
+        kind: "jsonl" or "parquet"
+        directory: Directory the shards are written to
+        prefix: File name prefix of the shards
+        max_bytes: Shard size at which a new shard is started
+        compress: Gzip JSONL shards (Parquet shards are always compressed)
+        row_group_size: Records per Parquet row group
+
+    Raises:
+        ValueError: If the sink is unknown or its dependencies are missing
+    """
+    if kind == "jsonl":
+        return JsonlSink(directory, prefix, max_bytes=max_bytes, compress=compress)
+    if kind == "parquet":
+        if importlib.util.find_spec("pyarrow") is None:
+            raise ValueError("The parquet sink needs pyarrow: pip install pyarrow")
+        return ParquetSink(
+            directory, prefix, max_bytes=max_bytes, row_group_size=row_group_size
+        )
+    raise ValueError(f"Unknown sink {kind!r}, expected one of {SINK_CHOICES}")
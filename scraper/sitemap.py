@@ -0,0 +1,164 @@
+import asyncio
+import gzip
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+
+import requests
+from loguru import logger
+
+from .fetcher import FetchError, Fetcher, parse_retry_after
+from .politeness import DisallowedByRobots, PolitenessScheduler
+
+# Sitemap indexes may point to further indexes; real sites nest one level deep
+MAX_SITEMAP_DEPTH = 3
+
+
+@dataclass(frozen=True)
+class SitemapEntry:
+    """A <url> from a sitemap"""
+
+    url: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a W3C datetime from <lastmod> into an aware UTC datetime.
+
+    Values without an offset, such as plain dates, are taken as UTC.
+    Unparseable values are treated as missing.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _local_name(tag: str) -> str:
+    """Strip the XML namespace from a tag."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_sitemap(body: bytes) -> tuple[List[SitemapEntry], List[str]]:
+    """Split a sitemap into its page entries and the sitemaps it points to."""
+    if body[:2] == b"\x1f\x8b":
+        body = gzip.decompress(body)
+
+    root = ElementTree.fromstring(body)
+    entries: List[SitemapEntry] = []
+    children: List[str] = []
+    for element in root:
+        fields = {
+            _local_name(child.tag): (child.text or "").strip() for child in element
+        }
+        loc = fields.get("loc")
+        if not loc:
+            continue
+        if _local_name(element.tag) == "sitemap":
+            children.append(loc)
+        else:
+            entries.append(SitemapEntry(loc, parse_lastmod(fields.get("lastmod"))))
+    return entries, children
+
+
+def _get(fetcher: Fetcher, url: str) -> requests.Response:
+    response = fetcher.session.get(url, timeout=fetcher.timeout)
+    if response.status_code >= 400:
+        raise FetchError(
+            url,
+            response.status_code,
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+    return response
+
+
+async def _fetch(
+    fetcher: Fetcher, scheduler: PolitenessScheduler, url: str
+) -> requests.Response:
+    """GET a URL once the scheduler admits it, like any page of the crawl."""
+    return await scheduler.call(url, lambda: asyncio.to_thread(_get, fetcher, url))
+
+
+async def _robots_sitemaps(
+    fetcher: Fetcher, scheduler: PolitenessScheduler, root: str
+) -> List[str]:
+    """Sitemap URLs announced with `Sitemap:` lines in robots.txt."""
+    try:
+        response = await _fetch(fetcher, scheduler, f"{root}/robots.txt")
+    except (requests.RequestException, FetchError, DisallowedByRobots):
+        return []
+    if response.status_code != 200:
+        return []
+    return [
+        line.split(":", 1)[1].strip()
+        for line in response.text.splitlines()
+        if line.lower().startswith("sitemap:")
+    ]
+
+
+async def iter_sitemap(
+    fetcher: Fetcher, scheduler: PolitenessScheduler, base_url: str
+) -> AsyncIterator[SitemapEntry]:
+    """
+    Yield the pages listed in a site's sitemaps.
+
+    Sitemaps are taken from robots.txt, falling back to /sitemap.xml. Sitemap
+    indexes are followed and gzipped sitemaps are decompressed. Sitemaps are
+    fetched without validators: they are small and always read in full.
+
+    Args:
+        fetcher: Fetcher whose session is used for the requests
+        scheduler: Rate limits, robots.txt rules and retries of the requests
+        base_url: Any URL of the site
+
+    Yields:
+        SitemapEntry: Each listed page with its lastmod, if given
+    """
+    parts = urlsplit(base_url)
+    root = f"{parts.scheme}://{parts.netloc}"
+    pending = [(url, 0) for url in await _robots_sitemaps(fetcher, scheduler, root)]
+    if not pending:
+        pending = [(urljoin(root, "/sitemap.xml"), 0)]
+
+    visited = set()
+    while pending:
+        sitemap_url, depth = pending.pop(0)
+        if sitemap_url in visited or depth > MAX_SITEMAP_DEPTH:
+            continue
+        visited.add(sitemap_url)
+
+        try:
+            response = await _fetch(fetcher, scheduler, sitemap_url)
+            entries, children = _parse_sitemap(response.content)
+        except (
+            requests.RequestException,
+            FetchError,
+            DisallowedByRobots,
+            ElementTree.ParseError,
+            OSError,
+        ) as e:
+            logger.warning(f"Could not read sitemap {sitemap_url}: {e}")
+            continue
+
+        logger.info(f"Read {len(entries)} pages from sitemap {sitemap_url}")
+        for entry in entries:
+            yield entry
+        pending.extend((child, depth + 1) for child in children)
+
+
+async def load_sitemap(
+    fetcher: Fetcher, scheduler: PolitenessScheduler, base_url: str
+) -> Dict[str, Optional[datetime]]:
+    """Map every URL in a site's sitemaps to its lastmod."""
+    return {
+        entry.url: entry.lastmod
+        async for entry in iter_sitemap(fetcher, scheduler, base_url)
+    }
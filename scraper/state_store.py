@@ -0,0 +1,273 @@
+import csv
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from loguru import logger
+
+from .scraping_page_log import LOG_COLUMNS, PageLog, ScrapingPage
+
+STATE_STORES = ("csv", "sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    url TEXT NOT NULL,
+    html_path TEXT,
+    status TEXT NOT NULL,
+    title TEXT,
+    domain TEXT,
+    content_hash TEXT,
+    credits INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_pages_url ON pages (url);
+CREATE INDEX IF NOT EXISTS idx_pages_status ON pages (status);
+CREATE INDEX IF NOT EXISTS idx_pages_domain ON pages (domain);
+"""
+
+# Latest row per URL, the view every query below works on
+LATEST_PAGES = f"""
+SELECT {", ".join(f"pages.{column}" for column in LOG_COLUMNS)} FROM pages
+JOIN (SELECT url, MAX(id) AS id FROM pages GROUP BY url) AS latest
+    ON pages.id = latest.id
+"""
+
+# Columns added after the first release, with their types
+ADDED_COLUMNS = {"content_hash": "TEXT", "credits": "INTEGER"}
+
+INSERT_PAGE = (
+    f"INSERT INTO pages ({', '.join(LOG_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in LOG_COLUMNS)})"
+)
+
+
+class SQLitePageLog(PageLog):
+    """Crawl log stored in a SQLite database instead of logs.csv.
+
+    The database runs in WAL mode so readers and several writer processes can
+    share it, and new entries are buffered and inserted in one transaction per
+    `batch_size` rows. The in-memory URL index of `PageLog` is kept as well, so
+    skip checks never hit the database. Processes on several nodes sharing
+    the file over NFS need `wal=False`, as WAL's shared memory index only
+    works within one host.
+
+    Args:
+        path: Path to the SQLite database file
+        batch_size: Number of buffered entries written per transaction
+        wal: Use WAL mode rather than a rollback journal. By default a new
+            log uses WAL and an existing one keeps its mode
+    """
+
+    def __init__(
+        self, path: Path, batch_size: int = 100, wal: Optional[bool] = None
+    ) -> None:
+        super().__init__(path)
+        self.batch_size = batch_size
+        self._buffer: List[ScrapingPage] = []
+        creating = not path.exists()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        if wal is None:
+            (mode,) = self._conn.execute("PRAGMA journal_mode").fetchone()
+            wal = creating or mode.lower() == "wal"
+        # The mode is stored in the file, so setting it also switches it back
+        self._conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self) -> None:
+        """Bring databases created before a column was added up to date."""
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(pages)")}
+        with self._conn:
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(
+                        f"ALTER TABLE pages ADD COLUMN {column} {column_type}"
+                    )
+
+    @classmethod
+    def load_or_create(
+        cls, path: Path, wal: Optional[bool] = None
+    ) -> "SQLitePageLog":
+        """Open the database, creating the schema if needed, and index its rows."""
+        page_log = cls(path, wal=wal)
+        columns = ", ".join(LOG_COLUMNS)
+        rows = page_log._conn.execute(f"SELECT {columns} FROM pages ORDER BY id")
+        for row in rows:
+            page_log._index(ScrapingPage(*row))
+        return page_log
+
+    def append(self, entry: ScrapingPage) -> None:
+        """Buffer a new page entry, writing the batch once it is full."""
+        self._buffer.append(entry)
+        self._index(entry)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, entries: List[ScrapingPage]) -> None:
+        """Insert many entries in a single transaction."""
+        for entry in entries:
+            self._buffer.append(entry)
+            self._index(entry)
+        self.flush()
+
+    def flush(self) -> None:
+        """Write all buffered entries in one transaction."""
+        if not self._buffer:
+            return
+        self._insert(
+            tuple(getattr(entry, column) for column in LOG_COLUMNS)
+            for entry in self._buffer
+        )
+        self._buffer.clear()
+
+    def _insert(self, rows: Iterable[tuple]) -> None:
+        with self._conn:
+            self._conn.executemany(INSERT_PAGE, rows)
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
+
+    def failed_pages(self) -> List[ScrapingPage]:
+        """Pages whose latest attempt failed."""
+        self.flush()
+        return self._query(f"{LATEST_PAGES} WHERE pages.status = 'failed'")
+
+    def pages_to_retry(self, max_attempts: int = 3) -> List[ScrapingPage]:
+        """Failed pages that never succeeded and have attempts left."""
+        self.flush()
+        return self._query(
+            f"""{LATEST_PAGES}
+            WHERE pages.status = 'failed'
+            AND pages.url NOT IN (SELECT url FROM pages WHERE status = 'success')
+            AND (
+                SELECT COUNT(*) FROM pages AS attempts
+                WHERE attempts.url = pages.url AND attempts.status = 'failed'
+            ) < ?""",
+            (max_attempts,),
+        )
+
+    def domain_stats(self) -> List[dict]:
+        """Per-domain counts of pages by the status of their latest attempt,
+        with the ScrapingAnt credits spent on every attempt."""
+        self.flush()
+        cursor = self._conn.execute(
+            f"""SELECT domain,
+                COUNT(*) AS pages,
+                SUM(status IN ('success', 'unchanged')) AS succeeded,
+                SUM(status = 'failed') AS failed,
+                (
+                    SELECT COALESCE(SUM(credits), 0) FROM pages AS spent
+                    WHERE spent.domain = latest.domain
+                ) AS credits,
+                MAX(timestamp) AS last_scraped
+            FROM ({LATEST_PAGES}) AS latest
+            GROUP BY domain
+            ORDER BY pages DESC"""
+        )
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def _query(self, sql: str, params: tuple = ()) -> List[ScrapingPage]:
+        return [ScrapingPage(*row) for row in self._conn.execute(sql, params)]
+
+
+def open_page_log(
+    domain_dir: Path, state_store: str = "csv", wal: Optional[bool] = None
+) -> PageLog:
+    """
+    Open the crawl log of a domain directory with the chosen backend.
+
+    Args:
+        domain_dir: Directory holding the domain's output
+        state_store: "csv" for logs.csv, "sqlite" for logs.sqlite
+        wal: Run logs.sqlite in WAL mode; False for a log shared over NFS.
+            By default a new log uses WAL and an existing one keeps its mode
+
+    Returns:
+        PageLog: The loaded log
+    """
+    if state_store == "sqlite":
+        db_path = domain_dir / "logs.sqlite"
+        csv_path = domain_dir / "logs.csv"
+        if csv_path.exists() and not db_path.exists():
+            logger.warning(
+                f"Found {csv_path} but no {db_path.name}; "
+                f"run `migrate {csv_path}` to import its history"
+            )
+        return SQLitePageLog.load_or_create(db_path, wal=wal)
+
+    return PageLog.load_or_create(domain_dir / "logs.csv")
+
+
+def find_page_log(domain_dir: Path, state_store: Optional[str] = None) -> PageLog:
+    """
+    Open the existing crawl log of a domain directory, without creating one.
+
+    Args:
+        domain_dir: Directory holding the domain's output
+        state_store: "csv" or "sqlite", or None for the one that exists
+            (logs.sqlite if there are both)
+
+    Returns:
+        PageLog: The loaded log
+
+    Raises:
+        FileNotFoundError: If there is no such log in the directory
+    """
+    paths = {"sqlite": domain_dir / "logs.sqlite", "csv": domain_dir / "logs.csv"}
+    candidates = [state_store] if state_store is not None else list(paths)
+    for candidate in candidates:
+        if paths[candidate].exists():
+            return open_page_log(domain_dir, candidate)
+    names = " or ".join(paths[candidate].name for candidate in candidates)
+    raise FileNotFoundError(f"No crawl log ({names}) in {domain_dir}")
+
+
+def migrate_csv_log(csv_path: Path, db_path: Path, batch_size: int = 10_000) -> int:
+    """
+    Import the rows of a logs.csv file into a new or empty SQLite crawl log.
+
+    The import is one transaction, so a failed import leaves the database
+    empty and can simply be run again.
+
+    Args:
+        csv_path: The logs.csv file to import
+        db_path: The SQLite database to import into (created if missing)
+        batch_size: Number of rows read into memory at a time
+
+    Returns:
+        int: The number of rows imported
+
+    Raises:
+        ValueError: If the database already has rows, e.g. from an earlier
+            import, which importing again would duplicate
+    """
+    # Rows go straight to the database without building the in-memory index
+    page_log = SQLitePageLog(db_path)
+    imported = 0
+    try:
+        if page_log._conn.execute("SELECT 1 FROM pages LIMIT 1").fetchone():
+            raise ValueError(
+                f"{db_path} already has crawl history; importing {csv_path} "
+                "again would duplicate it"
+            )
+        with open(csv_path, newline="") as f, page_log._conn:
+            batch: List[tuple] = []
+            for row in csv.DictReader(f):
+                row["html_path"] = row["html_path"] or None
+                # Logs from before these columns were added lack them
+                row["content_hash"] = row.get("content_hash") or None
+                row["credits"] = int(row["credits"]) if row.get("credits") else None
+                batch.append(tuple(row[column] for column in LOG_COLUMNS))
+                if len(batch) >= batch_size:
+                    page_log._conn.executemany(INSERT_PAGE, batch)
+                    imported += len(batch)
+                    batch = []
+            page_log._conn.executemany(INSERT_PAGE, batch)
+            imported += len(batch)
+    finally:
+        page_log.close()
+    return imported
@@ -0,0 +1,431 @@
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from .frontier import FrontierItem, normalize_url
+from .link import Link
+
+QUEUE_STATES = ("queued", "leased", "done", "failed")
+
+# Seconds an idle worker waits before looking for work again
+QUEUE_POLL_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue (
+    key TEXT PRIMARY KEY,
+    href TEXT NOT NULL,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    shard INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_queue_claim ON queue (state, shard, depth);
+CREATE INDEX IF NOT EXISTS idx_queue_owner ON queue (owner, state);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started REAL NOT NULL,
+    heartbeat REAL NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+INSERT_ITEM = """
+INSERT OR IGNORE INTO queue (key, href, title, text, domain, depth, shard, state)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def default_worker_id() -> str:
+    """Worker name unique across the nodes sharing a queue."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def worker_file_name(worker_id: str) -> str:
+    """A worker id made safe to use in file names."""
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", worker_id)
+
+
+def host_shard(url: str, shards: int) -> int:
+    """Shard of a URL: a stable hash of its host, the same on every node."""
+    host = urlsplit(url).netloc.lower()
+    return zlib.crc32(host.encode("utf-8")) % shards
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    # Transactions are opened explicitly, with BEGIN IMMEDIATE where rows
+    # are claimed, so two workers never lease the same row
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class _Transaction:
+    """`BEGIN IMMEDIATE` ... `COMMIT`, rolled back on errors.
+
+    Taking the write lock up front makes concurrent claims wait for each
+    other instead of failing with "database is locked" on upgrade.
+    """
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self.conn.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+class WorkQueue:
+    """Crawl frontier shared by worker processes through a SQLite database.
+
+    A drop-in replacement for `Frontier` that any number of `crawl --queue`
+    processes, on one machine or on several nodes sharing a filesystem, work
+    through together. The normalized URL is the primary key, so a link
+    discovered by several workers is queued once. URLs are sharded by a hash
+    of their host and every worker starts claiming from its own home shard,
+    so a host's pages tend to stay with one worker (keeping its connections,
+    robots.txt and rate limits warm) while idle workers still take over the
+    other shards.
+
+    Workers lease a batch of URLs at a time. A lease is a visibility
+    timeout: the worker's heartbeat thread extends it while the worker
+    lives, and once it expires, e.g. because the worker crashed, the URLs
+    are handed to the next worker that claims work. A URL whose lease
+    expired `max_attempts` times is marked "failed" rather than crashing
+    workers forever. Completed URLs and newly discovered links are written
+    in batches, one transaction per `batch_size` completed pages, after the
+    `before_commit` callbacks wrote out what was produced for them: a
+    crash makes a worker redo pages, never drop them.
+
+    The database runs in WAL mode by default, which needs all processes on
+    one host. Create the queue with `wal=False` to use a rollback journal
+    when workers on several nodes share it over NFS.
+
+    Args:
+        path: The SQLite database shared by the workers
+        worker_id: Name of this worker, unique among the workers
+        shards: Number of host shards, fixed when the queue is created
+        lease_seconds: Visibility timeout of leased URLs
+        prefetch: Number of URLs leased per claim
+        batch_size: Completed pages written per transaction
+        max_attempts: Leases of a URL that may expire before it is failed
+        wal: Use WAL mode when creating the database
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        worker_id: Optional[str] = None,
+        shards: int = 64,
+        lease_seconds: float = 300.0,
+        prefetch: int = 32,
+        batch_size: int = 50,
+        max_attempts: int = 5,
+        wal: bool = True,
+    ) -> None:
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.prefetch = prefetch
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.completed = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        creating = not path.exists()
+        self._conn = _connect(path)
+        if creating and wal:
+            # Persistent: workers opening the file later inherit the mode
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('shards', ?)",
+            (str(shards),),
+        )
+        # The queue's shard count wins over ours: it decides existing rows
+        (value,) = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'shards'"
+        ).fetchone()
+        self.shards = int(value)
+        self.home_shard = zlib.crc32(self.worker_id.encode("utf-8")) % self.shards
+
+        self._claimed: Deque[FrontierItem] = deque()
+        self._in_flight: Dict[str, FrontierItem] = {}
+        self._seen: set[str] = set()
+        self._new: List[Tuple] = []
+        self._done: List[str] = []
+        self.before_commit: List[Callable[[], None]] = []
+        self._idle_until = 0.0
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def __len__(self) -> int:
+        """URLs this worker can dispatch now, leasing a batch when none are left.
+
+        The orchestrator checks the length before every `pop`, so the check
+        doubles as the request for more work.
+        """
+        # After a claim came back empty, only new links of our own are worth
+        # another write lock until the poll interval is over
+        if not self._claimed and (self._new or time.monotonic() >= self._idle_until):
+            self._claim()
+        return len(self._claimed)
+
+    def __contains__(self, url: str) -> bool:
+        # Only this worker's links; the primary key catches everyone else's
+        return normalize_url(url) in self._seen
+
+    @property
+    def exhausted(self) -> bool:
+        """True when no worker has URLs queued or leased."""
+        self.flush()
+        if self._claimed or self._in_flight:
+            return False
+        row = self._conn.execute(
+            "SELECT 1 FROM queue WHERE state IN ('queued', 'leased') LIMIT 1"
+        ).fetchone()
+        return row is None
+
+    @property
+    def wal(self) -> bool:
+        """True if the queue runs in WAL mode, i.e. its workers share one host."""
+        (mode,) = self._conn.execute("PRAGMA journal_mode").fetchone()
+        return mode.lower() == "wal"
+
+    @property
+    def seeded(self) -> bool:
+        """True once any worker has queued the first links."""
+        self.flush()
+        return self._conn.execute("SELECT 1 FROM queue LIMIT 1").fetchone() is not None
+
+    def mark_seen(self, url: str) -> None:
+        """Record a URL as handled without queueing it."""
+        key = normalize_url(url)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        link = Link(title="", href=url, text="", domain=urlsplit(url).netloc)
+        self._new.append(self._row(key, link, 0, "done"))
+
+    def add(self, link: Link, depth: int) -> bool:
+        """Queue a link unless this worker saw its normalized URL before.
+
+        Returns True for a link new to this worker; it is dropped when
+        written if another worker queued it first.
+        """
+        key = normalize_url(link.href)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self._new.append(self._row(key, link, depth, "queued"))
+        return True
+
+    def _row(self, key: str, link: Link, depth: int, state: str) -> Tuple:
+        return (
+            key,
+            link.href,
+            link.title,
+            link.text,
+            link.domain,
+            depth,
+            host_shard(key, self.shards),
+            state,
+        )
+
+    def pop(self) -> FrontierItem:
+        """Take the next leased URL."""
+        item = self._claimed.popleft()
+        self._in_flight[normalize_url(item.link.href)] = item
+        return item
+
+    def done(self, item: FrontierItem) -> None:
+        """Mark a URL as handled, writing the batch once it is full."""
+        key = normalize_url(item.link.href)
+        self._in_flight.pop(key, None)
+        self._done.append(key)
+        self.completed += 1
+        if len(self._done) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write new links and completed URLs in one transaction."""
+        if not self._new and not self._done:
+            return
+        if self._done:
+            for callback in self.before_commit:
+                callback()
+        with _Transaction(self._conn):
+            self._conn.executemany(INSERT_ITEM, self._new)
+            # A lease that expired and went to another worker is theirs now
+            self._conn.executemany(
+                "UPDATE queue SET state = 'done', owner = NULL, lease_expires = NULL "
+                "WHERE key = ? AND owner = ?",
+                [(key, self.worker_id) for key in self._done],
+            )
+            self._conn.execute(
+                "UPDATE workers SET completed = completed + ?, heartbeat = ? "
+                "WHERE id = ?",
+                (len(self._done), time.time(), self.worker_id),
+            )
+        self._new.clear()
+        self._done.clear()
+
+    def _claim(self) -> None:
+        """Lease up to `prefetch` URLs, preferring the home shard."""
+        self.flush()
+        now = time.time()
+        with _Transaction(self._conn):
+            self._requeue_expired(now)
+            rows: List[Tuple] = []
+            # Shards in order from the home shard on, so workers start apart
+            for offset in range(self.shards):
+                shard = (self.home_shard + offset) % self.shards
+                rows += self._conn.execute(
+                    "SELECT key, href, title, text, domain, depth FROM queue "
+                    "WHERE state = 'queued' AND shard = ? "
+                    "ORDER BY depth, rowid LIMIT ?",
+                    (shard, self.prefetch - len(rows)),
+                ).fetchall()
+                if len(rows) >= self.prefetch:
+                    break
+            self._conn.executemany(
+                "UPDATE queue SET state = 'leased', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE key = ?",
+                [(self.worker_id, now + self.lease_seconds, row[0]) for row in rows],
+            )
+        if not rows:
+            self._idle_until = time.monotonic() + QUEUE_POLL_SECONDS
+        for key, href, title, text, domain, depth in rows:
+            self._seen.add(key)
+            link = Link(title=title, href=href, text=text, domain=domain)
+            self._claimed.append(FrontierItem(link=link, depth=depth))
+
+    def _requeue_expired(self, now: float) -> None:
+        """Hand URLs whose lease expired back to the queue, or fail them."""
+        failed = self._conn.execute(
+            "UPDATE queue SET state = 'failed', owner = NULL, lease_expires = NULL "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, self.max_attempts),
+        ).rowcount
+        if failed:
+            logger.warning(
+                f"Failed {failed} URLs whose lease expired {self.max_attempts} times"
+            )
+        requeued = self._conn.execute(
+            "UPDATE queue SET state = 'queued', owner = NULL, lease_expires = NULL "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (now,),
+        ).rowcount
+        if requeued:
+            logger.info(f"Requeued {requeued} URLs whose lease expired")
+
+    def release(self) -> None:
+        """Write pending changes and hand unfinished URLs back right away."""
+        self.flush()
+        with _Transaction(self._conn):
+            self._conn.execute(
+                "UPDATE queue SET state = 'queued', owner = NULL, "
+                "lease_expires = NULL, attempts = MAX(attempts - 1, 0) "
+                "WHERE owner = ? AND state = 'leased'",
+                (self.worker_id,),
+            )
+        self._claimed.clear()
+        self._in_flight.clear()
+
+    def counts(self) -> Dict[str, int]:
+        """Number of URLs in every state, across all workers."""
+        counts = dict.fromkeys(QUEUE_STATES, 0)
+        counts.update(
+            self._conn.execute("SELECT state, COUNT(*) FROM queue GROUP BY state")
+        )
+        return counts
+
+    def workers(self) -> List[dict]:
+        """Workers that joined the queue, with their last heartbeat."""
+        cursor = self._conn.execute(
+            "SELECT id, host, pid, started, heartbeat, completed FROM workers "
+            "ORDER BY started"
+        )
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def start(self) -> None:
+        """Register this worker and keep its leases alive from a thread."""
+        now = time.time()
+        with _Transaction(self._conn):
+            # Worker ids are unique among live workers, so leases already
+            # held under ours belong to a predecessor that crashed
+            self._conn.execute(
+                "UPDATE queue SET state = 'queued', owner = NULL, "
+                "lease_expires = NULL WHERE owner = ? AND state = 'leased'",
+                (self.worker_id,),
+            )
+            self._conn.execute(
+                "INSERT INTO workers (id, host, pid, started, heartbeat) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                "host = excluded.host, pid = excluded.pid, "
+                "heartbeat = excluded.heartbeat",
+                (self.worker_id, socket.gethostname(), os.getpid(), now, now),
+            )
+        self._stopped.clear()
+        self._heartbeat = threading.Thread(
+            target=self._renew_leases, name="queue-heartbeat", daemon=True
+        )
+        self._heartbeat.start()
+
+    def _renew_leases(self) -> None:
+        # A connection of its own: the crawl's is used on the event loop thread
+        conn = _connect(self.path)
+        try:
+            while not self._stopped.wait(self.lease_seconds / 3):
+                now = time.time()
+                try:
+                    with _Transaction(conn):
+                        conn.execute(
+                            "UPDATE queue SET lease_expires = ? "
+                            "WHERE owner = ? AND state = 'leased'",
+                            (now + self.lease_seconds, self.worker_id),
+                        )
+                        conn.execute(
+                            "UPDATE workers SET heartbeat = ? WHERE id = ?",
+                            (now, self.worker_id),
+                        )
+                except sqlite3.OperationalError as e:
+                    # Retried on the next beat, well before the lease runs out
+                    logger.warning(f"Could not renew leases in {self.path}: {e}")
+        finally:
+            conn.close()
+
+    def stop(self) -> None:
+        """Stop the heartbeat and hand back unfinished URLs."""
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        self.release()
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+from scraper.batch import BatchLimits, SharedLimit
+
+
+class Gauge:
+    """Counts the holders of a slot, across threads."""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def leave(self):
+        with self._lock:
+            self.current -= 1
+
+
+def run_on_threads(crawl, count):
+    """Run `crawl(index)` on its own thread and event loop, like batch sites."""
+    errors = []
+
+    def target(index):
+        try:
+            asyncio.run(crawl(index))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not errors
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_shared_limit_bounds_crawls_on_different_loops():
+    limit = SharedLimit(2)
+    gauge = Gauge()
+    done = []
+
+    async def crawl(index):
+        async def fetch():
+            await limit.acquire()
+            gauge.enter()
+            try:
+                await asyncio.sleep(0.005)
+            finally:
+                gauge.leave()
+                limit.release()
+
+        await asyncio.gather(*(fetch() for _ in range(5)))
+        done.append(index)
+
+    run_on_threads(crawl, 4)
+    assert sorted(done) == [0, 1, 2, 3]
+    assert gauge.peak == 2
+    assert limit._value == 2
+
+
+def test_cancelled_waiter_gives_its_slot_back():
+    limit = SharedLimit(1)
+
+    async def crawl():
+        await limit.acquire()
+        waiter = asyncio.create_task(limit.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limit.release()
+        await asyncio.gather(waiter, return_exceptions=True)
+        # The slot is free again, whether the cancellation or the grant won
+        await asyncio.wait_for(limit.acquire(), timeout=1)
+        limit.release()
+
+    asyncio.run(crawl())
+    assert limit._value == 1 and not limit._waiters
+
+
+def test_batch_limits_bound_each_domain_and_the_total():
+    limits = BatchLimits(concurrency=3, per_domain=2)
+    total, domains = Gauge(), {name: Gauge() for name in ("a", "b")}
+
+    async def crawl(index):
+        domain = "a" if index % 2 else "b"
+
+        async def fetch():
+            async with limits.slot(domain):
+                total.enter()
+                domains[domain].enter()
+                await asyncio.sleep(0.005)
+                domains[domain].leave()
+                total.leave()
+
+        await asyncio.gather(*(fetch() for _ in range(3)))
+
+    run_on_threads(crawl, 4)
+    assert all(gauge.peak <= 2 for gauge in domains.values())
+    assert total.peak <= 3
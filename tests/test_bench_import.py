@@ -0,0 +1,36 @@
+from click.testing import CliRunner
+
+from benchmarks.bench_import import (
+    IMPORTTIME_LINE,
+    import_times,
+    loaded_heavy_modules,
+    main,
+)
+
+
+def test_importtime_lines_are_parsed():
+    match = IMPORTTIME_LINE.match("import time:       512 |       2048 |   scraper.cli")
+    assert match is not None
+    assert match.group(1, 2, 4) == ("512", "2048", "scraper.cli")
+
+
+def test_import_times_include_main():
+    times = import_times()
+    self_us, cumulative_us = times["main"]
+    assert 0 <= self_us <= cumulative_us
+    assert "scraper.cli" in times
+
+
+def test_importing_main_loads_no_heavy_module():
+    assert loaded_heavy_modules() == []
+
+
+def test_budget_is_enforced():
+    runner = CliRunner()
+    result = runner.invoke(main, ["--runs", "1", "--budget-ms", "100000"])
+    assert result.exit_code == 0, result.output
+    assert "import main: median" in result.output
+
+    result = runner.invoke(main, ["--runs", "1", "--budget-ms", "0"])
+    assert result.exit_code != 0
+    assert "over 0ms" in result.output
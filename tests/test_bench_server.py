@@ -0,0 +1,24 @@
+from benchmarks.server import SiteServer
+from benchmarks.site import SyntheticSite
+
+
+def planned(server, site):
+    return [server.planned_failure(path) for path in site.paths()]
+
+
+def test_failure_rates_hold_for_similar_paths():
+    site = SyntheticSite(1000, sections=1)
+    with SiteServer(site, error_rate=0.05, throttle_rate=0.05) as server:
+        statuses = planned(server, site)
+    # Binomial with n=999, p=0.05: the standard deviation is about 7
+    assert 20 <= statuses.count(503) <= 80
+    assert 20 <= statuses.count(429) <= 80
+    assert statuses[0] is None
+
+
+def test_failures_depend_on_the_seed():
+    site = SyntheticSite(200, sections=1)
+    with SiteServer(site, error_rate=0.2, seed=0) as first:
+        with SiteServer(site, error_rate=0.2, seed=1) as second:
+            assert planned(first, site) != planned(second, site)
+            assert planned(first, site) == planned(first, site)
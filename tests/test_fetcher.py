@@ -0,0 +1,36 @@
+import pytest
+
+from scraper.fetcher import detect_encoding
+
+PAGE = "<html><body><p>café — naïve</p></body></html>"
+
+
+@pytest.mark.parametrize(
+    "content_type, body, expected",
+    [
+        # requests would fall back to ISO-8859-1 here and garble the page
+        ("text/html", PAGE.encode("utf-8"), "utf-8"),
+        ("text/html; charset=ISO-8859-1", "café".encode("latin-1"), "iso8859-1"),
+        ('text/html; charset="utf-8"', PAGE.encode("utf-8"), "utf-8"),
+        ("text/html", b"\xef\xbb\xbf" + PAGE.encode("utf-8"), "utf-8-sig"),
+        (
+            "text/html",
+            b'<head><meta charset="windows-1252"></head>caf\xe9',
+            "cp1252",
+        ),
+        (
+            None,
+            b'<meta http-equiv="Content-Type" content="text/html; charset=shift_jis">',
+            "shift_jis",
+        ),
+        # Unknown charsets are ignored rather than failing the decode
+        ("text/html; charset=bogus", PAGE.encode("utf-8"), "utf-8"),
+    ],
+)
+def test_detect_encoding(content_type, body, expected):
+    assert detect_encoding(content_type, body) == expected
+
+
+def test_undeclared_utf8_round_trips():
+    body = PAGE.encode("utf-8")
+    assert body.decode(detect_encoding("text/html", body)) == PAGE
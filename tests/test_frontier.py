@@ -0,0 +1,72 @@
+import json
+
+from scraper.frontier import Frontier
+from scraper.link import Link
+
+
+def make_link(path):
+    href = f"https://docs.example.com/{path}"
+    return Link(title=path, href=href, text=path, domain="docs.example.com")
+
+
+def test_checkpoint_journals_only_new_urls(tmp_path):
+    path = tmp_path / "site.frontier.json"
+    frontier = Frontier(path)
+    frontier.add(make_link("a"), depth=1)
+    frontier.mark_seen("https://docs.example.com/")
+    frontier.save()
+    frontier.add(make_link("b"), depth=1)
+    frontier.save()
+    frontier.save()
+
+    assert "seen" not in json.loads(path.read_text())
+    assert frontier.seen_path.read_text().splitlines() == [
+        "https://docs.example.com/a",
+        "https://docs.example.com",
+        "https://docs.example.com/b",
+    ]
+
+    restored = Frontier.load(path)
+    assert len(restored) == 2
+    assert "https://docs.example.com/" in restored
+    assert not restored.add(make_link("a"), depth=1)
+
+    restored.clear()
+    assert not path.exists() and not frontier.seen_path.exists()
+
+
+def test_torn_journal_line_is_ignored(tmp_path):
+    path = tmp_path / "site.frontier.json"
+    frontier = Frontier(path)
+    frontier.mark_seen("https://docs.example.com/docs")
+    frontier.save()
+    with open(frontier.seen_path, "a") as f:
+        f.write("https://docs.example.com/do")
+
+    restored = Frontier.load(path)
+    assert "https://docs.example.com/docs" in restored
+    assert "https://docs.example.com/do" not in restored
+
+
+def test_inline_seen_set_of_old_checkpoints_is_kept(tmp_path):
+    path = tmp_path / "site.frontier.json"
+    path.write_text(json.dumps({"seen": ["https://docs.example.com/old"], "queue": []}))
+
+    frontier = Frontier.load(path)
+    frontier.save()
+    assert "https://docs.example.com/old" in Frontier.load(path)
+
+
+def test_resumed_queue_drops_pages_already_done(tmp_path):
+    path = tmp_path / "site.frontier.json"
+    frontier = Frontier(path)
+    for name in ("a", "b", "c"):
+        frontier.add(make_link(name), depth=1)
+    frontier.save()
+
+    # Killed after "a" and "b" were crawled, before the next checkpoint
+    restored = Frontier.load(path)
+    done = {"https://docs.example.com/a", "https://docs.example.com/b"}
+    assert restored.drop_done(done.__contains__) == 2
+    assert [restored.pop().link.title] == ["c"]
+    assert len(restored) == 0
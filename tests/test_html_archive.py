@@ -0,0 +1,62 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from scraper.html_archive import HtmlArchive, load_html
+from scraper.state_store import open_page_log
+
+CRAWL = textwrap.dedent(
+    """
+    import os, signal, sys
+    from pathlib import Path
+
+    from scraper.html_archive import HtmlArchive
+    from scraper.scraping_page_log import ScrapingPage
+    from scraper.state_store import open_page_log
+
+    domain_dir = Path(sys.argv[1])
+    archive = HtmlArchive(domain_dir / "archive")
+    page_log = open_page_log(domain_dir, "csv")
+    for i in range(25):
+        url = f"https://docs.example.com/{i}"
+        html_path = archive.put(url, f"<p>page {i}</p>")
+        page_log.append(ScrapingPage.create(url=url, html_path=html_path, title=str(i)))
+    os.kill(os.getpid(), signal.SIGKILL)
+    """
+)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+def test_logged_pages_resolve_after_a_crash(tmp_path):
+    repo = Path(__file__).parents[1]
+    process = subprocess.run([sys.executable, "-c", CRAWL, str(tmp_path)], cwd=repo)
+    assert process.returncode == -signal.SIGKILL
+
+    page_log = open_page_log(tmp_path, "csv")
+    entries = list(page_log)
+    assert len(entries) == 25
+    with HtmlArchive(tmp_path / "archive") as archive:
+        for entry in entries:
+            assert entry.html_path is not None
+            assert load_html(entry.html_path, archive) == f"<p>page {entry.title}</p>"
+
+
+def test_blobs_cut_short_are_dropped_on_open(tmp_path):
+    with HtmlArchive(tmp_path) as archive:
+        archive.put("https://docs.example.com/a", "<p>a</p>")
+        size = (tmp_path / "archive.dat").stat().st_size
+        archive.put("https://docs.example.com/b", "<p>b</p>")
+
+    # A power loss kept the index entry but not the data it points at
+    os.truncate(tmp_path / "archive.dat", size + 1)
+
+    with HtmlArchive(tmp_path) as archive:
+        assert archive.get("https://docs.example.com/a") == "<p>a</p>"
+        assert "https://docs.example.com/b" not in archive
+        archive.put("https://docs.example.com/b", "<p>b again</p>")
+        assert archive.get("https://docs.example.com/b") == "<p>b again</p>"
@@ -0,0 +1,70 @@
+import pytest
+
+from scraper.config import LinkConfig
+from scraper.link_scraper import chunk_text, extract_links, iter_links
+
+BASE_URL = "https://docs.example.com/guide/"
+
+PAGES = {
+    # Header links repeated inside the nav must not be taken for duplicates
+    "repeated_outside": """
+        <header><a href="/about">About</a></header>
+        <nav><a href="/about">About</a><a href="/x">X</a></nav>
+    """,
+    "no_container": """
+        <div><a href="/a">A</a><a href="mailto:me@example.com">Mail</a></div>
+        <p><a href="https://other.org/b">B</a></p>
+    """,
+    "nested_containers": """
+        <nav><ul><li><a href="one">1</a></li>
+        <nav><a href="two">2</a></nav>
+        <li><a href="three">3</a></li></ul></nav>
+        <footer><a href="/footer">Footer</a></footer>
+    """,
+    "several_containers": """
+        <nav class="main-menu"><a href="/m1">M1</a></nav>
+        <a href="/between">Between</a>
+        <nav class="main-menu"><a href="/m2">M2</a><a href="/m1">M1</a></nav>
+    """,
+}
+
+CONFIGS = {
+    "nav": LinkConfig(tag="nav"),
+    "class_contains": LinkConfig(tag="nav", class_contains="menu"),
+    "same_origin": LinkConfig(tag="nav", same_origin=True),
+    "exclude": LinkConfig(tag="nav", exclude=(r"/about",)),
+}
+
+
+def hrefs(links):
+    return sorted(link.href for link in links)
+
+
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("chunk_size", [7, 1 << 16])
+def test_streaming_matches_parsed_extraction(page, config, chunk_size):
+    html = PAGES[page]
+    expected = extract_links(html, BASE_URL, config=CONFIGS[config])
+    streamed = list(iter_links(chunk_text(html, chunk_size), BASE_URL, CONFIGS[config]))
+    assert hrefs(streamed) == hrefs(expected)
+    # Every link is yielded once
+    assert len(streamed) == len(set(streamed))
+
+
+def test_link_repeated_in_container_is_kept():
+    links = iter_links([PAGES["repeated_outside"]], BASE_URL, LinkConfig(tag="nav"))
+    assert hrefs(links) == [
+        "https://docs.example.com/about",
+        "https://docs.example.com/x",
+    ]
+
+
+def test_page_without_container_yields_every_link():
+    links = iter_links([PAGES["no_container"]], BASE_URL, LinkConfig(tag="nav"))
+    assert hrefs(links) == ["https://docs.example.com/a", "https://other.org/b"]
+
+
+def test_css_selector_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_links(["<nav></nav>"], BASE_URL, LinkConfig(selector="nav a")))
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from scraper.content_scraper import PageResult
+from scraper.link import Link
+from scraper.markdown_pool import MarkdownPool
+from scraper.response_cache import ResponseCache
+
+pytest.importorskip("markitdown")
+
+FRAGMENTS = ["<h2>Install</h2>", "<ul><li>one</li><li>two</li></ul>", "<div></div>"]
+
+
+class ThreadRecordingCache(ResponseCache):
+    """Cache remembering the threads it was used from."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def get(self, url, options):
+        self.threads.add(threading.get_ident())
+        return super().get(url, options)
+
+    def put(self, url, options, text):
+        self.threads.add(threading.get_ident())
+        super().put(url, options, text)
+
+
+def make_result():
+    link = Link(title="a", href="https://docs.example.com/a", text="", domain="")
+    return PageResult(link=link, texts=list(FRAGMENTS))
+
+
+def convert(pool):
+    async def run():
+        return await pool.convert(make_result()), threading.get_ident()
+
+    return asyncio.run(run())
+
+
+def test_cache_is_used_off_the_event_loop(tmp_path):
+    with ThreadRecordingCache(tmp_path, ttl=None) as cache:
+        pool = MarkdownPool(cache, workers=1)
+        try:
+            first, loop_thread = convert(pool)
+            assert first.texts == ["## Install", "* one\n* two"]
+            assert cache.stats.stored == 3
+
+            second, _ = convert(pool)
+            assert second.texts == first.texts
+            assert cache.stats.hits == 3
+        finally:
+            pool.close()
+    assert cache.threads and loop_thread not in cache.threads
@@ -0,0 +1,64 @@
+import importlib.util
+
+import pytest
+
+from scraper.config import LinkConfig, TextConfig
+from scraper.matchers import compile_matcher
+from scraper.parsers import available_parsers, is_selectolax, parse_html
+
+NESTED = """
+<div class="doc" id="a">
+  <div class="doc" id="b"><div class="doc" id="c">C</div></div>
+  <div class="doc" id="d">D</div>
+  <div class="other" id="x"><div class="doc" id="f">F</div></div>
+</div>
+<div class="doc" id="e">E</div>
+"""
+
+
+def ids(elements, document):
+    if is_selectolax(document):
+        return [element.attributes.get("id") for element in elements]
+    return [element.get("id") for element in elements]
+
+
+@pytest.fixture(params=available_parsers())
+def parser(request):
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "nesting, expected",
+    [
+        ("all", ["a", "b", "c", "d", "f", "e"]),
+        ("outermost", ["a", "e"]),
+        ("innermost", ["c", "d", "f", "e"]),
+    ],
+)
+def test_nesting_modes(parser, nesting, expected):
+    document = parse_html(NESTED, parser)
+    matcher = compile_matcher(TextConfig(class_name="doc", nesting=nesting))
+    assert ids(matcher.select(document), document) == expected
+
+
+def test_class_contains_pattern(parser):
+    document = parse_html(NESTED, parser)
+    matcher = compile_matcher(TextConfig(class_contains="^oth"))
+    assert ids(matcher.select(document), document) == ["x"]
+
+
+def test_selector_is_used_as_is(parser):
+    if parser != "selectolax" and importlib.util.find_spec("soupsieve") is None:
+        pytest.skip("BeautifulSoup needs soupsieve for CSS selectors")
+    document = parse_html(NESTED, parser)
+    matcher = compile_matcher(TextConfig(selector="#a > .doc", nesting="outermost"))
+    assert ids(matcher.select(document), document) == ["b", "d"]
+
+
+def test_matchers_are_compiled_once():
+    assert compile_matcher(LinkConfig(tag="nav")) is compile_matcher(
+        LinkConfig(tag="nav")
+    )
+    assert compile_matcher(LinkConfig(tag="nav")) is not compile_matcher(
+        TextConfig(tag="nav")
+    )
@@ -0,0 +1,36 @@
+import urllib.request
+
+import pytest
+
+from scraper.metrics import CrawlMetrics, Histogram, serve_prometheus
+
+
+def test_quantile_interpolates_within_the_bucket():
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.quantile(0.25) == pytest.approx(1.0)
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(0.95) == pytest.approx(3.6)
+
+
+def test_quantile_in_the_overflow_bucket_is_the_largest_bound():
+    histogram = Histogram(buckets=(1.0, 2.0))
+    histogram.observe(60.0)
+    assert histogram.quantile(0.95) == 2.0
+    assert Histogram().quantile(0.95) == 0.0
+
+
+def test_prometheus_server_listens_on_localhost_by_default():
+    metrics = CrawlMetrics()
+    metrics.record_page("success")
+    server = serve_prometheus(metrics, 0)
+    try:
+        host, port = server.server_address[:2]
+        assert host == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+        assert 'crawler_pages_total{status="success"} 1' in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from scraper.content_scraper import PageResult
+from scraper.frontier import Frontier
+from scraper.link import Link
+from scraper.orchestrator import CrawlOrchestrator
+
+
+def make_link(domain: str, path: str) -> Link:
+    return Link(title=path, href=f"https://{domain}/{path}", text="", domain=domain)
+
+
+def test_results_are_handled_in_dispatch_order():
+    frontier = Frontier()
+    for i in range(20):
+        frontier.add(make_link("a.example", str(i)), depth=1)
+
+    async def fetch(item):
+        # Later items finish first
+        await asyncio.sleep(0.001 * (20 - int(item.link.title)))
+        return PageResult(link=item.link)
+
+    handled = []
+    orchestrator = CrawlOrchestrator(
+        fetch=fetch, handle=lambda result: handled.append(result.link.title)
+    )
+    assert orchestrator.run(frontier) == 20
+    assert handled == [str(i) for i in range(20)]
+    assert frontier.exhausted
+
+
+def test_busy_host_does_not_hold_global_slots():
+    frontier = Frontier()
+    for i in range(4):
+        frontier.add(make_link("slow.example", f"s{i}"), depth=1)
+        frontier.add(make_link("fast.example", f"f{i}"), depth=1)
+
+    started = time.monotonic()
+    finished = {}
+
+    async def fetch(item):
+        await asyncio.sleep(0.2 if item.link.domain == "slow.example" else 0.01)
+        finished[item.link.title] = time.monotonic() - started
+        return PageResult(link=item.link)
+
+    orchestrator = CrawlOrchestrator(
+        fetch=fetch, handle=lambda result: None, concurrency=2, per_host_limit=1
+    )
+    orchestrator.run(frontier)
+    # Slow pages waiting for their host leave the second slot to the fast
+    # host instead of queueing it behind the first slow page
+    assert max(finished[f"f{i}"] for i in range(3)) < 0.15
+    assert orchestrator.concurrency == 2
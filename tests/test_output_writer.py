@@ -0,0 +1,86 @@
+from scraper.output_writer import OutputPatcher, OutputWriter, index_documents
+
+
+def read(path):
+    return path.read_text(encoding="utf-8")
+
+
+def test_index_is_keyed_by_url(tmp_path):
+    path = tmp_path / "out.txt"
+    with OutputWriter(path) as writer:
+        writer.write_document("guide_intro", ["A"], "https://a.example/v1/guide/intro")
+        writer.write_document("guide_intro", ["B"], "https://a.example/v2/guide/intro")
+        writer.write_document("legacy", ["C"])
+    by_url, by_title = index_documents(path)
+    assert list(by_url) == [
+        "https://a.example/v1/guide/intro",
+        "https://a.example/v2/guide/intro",
+    ]
+    assert list(by_title) == ["legacy"]
+
+
+def test_patcher_keeps_pages_with_the_same_title_apart(tmp_path):
+    path = tmp_path / "out.txt"
+    v1, v2 = "https://a.example/v1/guide/intro", "https://a.example/v2/guide/intro"
+    with OutputWriter(path) as writer:
+        writer.write_document("guide_intro", ["old v1"], v1)
+        writer.write_document("guide_intro", ["old v2"], v2)
+
+    with OutputPatcher(path) as patcher:
+        patcher.write_document("guide_intro", ["new v2"], v2)
+
+    text = read(path)
+    assert "old v1" in text and "new v2" in text and "old v2" not in text
+    assert list(index_documents(path)[0]) == [v1, v2]
+
+
+def test_patcher_appends_new_url_whose_title_is_taken(tmp_path):
+    path = tmp_path / "out.txt"
+    with OutputWriter(path) as writer:
+        writer.write_document("index", ["docs home"], "https://a.example/docs/")
+
+    with OutputPatcher(path) as patcher:
+        patcher.write_document("index", ["blog home"], "https://a.example/blog/")
+
+    text = read(path)
+    assert text.index("docs home") < text.index("blog home")
+    assert list(index_documents(path)[0]) == [
+        "https://a.example/docs/",
+        "https://a.example/blog/",
+    ]
+
+
+def test_patcher_replaces_document_written_without_url(tmp_path):
+    path = tmp_path / "out.txt"
+    with OutputWriter(path) as writer:
+        writer.write_document("intro", ["old"])
+        writer.write_document("other", ["kept"])
+
+    with OutputPatcher(path) as patcher:
+        patcher.write_document("intro", ["new"], "https://a.example/intro")
+        patcher.write_document("added", ["appended"], "https://a.example/added")
+
+    text = read(path)
+    assert "old" not in text
+    assert text.index("new") < text.index("kept") < text.index("appended")
+    by_url, by_title = index_documents(path)
+    assert list(by_url) == ["https://a.example/intro", "https://a.example/added"]
+    assert list(by_title) == ["other"]
+
+
+def test_patcher_replaces_a_legacy_document_once(tmp_path):
+    path = tmp_path / "out.txt"
+    with OutputWriter(path) as writer:
+        writer.write_document("intro", ["old"])
+
+    with OutputPatcher(path) as patcher:
+        patcher.write_document("intro", ["v1"], "https://a.example/v1/intro")
+        patcher.write_document("intro", ["v2"], "https://a.example/v2/intro")
+
+    text = read(path)
+    assert "old" not in text
+    assert text.index("v1") < text.index("v2")
+    assert list(index_documents(path)[0]) == [
+        "https://a.example/v1/intro",
+        "https://a.example/v2/intro",
+    ]
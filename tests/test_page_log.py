@@ -0,0 +1,142 @@
+import csv
+
+import pytest
+
+from scraper.scraping_page_log import LOG_COLUMNS, PageLog, ScrapingPage
+from scraper.state_store import (
+    SQLitePageLog,
+    find_page_log,
+    migrate_csv_log,
+    open_page_log,
+)
+
+
+def page(url, status="success", timestamp="2024-01-01T00:00:00", content_hash=None):
+    return ScrapingPage(
+        timestamp=timestamp,
+        url=url,
+        html_path=None,
+        status=status,
+        title=url.rsplit("/", 1)[-1],
+        domain="docs.example.com",
+        content_hash=content_hash,
+    )
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def store(request):
+    return request.param
+
+
+def reopen(page_log, domain_dir, store):
+    page_log.close()
+    return open_page_log(domain_dir, store)
+
+
+def test_latest_entry_per_url_survives_reopening(tmp_path, store):
+    page_log = open_page_log(tmp_path, store)
+    page_log.append(page("https://docs.example.com/a", status="failed"))
+    page_log.append(page("https://docs.example.com/a"))
+    page_log.append(page("https://docs.example.com/b", status="failed"))
+
+    page_log = reopen(page_log, tmp_path, store)
+    assert len(page_log) == 3
+    assert "https://docs.example.com/a" in page_log
+    assert page_log.get("https://docs.example.com/a").status == "success"
+    assert sorted(entry.url for entry in page_log) == [
+        "https://docs.example.com/a",
+        "https://docs.example.com/b",
+    ]
+    page_log.close()
+
+
+def test_skip_and_refresh_checks(tmp_path, store):
+    page_log = open_page_log(tmp_path, store)
+    page_log.append(page("https://docs.example.com/ok", content_hash="abc"))
+    page_log.append(page("https://docs.example.com/failed", status="failed"))
+
+    assert page_log.should_skip("https://docs.example.com/ok", overwrite=True)
+    assert page_log.should_skip("https://docs.example.com/failed")
+    assert not page_log.should_skip("https://docs.example.com/failed", overwrite=True)
+    assert not page_log.should_skip("https://docs.example.com/new")
+    assert page_log.content_hash("https://docs.example.com/ok") == "abc"
+    page_log.close()
+
+
+def test_sqlite_queries_use_the_latest_attempt(tmp_path):
+    page_log = SQLitePageLog.load_or_create(tmp_path / "logs.sqlite")
+    for _ in range(2):
+        page_log.append(page("https://docs.example.com/flaky", status="failed"))
+    page_log.append(page("https://docs.example.com/fixed", status="failed"))
+    page_log.append(page("https://docs.example.com/fixed"))
+
+    assert [p.url for p in page_log.failed_pages()] == [
+        "https://docs.example.com/flaky"
+    ]
+    assert page_log.pages_to_retry(max_attempts=3)
+    assert not page_log.pages_to_retry(max_attempts=2)
+    (stats,) = page_log.domain_stats()
+    assert (stats["pages"], stats["succeeded"], stats["failed"]) == (2, 1, 1)
+    page_log.close()
+
+
+def write_csv_log(path, pages):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(LOG_COLUMNS)
+        for entry in pages:
+            writer.writerow([getattr(entry, column) for column in LOG_COLUMNS])
+
+
+def test_migrate_imports_once(tmp_path):
+    csv_path, db_path = tmp_path / "logs.csv", tmp_path / "logs.sqlite"
+    write_csv_log(
+        csv_path,
+        [page("https://docs.example.com/a"), page("https://docs.example.com/b")],
+    )
+    assert migrate_csv_log(csv_path, db_path, batch_size=1) == 2
+
+    with pytest.raises(ValueError):
+        migrate_csv_log(csv_path, db_path)
+    page_log = SQLitePageLog.load_or_create(db_path)
+    assert len(page_log) == 2
+    page_log.close()
+
+
+def test_csv_log_without_new_columns_is_upgraded(tmp_path):
+    path = tmp_path / "logs.csv"
+    old_columns = [c for c in LOG_COLUMNS if c not in ("content_hash", "credits")]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(old_columns)
+        writer.writerow(
+            [
+                "2024-01-01T00:00:00",
+                "https://docs.example.com/a",
+                "",
+                "success",
+                "a",
+                "docs.example.com",
+            ]
+        )
+
+    page_log = PageLog.load_or_create(path)
+    page_log.append(page("https://docs.example.com/b", content_hash="abc"))
+    page_log = PageLog.load_or_create(path)
+    assert page_log.content_hash("https://docs.example.com/b") == "abc"
+    assert page_log.get("https://docs.example.com/a").content_hash is None
+
+
+def test_find_page_log_detects_the_store_without_creating_one(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        find_page_log(tmp_path)
+    page_log = open_page_log(tmp_path, "sqlite")
+    page_log.append(page("https://docs.example.com/a"))
+    page_log.close()
+
+    found = find_page_log(tmp_path)
+    assert isinstance(found, SQLitePageLog) and len(found) == 1
+    found.close()
+    with pytest.raises(FileNotFoundError):
+        find_page_log(tmp_path, "csv")
+    assert not (tmp_path / "logs.csv").exists()
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from scraper.config import LinkConfig, TextConfig
+from scraper.content_scraper import PageResult
+from scraper.link import Link
+from scraper.parse_pool import ParsePool
+
+
+def page(i):
+    return (
+        f"<html><body><nav><a href='/page-{i + 1}'>next</a></nav>"
+        f"<div class='content'>text of page {i}</div></body></html>"
+    )
+
+
+def fetched(i, depth=0, html=True):
+    url = f"https://docs.example.com/page-{i}"
+    link = Link(title=f"page_{i}", href=url, text="", domain="docs.example.com")
+    return PageResult(link=link, html_content=page(i) if html else None, depth=depth)
+
+
+@pytest.fixture
+def pool():
+    pool = ParsePool(
+        TextConfig(tag="div", class_contains="content"),
+        link_config=LinkConfig(tag="nav"),
+        max_depth=1,
+        workers=2,
+        queue_size=3,
+        keep_html=False,
+    )
+    yield pool
+    pool.close()
+
+
+def extract_all(pool, results):
+    async def run():
+        return await asyncio.gather(*(pool.extract(result) for result in results))
+
+    return asyncio.run(run())
+
+
+def test_pages_are_extracted_on_the_workers(pool):
+    results = extract_all(pool, [fetched(i) for i in range(10)])
+
+    assert [result.texts for result in results] == [
+        [f"text of page {i}"] for i in range(10)
+    ]
+    assert [[link.href for link in result.links] for result in results] == [
+        [f"https://docs.example.com/page-{i + 1}"] for i in range(10)
+    ]
+    assert all("extract" in result.timings for result in results)
+    # keep_html=False frees the body once it is extracted
+    assert all(result.html_content is None for result in results)
+
+
+def test_links_are_only_extracted_above_max_depth(pool):
+    shallow, deep = extract_all(pool, [fetched(0, depth=0), fetched(1, depth=1)])
+    assert shallow.links and not deep.links
+    assert deep.texts == ["text of page 1"]
+
+
+def test_pages_without_html_are_passed_through(pool):
+    (result,) = extract_all(pool, [fetched(0, html=False)])
+    assert result.texts == [] and result.links == []
+
+
+def test_pool_works_across_event_loops(pool):
+    # The queue is made anew for each event loop that uses the pool
+    for i in range(2):
+        (result,) = extract_all(pool, [fetched(i)])
+        assert result.texts == [f"text of page {i}"]
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+import requests
+
+from scraper.fetcher import FetchError
+from scraper.politeness import DisallowedByRobots, PolitenessScheduler, RobotsCache
+
+ROBOTS = """
+User-agent: *
+Disallow: /private/
+Crawl-delay: 2
+"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, text=""):
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return self.response
+
+
+@pytest.mark.parametrize(
+    "response, public, private",
+    [
+        (FakeResponse(200, ROBOTS), True, False),
+        (FakeResponse(404), True, True),
+        (FakeResponse(403), False, False),
+        (requests.ConnectionError("refused"), True, True),
+    ],
+)
+def test_robots_rules(response, public, private):
+    session = FakeSession(response)
+    robots = RobotsCache(session)  # type: ignore[arg-type]
+
+    async def check(url):
+        return (await robots.get(url)).can_fetch("*", url)
+
+    assert asyncio.run(check("https://docs.example.com/guide")) is public
+    assert asyncio.run(check("https://docs.example.com/private/x")) is private
+    assert session.urls == ["https://docs.example.com/robots.txt"]
+
+
+def test_crawl_delay_lowers_the_host_rate():
+    robots = RobotsCache(FakeSession(FakeResponse(200, ROBOTS)))  # type: ignore[arg-type]
+    scheduler = PolitenessScheduler(rate=10.0, robots=robots)
+    asyncio.run(scheduler.admit("https://docs.example.com/guide"))
+    assert scheduler._buckets["docs.example.com"].rate == 0.5
+
+
+def test_call_retries_transient_failures():
+    scheduler = PolitenessScheduler(rate=1000.0, max_retries=3, backoff_base=0.001)
+    failures = [FetchError("https://a.example/", 503, retry_after=0.0)] * 2
+    retries = []
+
+    async def fetch():
+        if failures:
+            raise failures.pop()
+        return "page"
+
+    result = asyncio.run(
+        scheduler.call("https://a.example/", fetch, lambda: retries.append(1))
+    )
+    assert result == "page"
+    assert len(retries) == 2
+
+
+@pytest.mark.parametrize("retry_after, delay", [(120.0, 120.0), (7200.0, 600.0)])
+def test_long_retry_after_is_waited_out(retry_after, delay):
+    scheduler = PolitenessScheduler(max_backoff=60.0, max_retry_after=600.0)
+    error = FetchError("https://a.example/", 429, retry_after=retry_after)
+    assert scheduler.retry_delay("https://a.example/", error, attempt=0) == delay
+    assert scheduler.retry_delay("https://a.example/", error, attempt=3) is None
+
+
+def test_call_raises_for_disallowed_urls_without_fetching():
+    robots = RobotsCache(FakeSession(FakeResponse(403)))  # type: ignore[arg-type]
+    scheduler = PolitenessScheduler(robots=robots)
+    fetched = []
+
+    async def fetch():
+        fetched.append(1)
+
+    with pytest.raises(DisallowedByRobots):
+        asyncio.run(scheduler.call("https://docs.example.com/", fetch))
+    assert not fetched
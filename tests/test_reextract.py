@@ -0,0 +1,71 @@
+from click.testing import CliRunner
+
+from main import cli
+from scraper.html_archive import HtmlArchive
+from scraper.output_writer import index_documents
+from scraper.scraping_page_log import ScrapingPage
+from scraper.state_store import open_page_log
+from scraper.utils import create_title_from_url
+
+BASE = "https://docs.example.com/guide"
+
+
+def page_html(name):
+    return (
+        f"<html><body><nav><a href='/{name}'>{name}</a></nav>"
+        f"<div class='content'>{name} text</div>"
+        f"<div class='sidebar'>{name} sidebar</div></body></html>"
+    )
+
+
+def crawl_into_archive(domain_dir, names):
+    """Leave what `crawl --archive --state-store sqlite` leaves behind."""
+    domain_dir.mkdir()
+    page_log = open_page_log(domain_dir, "sqlite")
+    with HtmlArchive(domain_dir / "archive") as archive:
+        pages = [(BASE, "base")]
+        pages += [(f"https://docs.example.com/{name}", name) for name in names]
+        for url, name in pages:
+            html_path = archive.put(url, page_html(name))
+            page_log.append(ScrapingPage.create(url, html_path=html_path, title=name))
+    page_log.close()
+
+
+def test_reextract_rebuilds_the_output_from_the_archive(tmp_path):
+    domain_dir = tmp_path / "docs_example_com"
+    crawl_into_archive(domain_dir, ["intro", "setup", "usage"])
+
+    result = CliRunner().invoke(
+        cli,
+        [
+            "reextract",
+            BASE,
+            "--output-dir",
+            str(tmp_path),
+            "--text-tag",
+            "div",
+            "--text-class-name",
+            "sidebar",
+            "--workers",
+            "2",
+        ],
+    )
+    assert result.exit_code == 0, result.output
+
+    output_path = domain_dir / f"{create_title_from_url(BASE)}.txt"
+    text = output_path.read_text(encoding="utf-8")
+    assert "intro sidebar" in text and "usage sidebar" in text
+    assert "intro text" not in text
+    # The base page is not part of the output, and pages keep their order
+    assert "base sidebar" not in text
+    assert list(index_documents(output_path)[0]) == [
+        "https://docs.example.com/intro",
+        "https://docs.example.com/setup",
+        "https://docs.example.com/usage",
+    ]
+
+
+def test_reextract_without_saved_pages_fails(tmp_path):
+    (tmp_path / "docs_example_com").mkdir()
+    result = CliRunner().invoke(cli, ["reextract", BASE, "--output-dir", str(tmp_path)])
+    assert result.exit_code != 0
@@ -0,0 +1,71 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from scraper.response_cache import ResponseCache
+
+OPTIONS = {"via": "requests"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("scraper.response_cache.time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def body():
+    # Random bytes do not compress, so every entry has about the same size
+    return os.urandom(1000).hex()
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    with ResponseCache(tmp_path, ttl=60) as cache:
+        cache.put("https://a.example/", OPTIONS, "page")
+        clock.now += 59
+        assert cache.get("https://a.example/", OPTIONS) == "page"
+        clock.now += 2
+        assert cache.get("https://a.example/", OPTIONS) is None
+        assert cache.stats.expired == 1
+        assert cache.info()["entries"] == 0
+
+
+def test_options_are_part_of_the_key(tmp_path, clock):
+    with ResponseCache(tmp_path) as cache:
+        cache.put("https://a.example/", OPTIONS, "plain")
+        assert cache.get("https://a.example/", {"via": "scrapingant"}) is None
+        assert cache.get("https://a.example/", OPTIONS) == "plain"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    with ResponseCache(tmp_path, ttl=None, max_bytes=3000) as cache:
+        for name in ("a", "b"):
+            cache.put(f"https://a.example/{name}", OPTIONS, body())
+            clock.now += 1
+        # Reading "a" makes "b" the least recently used entry
+        assert cache.get("https://a.example/a", OPTIONS) is not None
+        clock.now += 1
+        cache.put("https://a.example/c", OPTIONS, body())
+
+        assert cache.stats.evicted == 1
+        assert cache.get("https://a.example/b", OPTIONS) is None
+        assert cache.get("https://a.example/a", OPTIONS) is not None
+        assert cache.get("https://a.example/c", OPTIONS) is not None
+        assert cache.info()["bytes"] <= 3000
+
+
+def test_size_survives_reopening(tmp_path, clock):
+    with ResponseCache(tmp_path) as cache:
+        cache.put("https://a.example/", OPTIONS, body())
+        size = cache.info()["bytes"]
+    with ResponseCache(tmp_path) as cache:
+        assert cache.info()["bytes"] == size > 0
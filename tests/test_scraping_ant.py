@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from scrapingant_client.errors import (  # type: ignore
+    ScrapingantInvalidTokenException,
+    ScrapingantTimeoutException,
+)
+
+from scraper.scraping_ant import CREDITS_BROWSER, CREDITS_PLAIN, ScrapingAntFetcher
+
+
+class StubClient:
+    """Answers like ScrapingAntClient, through its async or blocking API."""
+
+    def __init__(self, pages=None, failures=(), delay=0.0):
+        self.pages = pages or {}
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _respond(self, url, browser):
+        self.calls.append((url, browser))
+        if self.failures:
+            raise self.failures.pop(0)
+        return SimpleNamespace(content=self.pages.get((url, browser), ""))
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def general_request(self, url, browser=True):
+        self._enter()
+        try:
+            time.sleep(self.delay)
+            return self._respond(url, browser)
+        finally:
+            self._leave()
+
+    async def general_request_async(self, url, browser=True):
+        self._enter()
+        try:
+            await asyncio.sleep(self.delay)
+            return self._respond(url, browser)
+        finally:
+            self._leave()
+
+
+URL = "https://docs.example.com/page"
+
+
+def test_transient_error_is_retried():
+    client = StubClient({(URL, False): "<p>ok</p>"}, [ScrapingantTimeoutException()])
+    ant = ScrapingAntFetcher(client, render="never", backoff_base=0.001)
+
+    response = asyncio.run(ant.request(URL, browser=False))
+
+    assert response.content == "<p>ok</p>"
+    assert len(client.calls) == 2
+    # Only the request that succeeded is charged
+    assert ant.credits_spent == CREDITS_PLAIN
+
+
+def test_permanent_error_is_not_retried():
+    client = StubClient(failures=[ScrapingantInvalidTokenException()])
+    ant = ScrapingAntFetcher(client, backoff_base=0.001)
+
+    with pytest.raises(ScrapingantInvalidTokenException):
+        asyncio.run(ant.request(URL, browser=False))
+    assert len(client.calls) == 1
+
+
+def test_auto_render_falls_back_to_the_browser():
+    client = StubClient({(URL, False): "", (URL, True): "<p>rendered</p>"})
+    ant = ScrapingAntFetcher(client, render="auto")
+
+    async def extract(html):
+        return html
+
+    response, extracted = asyncio.run(ant.fetch(URL, extract, lambda html: not html))
+
+    assert extracted == "<p>rendered</p>"
+    assert response.rendered
+    assert client.calls == [(URL, False), (URL, True)]
+    assert response.credits == CREDITS_PLAIN + CREDITS_BROWSER == 11
+    assert ant.credits_spent == 11
+
+
+def test_requests_in_flight_stay_within_the_concurrency():
+    client = StubClient(delay=0.02)
+    ant = ScrapingAntFetcher(client, concurrency=3, render="never")
+
+    async def crawl():
+        urls = [f"{URL}/{i}" for i in range(12)]
+        await asyncio.gather(*(ant.request(url, browser=False) for url in urls))
+
+    asyncio.run(crawl())
+    assert len(client.calls) == 12
+    assert client.max_in_flight == 3
@@ -0,0 +1,76 @@
+import gzip
+import json
+
+import pytest
+
+from scraper.sinks import JsonlSink, PageRecord, open_sink
+
+
+def record(i):
+    return PageRecord(
+        url=f"https://docs.example.com/{i}",
+        title=str(i),
+        texts=[f"text {i} " * 20],
+        fetched_at="2024-01-01T00:00:00",
+        status="success",
+        depth=1,
+    )
+
+
+def read_jsonl(path):
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_jsonl_shards_roll_over_by_size(tmp_path, compress):
+    with JsonlSink(tmp_path, "out", max_bytes=1000, compress=compress) as sink:
+        for i in range(10):
+            sink.write(record(i))
+        # The shard being written is the only one without its final name
+        (unfinished,) = tmp_path.glob("*.tmp")
+        assert set(tmp_path.iterdir()) == {*sink.shards, unfinished}
+
+    suffix = ".jsonl.gz" if compress else ".jsonl"
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == [f"out-{i:05d}{suffix}" for i in range(len(names))]
+    assert len(names) > 1
+
+    rows = [row for name in names for row in read_jsonl(tmp_path / name)]
+    assert [row["url"] for row in rows] == [record(i).url for i in range(10)]
+    assert rows[0]["texts"] == record(0).texts
+
+
+def test_numbering_continues_after_existing_shards(tmp_path):
+    with JsonlSink(tmp_path, "out", compress=False) as sink:
+        sink.write(record(0))
+    with JsonlSink(tmp_path, "out", compress=False) as sink:
+        sink.write(record(1))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "out-00000.jsonl",
+        "out-00001.jsonl",
+    ]
+
+
+def test_unknown_sink_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        open_sink("csv", tmp_path, "out")
+
+
+def test_parquet_shards_roll_over_by_size(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    sink = open_sink("parquet", tmp_path, "out", max_bytes=1, row_group_size=3)
+    for i in range(7):
+        sink.write(record(i))
+    sink.close()
+
+    # Every row group is past max_bytes, so each one is a shard of its own
+    names = sorted(path.name for path in tmp_path.iterdir())
+    assert names == ["out-00000.parquet", "out-00001.parquet", "out-00002.parquet"]
+    urls = [
+        url
+        for name in names
+        for url in pq.read_table(tmp_path / name, columns=["url"])["url"].to_pylist()
+    ]
+    assert urls == [record(i).url for i in range(7)]
@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from scraper.politeness import PolitenessScheduler, RobotsCache
+from scraper.sitemap import load_sitemap, parse_lastmod
+
+ROOT = "https://docs.example.com"
+ROBOTS = f"""User-agent: *
+Disallow: /private/
+Sitemap: {ROOT}/map.xml
+Sitemap: {ROOT}/private/map.xml
+"""
+SITEMAP = f"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{ROOT}/a</loc><lastmod>2024-05-01T12:00:00+02:00</lastmod></url>
+  <url><loc>{ROOT}/b</loc></url>
+</urlset>
+"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Serves queued responses per URL, repeating the last one."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.urls = []
+
+    def get(self, url, timeout=None):
+        self.urls.append(url)
+        queued = self.responses.get(url, [FakeResponse(404)])
+        return queued.pop(0) if len(queued) > 1 else queued[0]
+
+
+def fake_fetcher(responses):
+    return SimpleNamespace(session=FakeSession(responses), timeout=1.0)
+
+
+def test_lastmod_is_kept_in_utc():
+    assert parse_lastmod("2024-05-01T12:00:00+02:00") == datetime(
+        2024, 5, 1, 10, tzinfo=timezone.utc
+    )
+    assert parse_lastmod("2024-05-01") == datetime(2024, 5, 1, tzinfo=timezone.utc)
+    assert parse_lastmod("yesterday") is None
+
+
+def test_sitemap_requests_go_through_the_scheduler():
+    fetcher = fake_fetcher(
+        {
+            f"{ROOT}/robots.txt": [FakeResponse(200, ROBOTS)],
+            f"{ROOT}/map.xml": [
+                FakeResponse(503, headers={"Retry-After": "0"}),
+                FakeResponse(200, SITEMAP),
+            ],
+        }
+    )
+    robots = RobotsCache(fetcher.session)
+    scheduler = PolitenessScheduler(rate=1000.0, backoff_base=0.01, robots=robots)
+
+    load = load_sitemap(fetcher, scheduler, f"{ROOT}/guide")  # type: ignore[arg-type]
+    lastmods = asyncio.run(load)
+
+    assert lastmods == {
+        f"{ROOT}/a": datetime(2024, 5, 1, 10, tzinfo=timezone.utc),
+        f"{ROOT}/b": None,
+    }
+    # The requests were admitted by the host's bucket, the 503 was retried and
+    # the sitemap robots.txt disallows was never requested
+    assert "docs.example.com" in scheduler._buckets
+    assert fetcher.session.urls.count(f"{ROOT}/map.xml") == 2
+    assert f"{ROOT}/private/map.xml" not in fetcher.session.urls
+
+
+def test_lastmod_is_compared_with_the_local_log_time(tmp_path):
+    from scraper.state_store import open_page_log
+    from scraper.scraping_page_log import ScrapingPage
+
+    fetched = datetime.now()
+    page_log = open_page_log(tmp_path, "csv")
+    page_log.append(
+        ScrapingPage(
+            timestamp=fetched.isoformat(),
+            url=f"{ROOT}/a",
+            html_path=None,
+            status="success",
+            title="a",
+            domain="docs.example.com",
+            content_hash="x",
+        )
+    )
+    fetched_utc = fetched.astimezone(timezone.utc)
+    assert not page_log.needs_refresh(f"{ROOT}/a", fetched_utc - timedelta(minutes=1))
+    assert page_log.needs_refresh(f"{ROOT}/a", fetched_utc + timedelta(minutes=1))
+    page_log.close()
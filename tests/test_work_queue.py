@@ -0,0 +1,153 @@
+import time
+
+import pytest
+
+from scraper.link import Link
+from scraper.sinks import JsonlSink, PageRecord
+from scraper.state_store import open_page_log
+from scraper.work_queue import WorkQueue
+
+
+def make_link(path, domain="docs.example.com"):
+    return Link(title=path, href=f"https://{domain}/{path}", text=path, domain=domain)
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return tmp_path / "queue.sqlite"
+
+
+def drain(queue):
+    items = []
+    while len(queue):
+        items.append(queue.pop())
+    return items
+
+
+def test_lease_and_commit(queue_path):
+    queue = WorkQueue(queue_path, worker_id="a", batch_size=2)
+    for path in ("one", "two", "three"):
+        queue.add(make_link(path), depth=1)
+
+    items = drain(queue)
+    assert [item.link.title for item in items] == ["one", "two", "three"]
+    assert queue.counts() == {"queued": 0, "leased": 3, "done": 0, "failed": 0}
+
+    # A full batch is written on its own, the rest on flush
+    queue.done(items[0])
+    queue.done(items[1])
+    assert queue.counts()["done"] == 2
+    queue.done(items[2])
+    assert queue.counts()["done"] == 2
+    queue.flush()
+    assert queue.counts()["done"] == 3
+    assert queue.exhausted
+    queue.close()
+
+
+def test_link_queued_by_two_workers_is_leased_once(queue_path):
+    a = WorkQueue(queue_path, worker_id="a")
+    b = WorkQueue(queue_path, worker_id="b")
+    assert a.add(make_link("page"), depth=1)
+    assert b.add(make_link("page#section"), depth=1)
+    a.flush()
+    b.flush()
+
+    assert len(drain(a)) + len(drain(b)) == 1
+    a.close()
+    b.close()
+
+
+def test_expired_lease_goes_to_another_worker(queue_path):
+    crashed = WorkQueue(queue_path, worker_id="crashed", lease_seconds=0.05)
+    crashed.add(make_link("page"), depth=1)
+    assert len(drain(crashed)) == 1
+    crashed.close()
+
+    time.sleep(0.1)
+    survivor = WorkQueue(queue_path, worker_id="survivor")
+    assert [item.link.title for item in drain(survivor)] == ["page"]
+    survivor.close()
+
+
+def test_lease_that_keeps_expiring_is_failed(queue_path, monkeypatch):
+    monkeypatch.setattr("scraper.work_queue.QUEUE_POLL_SECONDS", 0.0)
+    queue = WorkQueue(queue_path, worker_id="a", lease_seconds=0.01, max_attempts=2)
+    queue.add(make_link("page"), depth=1)
+    for _ in range(2):
+        assert len(drain(queue)) == 1
+        time.sleep(0.02)
+
+    assert len(queue) == 0
+    assert queue.counts()["failed"] == 1
+    queue.close()
+
+
+def test_release_hands_back_unfinished_urls(queue_path):
+    a = WorkQueue(queue_path, worker_id="a")
+    for path in ("one", "two"):
+        a.add(make_link(path), depth=1)
+    first, second = drain(a)
+    a.done(first)
+    a.release()
+
+    b = WorkQueue(queue_path, worker_id="b")
+    assert [item.link.title for item in drain(b)] == ["two"]
+    assert b.counts()["done"] == 1
+    a.close()
+    b.close()
+
+
+def test_nothing_is_committed_when_before_commit_fails(queue_path):
+    queue = WorkQueue(queue_path, worker_id="a")
+    queue.add(make_link("page"), depth=1)
+    (item,) = drain(queue)
+
+    def fail():
+        raise OSError("disk full")
+
+    queue.before_commit.append(fail)
+    queue.done(item)
+    with pytest.raises(OSError):
+        queue.flush()
+    assert queue.counts()["done"] == 0
+    queue.close()
+
+
+def test_sink_flush_finishes_the_shard(tmp_path):
+    sink = JsonlSink(tmp_path, "out", compress=False)
+    record = PageRecord(
+        url="https://docs.example.com/a",
+        title="a",
+        texts=["A"],
+        fetched_at="2024-01-01T00:00:00",
+        status="success",
+    )
+    sink.write(record)
+    sink.flush()
+    assert [path.name for path in tmp_path.iterdir()] == ["out-00000.jsonl"]
+
+    sink.write(record)
+    sink.close()
+    assert len(sink.shards) == 2
+
+
+def journal_mode(page_log):
+    return page_log._conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+
+@pytest.mark.parametrize("wal, mode", [(True, "wal"), (False, "delete")])
+def test_page_log_shares_the_queue_journal_mode(tmp_path, queue_path, wal, mode):
+    WorkQueue(queue_path, worker_id="coordinator", wal=wal).close()
+    # Workers open the queue with the defaults, as `crawl --queue` does
+    queue = WorkQueue(queue_path, worker_id="a")
+    assert queue.wal is wal
+    page_log = open_page_log(tmp_path, "sqlite", wal=queue.wal)
+    assert journal_mode(page_log) == mode
+    page_log.close()
+
+    # Opened later without a queue, e.g. by `stats`, the log keeps its mode
+    page_log = open_page_log(tmp_path, "sqlite")
+    assert journal_mode(page_log) == mode
+    page_log.close()
+    queue.close()